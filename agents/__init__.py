@@ -8,11 +8,15 @@ __all__ = [
     "DataCollectorAgent",
     "DataFormatterAgent",
     "SummaryGeneratorAgent",
-    "BenefitCalculatorAgent"
+    "BenefitCalculatorAgent",
+    "TextAnalyzerAgent",
+    "AgentPool"
 ]
 
 # Convenience imports
 from .data_collector import DataCollectorAgent
 from .data_formatter import DataFormatterAgent
 from .summary_generator import SummaryGeneratorAgent
-from .benefit_calculator import BenefitCalculatorAgent
\ No newline at end of file
+from .benefit_calculator import BenefitCalculatorAgent
+from .text_analyzer import TextAnalyzerAgent
+from .pool import AgentPool
\ No newline at end of file
@@ -1,6 +1,6 @@
 # In agents/benefit_calculator.py
 from crewai import Agent, Task
-from config import llm_client
+from config import llm_for
 import os
 from dotenv import load_dotenv
 
@@ -13,7 +13,7 @@ class BenefitCalculatorAgent:
             goal='Calculate financial benefits with low and high estimates based on collected financial data',
             backstory='Specialist in financial benefit calculations using predefined metrics',
             verbose=True,
-            llm=llm_client,
+            llm=llm_for("calculator"),
         )
 
     def create_task(self, financial_data, finance_tools):
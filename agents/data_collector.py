@@ -1,5 +1,5 @@
 # In agents/data_collector.py
-from config import llm_client
+from config import llm_for
 from crewai import Agent, Task
 import os
 from dotenv import load_dotenv
@@ -9,14 +9,14 @@ load_dotenv()
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
 
 class DataCollectorAgent:
-    def __init__(self):
+    def __init__(self, memory=True):
         self.agent = Agent(
             role='Financial Data Collector',
             goal='Collect financial data for inventory-based companies from Yahoo Finance',
             backstory='Expert in financial analysis and data collection from Yahoo Finance, specializing in inventory-based companies',
             verbose=True,
-            llm=llm_client,
-            memory=True
+            llm=llm_for("collector"),
+            memory=memory
         )
 
     def create_task(self, company_input, finance_tools, websocket, max_retries=MAX_RETRIES):
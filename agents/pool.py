@@ -0,0 +1,78 @@
+# In agents/pool.py
+"""Pool of pre-built agent bundles.
+
+Building the agents is the expensive part of a request, so bundles are built once and reused. A
+bundle is checked out by one request at a time: tasks are created per request and bound to the
+bundle's agents in a fresh Crew.
+
+The collector runs without memory. crewai's agent memory (memory=True) is a Memory store whose
+default embedder is OpenAI's, so with the local Ollama models every save and recall fails; its
+storage is also one shared directory, so what one user's request stored would be recalled for the
+next user's company. The collector does not need it: a request's retries repeat the full task
+description, and the fetched numbers are kept in the FinanceTools snapshot store.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from crewai import Crew, Process
+from app_logging import get_logger
+from metrics import CREW_SECONDS
+from tracing import span
+from .data_collector import DataCollectorAgent
+from .data_formatter import DataFormatterAgent
+from .benefit_calculator import BenefitCalculatorAgent
+from .summary_generator import SummaryGeneratorAgent
+from .text_analyzer import TextAnalyzerAgent
+
+logger = get_logger("agent_pool")
+
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", 4))
+
+
+class AgentBundle:
+    """One set of pipeline agents."""
+
+    def __init__(self):
+        self.text_analyzer = TextAnalyzerAgent()
+        # No memory: see the module docstring
+        self.collector = DataCollectorAgent(memory=False)
+        self.formatter = DataFormatterAgent()
+        self.calculator = BenefitCalculatorAgent()
+        self.summary = SummaryGeneratorAgent()
+
+    def crew(self, tasks, verbose=True):
+        """Sequential crew running this request's tasks on the bundle's agents."""
+        agents = []
+        for task in tasks:
+            if all(task.agent is not agent for agent in agents):
+                agents.append(task.agent)
+        return Crew(agents=agents, tasks=tasks, process=Process.sequential, verbose=verbose)
+
+    def kickoff(self, name, tasks, verbose=True):
+        """Run the tasks in a crew and return its output; the kickoff is timed in CREW_SECONDS under `name`."""
+        crew = self.crew(tasks, verbose=verbose)
+        with span(f"crew.{name}", tasks=len(tasks)), CREW_SECONDS.time(crew=name):
+            return crew.kickoff()
+
+
+class AgentPool:
+    """Thread-safe pool of AgentBundles. Bursts above `size` build extra bundles that are dropped on release."""
+
+    def __init__(self, size=AGENT_POOL_SIZE):
+        self.size = size
+        self._idle = [AgentBundle() for _ in range(size)]
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            bundle = self._idle.pop() if self._idle else None
+        if bundle is None:
+            logger.warning(f"Agent pool exhausted ({self.size} bundles in use); building an extra bundle")
+            bundle = AgentBundle()
+        try:
+            yield bundle
+        finally:
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(bundle)
@@ -1,14 +1,14 @@
 from crewai import Agent, Task, LLM
 from groq import Groq
 import os
-from config import llm_client
+from config import llm_for
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class SummaryGeneratorAgent:
-    def __init__(self):
-        self.client = llm_client
+    def __init__(self, llm=None):
+        self.client = llm or llm_for("summary")
         
         # Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.agent = Agent(
@@ -19,9 +19,13 @@ class SummaryGeneratorAgent:
             llm=self.client
         )
 
-    def create_task(self):
+    def create_task(self, financial_data=None, benefits=None):
+        description = "Generate a natural language summary of the financial data, highlighting key metrics and insights"
+        if financial_data is not None:
+            # Precomputed results: no upstream task to take context from, so inline the data
+            description += f"\nFinancial data: {financial_data}\nEstimated benefits: {benefits}"
         return Task(
-            description="Generate a natural language summary of the financial data, highlighting key metrics and insights",
+            description=description,
             expected_output="A string containing a concise, human-readable summary of the financial data",
             agent=self.agent
         )
\ No newline at end of file
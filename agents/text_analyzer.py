@@ -0,0 +1,25 @@
+# In agents/text_analyzer.py
+from crewai import Agent, Task
+from config import llm_for
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class TextAnalyzerAgent:
+    def __init__(self, llm=None):
+        # LLM Agent for text analysis: intent detection and retrieval answers
+        self.agent = Agent(
+            role="Text Analyzer and Responder",
+            goal="Analyze text and generate natural language responses",
+            backstory="I'm an expert at understanding and responding to user inputs.",
+            verbose=True,
+            llm=llm or llm_for("answer")
+        )
+
+    def create_task(self, description, expected_output):
+        return Task(
+            description=description,
+            expected_output=expected_output,
+            agent=self.agent
+        )
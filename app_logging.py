@@ -0,0 +1,138 @@
+# app_logging.py
+"""Logging setup: JSON lines written off the request path.
+
+Loggers under "app" only put records on a queue (QueueHandler); a QueueListener thread does the
+formatting and the disk and console writes. Records go to the daily file in LOG_DIR as one JSON
+object per line, including the ip/browser/request_id extras and any structured `fields`. Payload
+values (financial data, benefits, summaries, raw LLM output) are cut to LOG_PAYLOAD_LIMIT
+characters. Per-chunk retrieval logs are kept for a LOG_SAMPLE_RATE sample of queries only.
+
+Only the app's entry point (main.py) calls setup_logging. Importing a module never starts the
+listener or creates a log file; until setup, "app" records fall through to Python's default
+handling (warnings and errors on stderr).
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_PAYLOAD_LIMIT = int(os.getenv("LOG_PAYLOAD_LIMIT", 2000))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.05))
+
+CONTEXT_FIELDS = ("ip", "browser", "request_id")
+
+_listener = None
+
+
+def truncate(value, limit=LOG_PAYLOAD_LIMIT):
+    """Value as-is if short, else its JSON/str text cut to `limit` characters with the dropped length noted."""
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if len(text) <= limit:
+        return value
+    return f"{text[:limit]}...(+{len(text) - limit} chars)"
+
+
+def sampled(rate=LOG_SAMPLE_RATE):
+    """True for roughly `rate` of calls; gate verbose logs with it."""
+    return random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage())
+        }
+        for field in CONTEXT_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry[key] = truncate(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Only merge the message args here; the traceback travels separately so the JSON formatter
+        # stores it whole instead of inside the (truncated) message
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Short one-line console output; payload fields are summarized, not dumped."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s - %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={truncate(value, 200)}" for key, value in fields.items())
+        return line
+
+
+def daily_file_handler(log_dir=LOG_DIR):
+    """Daily file (YYYY-MM-DD.log) rotated at midnight, 30 days kept."""
+    os.makedirs(log_dir, exist_ok=True)
+    handler = TimedRotatingFileHandler(
+        filename=os.path.join(log_dir, datetime.now().strftime("%Y-%m-%d.log")),
+        when="midnight",
+        interval=1,
+        backupCount=30
+    )
+    # Ensure rotated files keep the YYYY-MM-DD.log format
+    handler.namer = lambda name: os.path.join(log_dir, datetime.fromtimestamp(os.path.getmtime(name)).strftime("%Y-%m-%d.log"))
+    handler.rotator = lambda src, dest: os.rename(src, dest)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup_logging(log_dir=LOG_DIR, level=LOG_LEVEL):
+    """Route the "app" loggers through a queue to the JSON file and the console. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    console = logging.StreamHandler()
+    console.setFormatter(ConsoleFormatter())
+    records = queue.SimpleQueue()
+    _listener = QueueListener(records, daily_file_handler(log_dir), console, respect_handler_level=True)
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(level)
+    app_logger.handlers = [_QueueHandler(records)]
+    app_logger.propagate = False
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records; call on shutdown."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    """Logger under "app"; its records reach the file once the entry point has called setup_logging."""
+    return logging.getLogger(f"app.{name}")
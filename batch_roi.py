@@ -0,0 +1,109 @@
+# batch_roi.py
+"""Batch ROI estimates for lists of tickers, streamed as NDJSON rows.
+
+Fundamentals are fetched concurrently (bounded by BATCH_CONCURRENCY) and every group of companies
+that has finished fetching is run through the vectorized BenefitEngine in one pass. A failing
+ticker produces an error row instead of aborting the batch.
+
+Usage:
+    python batch_roi.py AAPL WMT TGT
+    python batch_roi.py --file tickers.txt --concurrency 16 > results.ndjson
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dotenv import load_dotenv
+from tools.finance_tools import FinanceTools, format_amount
+from tools.benefit_engine import TIERS
+
+load_dotenv()
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 500))
+
+
+def calculate_rows(finance_tools, fetched):
+    """Run the benefit engine once for a list of (ticker, snapshot or error dict) pairs and build the output rows."""
+    rows = [{"ticker": ticker, "status": "error", "error": result["error"]} for ticker, result in fetched if isinstance(result, dict)]
+    fetched = [(ticker, result) for ticker, result in fetched if not isinstance(result, dict)]
+    if not fetched:
+        return rows
+
+    calculator = finance_tools.calculator_tool
+    snapshots = [snapshot for _, snapshot in fetched]
+    tiers, values, sums = calculator.compute(snapshots)
+    for i, (ticker, snapshot) in enumerate(fetched):
+        rows.append({
+            "ticker": ticker,
+            "status": "ok",
+            "company_type": TIERS[tiers[i]],
+            "financial_data": snapshot.to_display(),
+            "raw": snapshot.to_dict(),
+            "benefits": calculator.engine.to_results(values[i], sums[i], snapshot.currency, format_amount)
+        })
+    return rows
+
+
+async def run_batch(tickers, finance_tools, concurrency=BATCH_CONCURRENCY):
+    """Yield one result row per ticker, in completion order."""
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = asyncio.Queue()
+
+    async def fetch(ticker):
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(finance_tools.yfinance_tool.fetch_snapshot, ticker)
+            except Exception as e:
+                result = {"error": f"Failed to fetch data for '{ticker}': {str(e)}"}
+        await fetched.put((ticker, result))
+
+    tasks = [asyncio.create_task(fetch(ticker)) for ticker in tickers]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            # Wait for one company, then take everything else that finished meanwhile and compute them together
+            ready = [await fetched.get()]
+            while not fetched.empty():
+                ready.append(fetched.get_nowait())
+            remaining -= len(ready)
+            for row in calculate_rows(finance_tools, ready):
+                yield row
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def parse_tickers(values):
+    """Normalize a list of tickers: strip, upper-case, drop blanks and duplicates while keeping order."""
+    tickers = []
+    for value in values:
+        ticker = str(value).strip().upper()
+        if ticker and ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+
+async def main(args):
+    tickers = list(args.tickers)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            tickers.extend(line.split("#")[0] for line in f)
+    tickers = parse_tickers(tickers)
+    if not tickers:
+        print("No tickers given.", file=sys.stderr)
+        return 1
+
+    finance_tools = FinanceTools()
+    async for row in run_batch(tickers, finance_tools, args.concurrency):
+        print(json.dumps(row), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch ROI estimates for a list of tickers (NDJSON to stdout).")
+    parser.add_argument("tickers", nargs="*", help="Ticker symbols, e.g. AAPL WMT")
+    parser.add_argument("--file", help="File with one ticker per line")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Max concurrent fetches")
+    sys.exit(asyncio.run(main(parser.parse_args())))
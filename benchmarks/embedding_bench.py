@@ -0,0 +1,88 @@
+# benchmarks/embedding_bench.py
+"""Throughput of query embedding + index search with and without EmbeddingService batching.
+
+Concurrent callers (threads, as in the app's worker threads) each embed a query from the labeled
+retrieval set and search the index. Each concurrency level runs twice: with --max-batch 1 (one
+embed_documents and one index.search per query, the old per-request path) and with the configured
+batch size and wait. Reported per run: queries/s, p50/p95 latency and the mean batch size.
+
+Usage (from the repo root):
+    python benchmarks/embedding_bench.py --concurrency 1,8,32
+    python benchmarks/embedding_bench.py --max-batch 64 --max-wait-ms 10 --json embedding.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+from langchain.embeddings import HuggingFaceEmbeddings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TRACING", "0")
+
+from embedding_service import EmbeddingService
+from metrics import EMBED_BATCH_SIZE
+from benchmarks.retrieval_bench import CASES_FILE, load_cases, percentiles
+
+
+def run(service, queries, concurrency, top_k):
+    latencies = []
+
+    def query(text):
+        started = time.perf_counter()
+        service.search(text, top_k)
+        latencies.append(time.perf_counter() - started)
+
+    before = EMBED_BATCH_SIZE.snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(query, queries))
+    elapsed = time.perf_counter() - started
+    # Batches observed during this run only
+    count = lambda snap: (snap[0]["count"], snap[0]["avg"] * snap[0]["count"]) if snap else (0, 0.0)
+    (batches_before, texts_before), (batches_after, texts_after) = count(before), count(EMBED_BATCH_SIZE.snapshot())
+    latency = percentiles(latencies)
+    return {
+        "queries_per_second": len(queries) / elapsed,
+        "p50_ms": latency["p50"] * 1000, "p95_ms": latency["p95"] * 1000,
+        "mean_batch": (texts_after - texts_before) / max(1, batches_after - batches_before)
+    }
+
+
+def main(args):
+    embedding_model = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    index = faiss.read_index(args.index)
+    cases = load_cases(args.cases)
+    queries = [cases[i % len(cases)]["query"] for i in range(args.queries)]
+    embedding_model.embed_query("warm up")
+
+    report = {"config": vars(args), "runs": []}
+    print(f"{'concurrency':>11}{'max_batch':>10}{'queries/s':>11}{'p50':>10}{'p95':>10}{'batch':>7}")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        for max_batch in (1, args.max_batch):
+            service = EmbeddingService(embedding_model, index=index, max_batch=max_batch, max_wait_ms=args.max_wait_ms)
+            result = {"concurrency": concurrency, "max_batch": max_batch, **run(service, queries, concurrency, args.top_k)}
+            report["runs"].append(result)
+            print(f"{concurrency:>11}{max_batch:>10}{result['queries_per_second']:>11.1f}"
+                  f"{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms{result['mean_batch']:>7.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare batched and per-query embedding + search throughput.")
+    parser.add_argument("--cases", default=CASES_FILE)
+    parser.add_argument("--index", default=os.path.join(ROOT, "vindex", "combined_index.index"))
+    parser.add_argument("--embedding-model", default="BAAI/bge-base-en")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated numbers of concurrent callers")
+    parser.add_argument("--queries", type=int, default=400, help="Queries per run")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--json", help="Write the runs to this file")
+    main(parser.parse_args())
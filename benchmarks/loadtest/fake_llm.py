@@ -0,0 +1,240 @@
+# benchmarks/loadtest/fake_llm.py
+"""Stand-in for the Ollama server, for load tests without a GPU.
+
+Speaks the OpenAI-compatible /v1/chat/completions API the agents use (plain and streamed), plus
+Ollama's /api/chat and /api/generate (keep-warm pings, prefill_bench.py). Replies take
+--ttft seconds plus completion tokens / --tokens-per-second, and at most --parallel requests are
+served at once (like OLLAMA_NUM_PARALLEL); the rest queue.
+
+Replies are shaped so the real pipeline runs end to end:
+- the intent prompt gets an {"is_question", "company"} verdict from a keyword heuristic,
+- the collector and calculator agents call YahooFinanceDataFetcher / CalculatorTool (native tool
+  calls, or ReAct text when no tools are passed) and then return the tool result,
+- schema-constrained (formatter) calls echo the collected JSON object,
+- everything else gets --completion-tokens words of filler text.
+
+Usage:
+    python benchmarks/loadtest/fake_llm.py --port 11500 --ttft 0.2 --tokens-per-second 40 --parallel 2
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from structured_output import extract_objects
+
+QUESTION_WORDS = ("what", "how", "why", "when", "where", "who", "which", "can", "is", "are", "do", "does")
+FILLER = ("ROIALLY", "here", "with", "a", "quick", "take:", "inventory", "turns", "and", "margin", "lift",
+          "drive", "the", "numbers", "for", "this", "company.")
+
+
+def text_of(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def intent_verdict(text):
+    words = text.strip().split()
+    is_question = text.strip().endswith("?") or bool(words) and words[0].lower() in QUESTION_WORDS
+    company = None
+    for i, word in enumerate(words[1:], 1):
+        if words[i - 1].lower() in ("of", "for", "about") and word[:1].isupper():
+            company = word.strip("?.!,")
+            break
+    return {"is_question": is_question and company is None, "company": company}
+
+
+def find_object(messages, required_key):
+    for message in reversed(messages):
+        for value in extract_objects(text_of(message)):
+            if required_key in value:
+                return value
+    return None
+
+
+def tool_names(body):
+    return [tool.get("function", {}).get("name") for tool in body.get("tools") or []]
+
+
+class Reply:
+    def __init__(self, content=None, tool_call=None):
+        self.content = content
+        self.tool_call = tool_call  # (name, arguments)
+
+
+def plan_reply(body, completion_tokens):
+    messages = body.get("messages") or [{"role": "user", "content": body.get("prompt", "")}]
+    prompt = "\n".join(text_of(message) for message in messages)
+    last = messages[-1]
+
+    if "Analyze the text in the user's message" in prompt or "Analyze the following text" in prompt:
+        text = re.findall(r"Text:\s*(.*)", prompt)
+        return Reply(json.dumps(intent_verdict(text[-1] if text else "")))
+
+    # Agents with tools: call the tool once, then answer with what it returned
+    native_tools = tool_names(body)
+    react_tools = re.findall(r"Tool Name: ([\w-]+)", prompt)
+    tools = native_tools or react_tools
+    tool_result = text_of(last) if last.get("role") == "tool" else None
+    if tool_result is None and "Observation:" in text_of(last):
+        tool_result = text_of(last).split("Observation:", 1)[1].strip()
+    if tools and tool_result is not None:
+        return Reply(tool_result if native_tools else f"Thought: I now know the final answer\nFinal Answer: {tool_result}")
+    # Native tool names are snake_cased ("yahoo_finance_data_fetcher"), ReAct ones are not
+    by_key = {re.sub(r"[^a-z]", "", name.lower()): name for name in tools}
+    if "yahoofinancedatafetcher" in by_key:
+        ticker = re.search(r"Process the input '([^']+)'", prompt)
+        return Reply(tool_call=(by_key["yahoofinancedatafetcher"], {"ticker": ticker.group(1) if ticker else "WMT"}))
+    if "calculatortool" in by_key:
+        return Reply(tool_call=(by_key["calculatortool"], {"financial_data": find_object(messages, "company") or {}}))
+
+    if body.get("response_format") or body.get("format"):
+        return Reply(json.dumps(find_object(messages, "company") or {}))
+
+    words = [FILLER[i % len(FILLER)] for i in range(completion_tokens)]
+    return Reply(" ".join(words))
+
+
+class FakeLLM:
+    def __init__(self, ttft, tokens_per_second, parallel, completion_tokens):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.slots = threading.Semaphore(parallel)
+
+    def generate(self, body):
+        """Plan the reply and hold a slot for as long as a real server would take; returns (reply, prompt tokens, completion tokens)."""
+        reply = plan_reply(body, self.completion_tokens)
+        prompt_tokens = len(json.dumps(body.get("messages") or body.get("prompt", ""))) // 4
+        output = reply.content if reply.content is not None else json.dumps(reply.tool_call[1])
+        completion_tokens = max(1, len(output) // 4)
+        if (body.get("options") or {}).get("num_predict") == 1:
+            completion_tokens = 1
+        with self.slots:
+            time.sleep(self.ttft + completion_tokens / self.tokens_per_second)
+        return reply, prompt_tokens, completion_tokens
+
+
+def make_handler(llm):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, payload, status=200):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("/v1/models", "/api/tags"):
+                self.send_json({"object": "list", "data": [{"id": "fake", "object": "model"}], "models": [{"name": "fake"}]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path.startswith("/v1/chat/completions"):
+                self.openai_chat(body)
+            elif self.path.startswith("/api/chat") or self.path.startswith("/api/generate"):
+                self.ollama(body)
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def ollama(self, body):
+            if not body.get("messages") and not body.get("prompt"):
+                # keep_alive ping: just "load" the model
+                self.send_json({"model": body.get("model"), "done": True, "response": ""})
+                return
+            started = time.perf_counter()
+            reply, prompt_tokens, completion_tokens = llm.generate(body)
+            elapsed = int((time.perf_counter() - started) * 1e9)
+            content = reply.content if reply.content is not None else json.dumps(reply.tool_call[1])
+            self.send_json({
+                "model": body.get("model"), "done": True,
+                "message": {"role": "assistant", "content": content}, "response": content,
+                "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(llm.ttft * 1e9),
+                "eval_count": completion_tokens, "eval_duration": max(0, elapsed - int(llm.ttft * 1e9)),
+                "total_duration": elapsed
+            })
+
+        def openai_chat(self, body):
+            reply, prompt_tokens, completion_tokens = llm.generate(body)
+            message = {"role": "assistant", "content": reply.content}
+            finish_reason = "stop"
+            if reply.tool_call is not None:
+                name, arguments = reply.tool_call
+                message["tool_calls"] = [{
+                    "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(arguments)}
+                }]
+                finish_reason = "tool_calls"
+            if reply.tool_call is not None and not body.get("tools"):
+                # No native tools offered: express the call in crewai's ReAct text format
+                name, arguments = reply.tool_call
+                message = {"role": "assistant", "content": f"Thought: I need data\nAction: {name}\nAction Input: {json.dumps(arguments)}"}
+                finish_reason = "stop"
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            created = int(time.time())
+            if not body.get("stream"):
+                self.send_json({
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": created,
+                    "model": body.get("model"), "usage": usage,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}]
+                })
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+            def event(delta, finish=None, with_usage=False):
+                payload = {"id": chunk_id, "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                if with_usage:
+                    payload["usage"] = usage
+                data = f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+            delta = {k: v for k, v in message.items() if v is not None}
+            if "tool_calls" in delta:
+                delta["tool_calls"] = [{**call, "index": 0} for call in delta["tool_calls"]]
+            event(delta)
+            event({}, finish_reason, with_usage=True)
+            done = b"data: [DONE]\n\n"
+            self.wfile.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake LLM server with configurable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token (prefill)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Generation speed")
+    parser.add_argument("--parallel", type=int, default=1, help="Requests generated at once; the rest queue")
+    parser.add_argument("--completion-tokens", type=int, default=80, help="Length of free-text replies")
+    args = parser.parse_args()
+    llm = FakeLLM(args.ttft, args.tokens_per_second, args.parallel, args.completion_tokens)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(llm))
+    print(f"Fake LLM on http://{args.host}:{args.port} (ttft={args.ttft}s, {args.tokens_per_second} tok/s, parallel={args.parallel})")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/loadtest/loadgen.py
+"""WebSocket load generator for /ws.
+
+Each of --concurrency connections sends one request at a time, like the chat UI, picking a workload
+by --mix weight:
+    question  a general question (intent check, retrieval, answer)  -> question_result
+    company   "calculate the ROI of <name>" (intent check, ticker match) -> confirm_ticker
+    roi       a confirmed ticker (collect, calculate, summarize)    -> result
+
+For every request the time from sending to the first message of each type is recorded, so the
+report shows p50/p95/p99 latency per workload and message type (thinking, agent_update, result,
+...) and the throughput of completed requests.
+
+Usage (with serve.py running):
+    python benchmarks/loadtest/loadgen.py --concurrency 8 --duration 60
+    python benchmarks/loadtest/loadgen.py --requests 200 --mix question=1,roi=3 --json report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+import websockets
+
+FIXTURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "finance.json")
+QUESTIONS = [
+    "What is ROI?",
+    "How does Impact Analytics help retailers?",
+    "What is allocation and replenishment?",
+    "Who built you?",
+    "How is the margin rate lift calculated?",
+]
+TERMINAL_TYPES = {"result", "question_result", "confirm_ticker", "error"}
+
+
+def build_workloads(fixtures):
+    names = [entry["name"].split()[0].strip(",.") for entry in fixtures.values()]
+    tickers = list(fixtures)
+
+    def roi():
+        # What the UI sends when the user confirms a ticker
+        ticker = random.choice(tickers)
+        return {"content": ticker, "ticker": ticker, "current_mode": "smart_detect"}
+
+    return {
+        "question": lambda: {"content": random.choice(QUESTIONS), "current_mode": "smart_detect"},
+        "company": lambda: {"content": f"Calculate the ROI of {random.choice(names)}", "current_mode": "smart_detect"},
+        "roi": roi,
+    }
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def is_terminal(message):
+    kind = message.get("type")
+    if kind in TERMINAL_TYPES:
+        return True
+    # Plain messages end a request unless they announce a retry
+    return kind == "message" and not str(message.get("content", "")).startswith(("Retry attempt", "Attempt "))
+
+
+async def run_request(ws, workload, payload, timeout):
+    request_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    await ws.send(json.dumps({"type": "user_input", "request_id": request_id, **payload}))
+    first_seen = {}
+    outcome = "timeout"
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        try:
+            raw = await asyncio.wait_for(ws.recv(), timeout=deadline - time.perf_counter())
+        except asyncio.TimeoutError:
+            break
+        message = json.loads(raw)
+        if message.get("request_id") not in (request_id, "unknown", None):
+            continue
+        kind = message.get("type", "unknown")
+        first_seen.setdefault(kind, time.perf_counter() - started)
+        if kind == "question":
+            # The collector asks for missing values; answer so the connection is not left waiting
+            await ws.send("Not Available")
+            outcome = "question"
+            continue
+        if is_terminal(message):
+            outcome = "error" if kind == "error" else kind
+            break
+    return {"workload": workload, "outcome": outcome, "seconds": time.perf_counter() - started, "first_seen": first_seen}
+
+
+async def worker(url, workloads, mix, stop_at, remaining, timeout, results):
+    names, weights = list(mix), list(mix.values())
+    async with websockets.connect(url, max_size=None) as ws:
+        while time.perf_counter() < stop_at:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            workload = random.choices(names, weights)[0]
+            results.append(await run_request(ws, workload, workloads[workload](), timeout))
+
+
+def percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)] if ordered else 0.0
+
+
+def summarize(results, elapsed):
+    report = {"elapsed": elapsed, "requests": len(results), "throughput": len(results) / elapsed if elapsed else 0.0, "workloads": {}}
+    for workload in sorted({r["workload"] for r in results}):
+        rows = [r for r in results if r["workload"] == workload]
+        outcomes = {}
+        for r in rows:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        latencies = {}
+        for r in rows:
+            for kind, seconds in r["first_seen"].items():
+                latencies.setdefault(kind, []).append(seconds)
+        latencies["total"] = [r["seconds"] for r in rows]
+        report["workloads"][workload] = {
+            "requests": len(rows),
+            "throughput": len(rows) / elapsed if elapsed else 0.0,
+            "outcomes": outcomes,
+            "latency": {
+                kind: {"count": len(values), "p50": percentile(sorted(values), 0.50), "p95": percentile(sorted(values), 0.95), "p99": percentile(sorted(values), 0.99)}
+                for kind, values in sorted(latencies.items())
+            }
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed']:.1f}s = {report['throughput']:.2f} req/s")
+    for workload, data in report["workloads"].items():
+        outcomes = ", ".join(f"{k} {v}" for k, v in sorted(data["outcomes"].items()))
+        print(f"\n{workload}: {data['requests']} requests, {data['throughput']:.2f} req/s ({outcomes})")
+        print(f"  {'message type':<16}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for kind, stats in data["latency"].items():
+            print(f"  {kind:<16}{stats['count']:>7}{stats['p50']:>9.2f}s{stats['p95']:>9.2f}s{stats['p99']:>9.2f}s")
+
+
+async def main(args):
+    with open(FIXTURES_FILE, "r", encoding="utf-8") as f:
+        workloads = build_workloads(json.load(f))
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(workloads)
+    if unknown:
+        raise SystemExit(f"Unknown workloads: {', '.join(sorted(unknown))}. Expected: {', '.join(workloads)}")
+    results = []
+    remaining = [args.requests] if args.requests else None
+    started = time.perf_counter()
+    stop_at = started + (args.duration if not args.requests else float("inf"))
+    await asyncio.gather(*(
+        worker(args.url, workloads, mix, stop_at, remaining, args.timeout, results)
+        for _ in range(args.concurrency)
+    ))
+    report = summarize(results, time.perf_counter() - started)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive /ws with a mixed workload and report latency per message type.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent WebSocket connections")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests in total")
+    parser.add_argument("--mix", default="question=2,company=1,roi=2", help="Workload weights")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds before a request counts as timed out")
+    parser.add_argument("--json", help="Also write the report to this file")
+    asyncio.run(main(parser.parse_args()))
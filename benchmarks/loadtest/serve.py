@@ -0,0 +1,54 @@
+# benchmarks/loadtest/serve.py
+"""Run the app against the fake LLM server and the fixture finance providers.
+
+Start fake_llm.py first, then:
+    python benchmarks/loadtest/serve.py --llm-url http://127.0.0.1:11500 --port 8000
+
+The response cache is off by default so every request does the full amount of LLM work; pass
+--cache to measure with it. With --replay PATH the finance tools serve a store recorded with
+FINANCE_MODE=record (tools/recorder.py) instead of the fixtures. The retrieval index (vindex/) and the embedding model are the real
+ones and must be available locally.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve main:app with offline stand-ins for load testing.")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:11500", help="Base URL of fake_llm.py")
+    parser.add_argument("--model", default="ollama/fake", help="MODEL_NAME to report to the fake server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--provider-latency", type=float, default=0.05, help="Seconds per stubbed finance call")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--replay", help="Serve finance data from this recorder store instead of the fixtures")
+    args = parser.parse_args()
+
+    # config reads these at import time, so set them before the app is imported
+    os.environ["LLM_BASE_URL"] = args.llm_url
+    os.environ["MODEL_NAME"] = args.model
+    if not args.cache:
+        os.environ["LLM_CACHE_TASKS"] = ""
+    if args.replay:
+        os.environ["FINANCE_MODE"] = "replay"
+        os.environ["FINANCE_RECORDINGS_PATH"] = os.path.abspath(args.replay)
+    os.chdir(ROOT)
+
+    if args.replay:
+        print(f"Finance providers replayed from {args.replay}")
+    else:
+        from benchmarks.loadtest import stubs
+        fixtures = stubs.install(latency=args.provider_latency)
+        print(f"Finance providers stubbed with {len(fixtures)} fixture companies: {', '.join(fixtures)}")
+
+    import uvicorn
+    from main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
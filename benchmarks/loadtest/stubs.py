@@ -0,0 +1,79 @@
+# benchmarks/loadtest/stubs.py
+"""Offline stand-ins for the external finance providers, serving fixtures/finance.json.
+
+install() swaps the network-bound parts of the finance tools (Yahoo Finance fetch, Alpha Vantage,
+inventory check, Serper company search and ticker search) for fixture lookups that take
+`latency` seconds, so a load test measures the app rather than third-party APIs. The stand-ins
+keep the tools' metrics and trace spans. Tickers missing from the fixtures get the same
+"Company not found" error as the live tool.
+"""
+import json
+import os
+import time
+
+from metrics import timed_tool
+from tools import finance_tools
+from tools.financial_snapshot import FinancialSnapshot
+from tracing import traced
+
+FIXTURES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "finance.json")
+
+
+def load_fixtures(path=FIXTURES_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def install(latency=0.05, path=FIXTURES_FILE):
+    """Patch the finance tool classes to serve fixtures; returns the fixture dict."""
+    fixtures = load_fixtures(path)
+    by_name = {entry["name"].lower(): symbol for symbol, entry in fixtures.items()}
+
+    def entry(ticker):
+        time.sleep(latency)
+        return fixtures.get(str(ticker).strip().upper())
+
+    def fetch_snapshot(self, ticker):
+        found = entry(ticker)
+        if found is None:
+            return {"error": "Company not found. Please check the ticker and try again."}
+        return FinancialSnapshot.from_dict(found["snapshot"])
+
+    def alpha_vantage(self, ticker):
+        found = entry(ticker)
+        if found is None:
+            return {"error": "No data found for this ticker in Alpha Vantage"}
+        snapshot = found["snapshot"]
+        return {
+            "company_name": found["name"],
+            "market_cap": float(snapshot["market_cap"]),
+            "Headcount": snapshot["headcount"],
+            "Salary Average": "Not Available"
+        }
+
+    def inventory_check(self, ticker):
+        found = entry(ticker)
+        return bool(found and found["snapshot"]["inventory_cost"])
+
+    def search_company(self, company_name):
+        time.sleep(latency)
+        query = company_name.lower()
+        matches = [f"{fixtures[symbol]['name']} ({symbol})" for name, symbol in by_name.items() if query in name or query == symbol.lower()]
+        return f"Possible matches for '{company_name}': [{', '.join(matches)}]" if matches else f"No company found for '{company_name}'"
+
+    def search_ticker(self, company_name):
+        time.sleep(latency)
+        query = company_name.lower()
+        for name, symbol in by_name.items():
+            if query in name:
+                return f"This is the ticker for '{company_name}': {symbol}"
+        return f"Error: No ticker found for '{company_name}'"
+
+    tool = lambda name, func: timed_tool(traced(f"tool.{name}")(func))
+    finance_tools.YFinanceTool.fetch_snapshot = tool("YahooFinanceDataFetcher", fetch_snapshot)
+    finance_tools.AlphaVantageTool._run = tool("AlphaVantageDataFetcher", alpha_vantage)
+    finance_tools.InventoryCheckTool._run = tool("InventoryCompanyChecker", inventory_check)
+    finance_tools.SearchCompanyTool._run = tool("CompanyInfoSearch", search_company)
+    # The local listing index still answers first; only the Serper fallback is replaced
+    finance_tools.TickerLookupTool._search_ticker = search_ticker
+    return fixtures
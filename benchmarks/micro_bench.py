@@ -0,0 +1,235 @@
+# benchmarks/micro_bench.py
+"""Micro-benchmarks of the pure-CPU code that runs on every request, checked against a baseline.
+
+Cases (fixtures are fixed: the repo's data files, or generated with a fixed seed):
+    calculator.run                 CalculatorTool._run on an agent-formatted record (parse_currency in,
+                                   benefit engine, format_amount out)
+    formatting.parse_currency      1,000 formatted amounts in mixed styles
+    formatting.format_amount       1,000 raw values
+    structured_output.extract      extract_objects on a ~200 KB agent transcript
+    structured_output.parse        parse_output(FinancialDataOutput) on the same transcript
+    retrieval.load_chunks          loading vindex/combined_chunks_with_metadata.jsonl
+    retrieval.rank_ticker_matches  cosine ranking over a full-size (2 x 6,904 x 768) ticker matrix
+    retrieval.rank_normalized      the same ranking over the pre-normalized shared matrix
+
+Each case is timed with timeit (autoranged loops, --repeat runs) and the fastest run's time per
+call, the one least disturbed by other load, is kept. On a shared or virtualized machine a burst of
+background load can still last longer than one case, so all cases are measured --rounds times, one
+case after another in each round, and the median of a case's fastest times is what is stored and
+compared. --check fails when that median is more than --tolerance slower than micro_baseline.json.
+Baselines are machine-specific: refresh them with --update-baseline on the machine that checks.
+
+Usage (from the repo root):
+    python benchmarks/micro_bench.py --check
+    python benchmarks/micro_bench.py --filter structured_output --update-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Time the computation, not span writes
+os.environ.setdefault("TRACING", "0")
+
+import numpy as np
+
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "micro_baseline.json")
+FINANCE_FIXTURES = os.path.join(ROOT, "benchmarks", "loadtest", "fixtures", "finance.json")
+CHUNKS_FILE = os.path.join(ROOT, "vindex", "combined_chunks_with_metadata.jsonl")
+NAMES_FILE = os.path.join(ROOT, "company_names_symbols.json")
+
+CASES = {}
+
+
+def case(name):
+    """Register a setup function; it builds the fixtures and returns the zero-argument callable to time."""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def display_records():
+    from tools.financial_snapshot import FinancialSnapshot
+    with open(FINANCE_FIXTURES, "r", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    return [FinancialSnapshot.from_dict(entry["snapshot"]).to_display() for entry in fixtures.values()]
+
+
+def agent_transcript():
+    """A long collector-style transcript: thoughts, tool observations as Python reprs, then the final JSON."""
+    rng = random.Random(0)
+    words = "the company inventory revenue margin data fetch ticker check analysis retail {note} 'quoted'".split()
+    parts = []
+    for i, record in enumerate(display_records() * 20):
+        parts.append("Thought: " + " ".join(rng.choice(words) for _ in range(200)))
+        parts.append(f"Action: YahooFinanceDataFetcher\nAction Input: {{\"ticker\": \"{record['company']}\"}}")
+        parts.append(f"Observation: {record}")
+    parts.append("Final Answer: " + json.dumps(display_records()[0]))
+    return "\n".join(parts)
+
+
+@case("calculator.run")
+def bench_calculator():
+    from tools.finance_tools import CalculatorTool
+    tool = CalculatorTool()
+    record = display_records()[0]
+
+    def run():
+        # The tool prints its input and result; keep that cost but not the output
+        with contextlib.redirect_stdout(io.StringIO()):
+            tool._run(record)
+    return run
+
+
+@case("formatting.parse_currency")
+def bench_parse_currency():
+    from tools.formatting import parse_currency
+    rng = random.Random(0)
+    styles = ["USD {:.2f} B", "USD {:.2f} M", "USD -{:.2f} K", "€{:.1f} million", "{:,.0f}", "$ {:.2f}bn", "Not Available"]
+    values = [rng.choice(styles).format(rng.uniform(1, 999)) for _ in range(1000)]
+    return lambda: [parse_currency(value) for value in values]
+
+
+@case("formatting.format_amount")
+def bench_format_amount():
+    from tools.formatting import format_amount
+    rng = random.Random(0)
+    values = [rng.choice([-1, 1]) * 10 ** rng.uniform(0, 12) for _ in range(1000)]
+    return lambda: [format_amount(value) for value in values]
+
+
+@case("structured_output.extract")
+def bench_extract():
+    from structured_output import extract_objects
+    text = agent_transcript()
+    return lambda: extract_objects(text)
+
+
+@case("structured_output.parse")
+def bench_parse():
+    from structured_output import FinancialDataOutput, parse_output
+    text = agent_transcript()
+    return lambda: parse_output(text, FinancialDataOutput)
+
+
+@case("retrieval.load_chunks")
+def bench_load_chunks():
+    from retrieval_store import load_chunks
+    return lambda: load_chunks(CHUNKS_FILE)
+
+
+@case("retrieval.rank_ticker_matches")
+def bench_rank_ticker_matches():
+    from retrieval_store import rank_ticker_matches
+    with open(NAMES_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rng = np.random.default_rng(0)
+    # Same shape as company_embeddings.npy: bge-base vectors for every name, then every symbol
+    embeddings = rng.standard_normal((2 * len(data["names"]), 768), dtype=np.float32)
+    query = rng.standard_normal(768, dtype=np.float32)
+    return lambda: rank_ticker_matches(query, embeddings, data["names"], data["symbols"])
+
+
+@case("retrieval.rank_normalized")
+def bench_rank_normalized():
+    from retrieval_store import rank_ticker_matches
+    with open(NAMES_FILE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((2 * len(data["names"]), 768), dtype=np.float32)
+    # As written to ticker_embeddings.npy by retrieval_store.write_shared_assets
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    query = rng.standard_normal(768, dtype=np.float32)
+    return lambda: rank_ticker_matches(query, embeddings, data["names"], data["symbols"], normalized=True)
+
+
+def measure(func, repeat):
+    """(median, min) seconds per call."""
+    func()
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return statistics.median(per_call), min(per_call)
+
+
+def machine():
+    return {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "python": platform.python_version(), "numpy": np.__version__}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {"machine": None, "cases": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(args):
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    baseline = load_baseline(args.baseline)
+    if args.check and baseline["machine"] and baseline["machine"] != machine():
+        print(f"Warning: baseline was recorded on {baseline['machine']}, this is {machine()}")
+
+    funcs = {}
+    for name in names:
+        try:
+            funcs[name] = CASES[name]()
+        except ImportError as e:
+            print(f"{name:<32}  skipped: {e}")
+    # Interleaved, so a slow stretch of the machine hits one round of every case, not every round of one
+    timings = {name: [] for name in funcs}
+    for _ in range(max(1, args.rounds)):
+        for name, func in funcs.items():
+            timings[name].append(measure(func, args.repeat))
+
+    results, regressions = {}, []
+    print(f"{'case':<32}{'min':>12}{'median':>12}{'baseline':>12}{'change':>9}")
+    for name, rounds in timings.items():
+        median = statistics.median(median for median, _ in rounds)
+        fastest = statistics.median(fastest for _, fastest in rounds)
+        results[name] = {"median": median, "min": fastest}
+        reference = baseline["cases"].get(name)
+        change = fastest / reference["min"] - 1 if reference else None
+        line = f"{name:<32}{fastest * 1000:>10.3f}ms{median * 1000:>10.3f}ms"
+        if reference:
+            line += f"{reference['min'] * 1000:>10.3f}ms{change:>+9.1%}"
+        if change is not None and change > args.tolerance:
+            regressions.append(name)
+            line += "  REGRESSION"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"machine": machine(), "cases": results}, f, indent=2)
+    if args.update_baseline:
+        # Cases not run this time keep their previous numbers
+        baseline = {"machine": machine(), "cases": {**baseline["cases"], **results}}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    if args.check and regressions:
+        print(f"\nFAILED: {len(regressions)} case(s) more than {args.tolerance:.0%} slower than baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time CPU hot paths and compare them to a baseline.")
+    parser.add_argument("--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed runs per case and round")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over all cases; the median pass is compared")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--check", action="store_true", help="Exit non-zero when a case regressed past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown, as a fraction")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run's timings as the baseline")
+    parser.add_argument("--json", help="Also write this run's timings to this file")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+# benchmarks/prefill_bench.py
+"""Compare prompt prefill cost of the old and the split prompt layouts against a running Ollama server.
+
+old    one user message with the user's text inside the instructions (the query sits at the very
+       start of the persona prompt), as the agents used to send it
+split  the static instructions as a system message, the user's text in a short trailing message
+       (prompts.intent_messages / prompts.persona_messages)
+
+For each layout and prompt, a series of different inputs is sent with num_predict=1, so the request
+time is almost all prefill. Ollama reports how many prompt tokens it actually evaluated
+(prompt_eval_count) and how long that took; with the split layout only the first request should
+evaluate the whole prefix.
+
+Usage (from the repo root):
+    python benchmarks/prefill_bench.py
+    python benchmarks/prefill_bench.py --model llama3.2:1b --rounds 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from config import LLM_BASE_URL, TASK_MODELS
+from llm_gateway import ollama_model_name
+from prompts import INTENT_SYSTEM_PROMPT, PERSONA_SYSTEM_PROMPT, intent_messages, persona_messages
+
+INPUTS = [
+    "hi there",
+    "Calculate the ROI of Tesla",
+    "What is gross margin?",
+    "show me the financials of Nike",
+    "who built you?",
+    "tell me more about Walmart",
+    "2 + 3",
+    "you are the worst bot ever",
+]
+
+
+def old_intent_messages(text):
+    instructions = INTENT_SYSTEM_PROMPT.replace("the text in the user's message", "the following text", 1)
+    return [{"role": "user", "content": f"{instructions}\n\nText: {text}"}]
+
+
+def old_persona_messages(query):
+    first_line, rest = PERSONA_SYSTEM_PROMPT.split("\n", 1)
+    opening = first_line.replace("The user's query is given in the next message. I don’t have relevant info to answer it directly",
+                                 f"The user asked: '{query}'. I don’t have relevant info to answer this directly", 1)
+    return [{"role": "user", "content": f"{opening}\n{rest}"}]
+
+
+LAYOUTS = {
+    "intent": {"old": old_intent_messages, "split": intent_messages},
+    "persona": {"old": old_persona_messages, "split": persona_messages},
+}
+
+
+def prefill(model, messages):
+    started = time.perf_counter()
+    response = requests.post(f"{LLM_BASE_URL}/api/chat", json={
+        "model": model,
+        "messages": messages,
+        "stream": False,
+        "options": {"num_predict": 1, "temperature": 0}
+    }, timeout=300)
+    response.raise_for_status()
+    data = response.json()
+    return data.get("prompt_eval_count", 0), data.get("prompt_eval_duration", 0) / 1e9, time.perf_counter() - started
+
+
+def run(model, rounds):
+    for prompt, layouts in LAYOUTS.items():
+        for layout, build in layouts.items():
+            # Evict the prefix left by the previous layout so both start cold
+            prefill(model, [{"role": "user", "content": f"reset {prompt} {layout}"}])
+            tokens, prefill_seconds, wall = [], [], []
+            for _ in range(rounds):
+                for text in INPUTS:
+                    count, seconds, elapsed = prefill(model, build(text))
+                    tokens.append(count)
+                    prefill_seconds.append(seconds)
+                    wall.append(elapsed)
+            warm = slice(1, None)  # everything after the first (cold) request
+            print(f"{prompt:<8} {layout:<6} first: {tokens[0]:>5} tok {prefill_seconds[0] * 1000:8.1f}ms   "
+                  f"warm avg: {sum(tokens[warm]) / len(tokens[warm]):7.1f} tok "
+                  f"{sum(prefill_seconds[warm]) / len(prefill_seconds[warm]) * 1000:8.1f}ms prefill "
+                  f"{sum(wall[warm]) / len(wall[warm]) * 1000:8.1f}ms wall")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure prompt prefill for old vs split prompt layouts.")
+    parser.add_argument("--model", default=ollama_model_name(TASK_MODELS["intent"]), help="Ollama model name")
+    parser.add_argument("--rounds", type=int, default=2, help="Passes over the input list per layout")
+    args = parser.parse_args()
+    run(args.model, args.rounds)
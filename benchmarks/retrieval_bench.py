@@ -0,0 +1,202 @@
+# benchmarks/retrieval_bench.py
+"""Retrieval quality and latency on a labeled query set over the vindex corpus.
+
+Each case in fixtures/retrieval_cases.jsonl lists the pages (chunk metadata URLs) that answer the
+query; off-topic queries list none. Relevance is judged per page, so the labels stay valid when the
+corpus is re-chunked. Reported:
+    recall@k      share of a query's relevant pages among the top k chunks (answerable queries)
+    mrr           mean reciprocal rank of the first chunk from a relevant page
+    insufficient  share of queries that would end in INSUFFICIENT_CONTEXT. By default a query counts
+                  when its nearest chunk is farther than --max-distance; with --llm the answer prompt
+                  from main.py is run on the top 4 chunks instead
+    latency       query embedding and index search time, p50/p95/p99
+    index         build (--rebuild) or load time, vector count, serialized size, peak process RSS
+
+The report is written as JSON (--json) so runs can be diffed.
+
+Usage (from the repo root):
+    python benchmarks/retrieval_bench.py --json baseline.json
+    python benchmarks/retrieval_bench.py --rebuild --index-factory HNSW32 --json hnsw.json
+    python benchmarks/retrieval_bench.py --llm --json with_llm.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import faiss
+import numpy as np
+from langchain.embeddings import HuggingFaceEmbeddings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from retrieval_store import load_chunks
+
+CASES_FILE = os.path.join(ROOT, "benchmarks", "fixtures", "retrieval_cases.jsonl")
+ANSWER_TOP_K = 4  # chunks generate_retrieval_response passes to the answer prompt
+
+
+def load_cases(path=CASES_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def build_index(embedding_model, chunks, factory):
+    """Embed every chunk and build a faiss index from a factory string (e.g. "Flat", "HNSW32", "IVF64,Flat")."""
+    started = time.perf_counter()
+    vectors = np.array(embedding_model.embed_documents([chunk["content"] for chunk in chunks]), dtype=np.float32)
+    embed_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    index = faiss.index_factory(vectors.shape[1], factory)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index, {"embed_seconds": embed_seconds, "build_seconds": time.perf_counter() - started}
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(int(len(ordered) * q), len(ordered) - 1)] if ordered else 0.0
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "mean": sum(ordered) / len(ordered) if ordered else 0.0}
+
+
+def score(case, urls, ks):
+    """Recall@k per k and the reciprocal rank of the first relevant chunk for one query."""
+    relevant = set(case["relevant_urls"])
+    first = next((rank for rank, url in enumerate(urls, 1) if url in relevant), None)
+    recall = {k: len(relevant & set(urls[:k])) / len(relevant) for k in ks}
+    return recall, 1.0 / first if first else 0.0
+
+
+def insufficient_by_llm(agent_pool, case, contexts):
+    """Run the retrieval answer prompt as main.py does and report whether it declined."""
+    from prompts import retrieval_answer_prompt, RETRIEVAL_ANSWER_EXPECTED_OUTPUT
+    with agent_pool.acquire() as agents:
+        description = retrieval_answer_prompt(case["query"], "\n".join(contexts), is_question=True)
+        result = agents.kickoff("answer", [agents.text_analyzer.create_task(description, RETRIEVAL_ANSWER_EXPECTED_OUTPUT)], verbose=False)
+    return result.tasks_output[0].raw.strip() == "INSUFFICIENT_CONTEXT"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    cases = load_cases(args.cases)
+    ks = sorted(int(k) for k in args.k.split(","))
+    top_k = max(ks + [ANSWER_TOP_K])
+
+    embedding_model = HuggingFaceEmbeddings(model_name=args.embedding_model)
+    chunks = load_chunks(args.chunks)
+    if args.rebuild:
+        index, build = build_index(embedding_model, chunks, args.index_factory)
+    else:
+        started = time.perf_counter()
+        index = faiss.read_index(args.index)
+        build = {"load_seconds": time.perf_counter() - started}
+    if index.ntotal != len(chunks):
+        raise SystemExit(f"Index has {index.ntotal} vectors but {args.chunks} has {len(chunks)} chunks")
+
+    agent_pool = None
+    if args.llm:
+        from agents import AgentPool
+        agent_pool = AgentPool(size=1)
+
+    # Load the model weights before timing queries
+    embedding_model.embed_query("warm up")
+
+    rows, embed_times, search_times = [], [], []
+    for repeat in range(args.repeat):
+        for case in cases:
+            started = time.perf_counter()
+            query_vector = np.array([embedding_model.embed_query(case["query"])], dtype=np.float32)
+            embedded = time.perf_counter()
+            distances, indices = index.search(query_vector, top_k)
+            searched = time.perf_counter()
+            embed_times.append(embedded - started)
+            search_times.append(searched - embedded)
+            if repeat > 0:
+                continue  # later passes only add latency samples
+            hits = [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if 0 <= i < len(chunks)]
+            urls = [chunks[i]["metadata"].get("url") for i, _ in hits]
+            row = {"query": case["query"], "answerable": case["answerable"], "top_urls": urls[:max(ks)],
+                   "top_distance": hits[0][1] if hits else None}
+            if case["answerable"]:
+                row["recall"], row["reciprocal_rank"] = score(case, urls, ks)
+            if args.llm:
+                row["insufficient"] = insufficient_by_llm(agent_pool, case, [chunks[i]["content"] for i, _ in hits[:ANSWER_TOP_K]])
+            else:
+                row["insufficient"] = not hits or hits[0][1] > args.max_distance
+            rows.append(row)
+
+    answerable = [row for row in rows if row["answerable"]]
+    unanswerable = [row for row in rows if not row["answerable"]]
+    rate = lambda group: sum(row["insufficient"] for row in group) / len(group) if group else None
+    return {
+        "config": {
+            "commit": git_commit(), "cases": len(cases), "embedding_model": args.embedding_model,
+            "index": args.index_factory if args.rebuild else args.index, "chunks": args.chunks,
+            "k": ks, "repeat": args.repeat, "insufficient_method": "llm" if args.llm else f"distance>{args.max_distance}"
+        },
+        "quality": {
+            **{f"recall@{k}": sum(row["recall"][k] for row in answerable) / len(answerable) for k in ks},
+            "mrr": sum(row["reciprocal_rank"] for row in answerable) / len(answerable)
+        },
+        "insufficient_context": {
+            "rate": rate(rows), "answerable_rate": rate(answerable), "unanswerable_rate": rate(unanswerable)
+        },
+        "latency": {
+            "embed": percentiles(embed_times), "search": percentiles(search_times),
+            "total": percentiles([e + s for e, s in zip(embed_times, search_times)])
+        },
+        "index": {
+            **build, "vectors": int(index.ntotal), "dimension": int(index.d),
+            "index_bytes": int(faiss.serialize_index(index).nbytes),
+            "chunks_bytes": os.path.getsize(args.chunks),
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        },
+        "queries": rows
+    }
+
+
+def print_report(report):
+    config, quality, insufficient = report["config"], report["quality"], report["insufficient_context"]
+    print(f"{config['cases']} queries, index {config['index']}, {config['embedding_model']} (commit {config['commit']})")
+    print("  " + "  ".join(f"{name}={value:.3f}" for name, value in quality.items()))
+    print(f"  insufficient context ({config['insufficient_method']}): {insufficient['rate']:.1%} "
+          f"[answerable {insufficient['answerable_rate']:.1%}, off-topic {insufficient['unanswerable_rate'] or 0:.1%}]")
+    for name, stats in report["latency"].items():
+        print(f"  {name:<7} p50={stats['p50'] * 1000:.1f}ms p95={stats['p95'] * 1000:.1f}ms p99={stats['p99'] * 1000:.1f}ms")
+    index = report["index"]
+    timing = ", ".join(f"{key}={value:.2f}s" for key, value in index.items() if key.endswith("_seconds"))
+    print(f"  index: {index['vectors']} x {index['dimension']}, {index['index_bytes'] / 2**20:.1f} MiB, "
+          f"chunks {index['chunks_bytes'] / 2**20:.1f} MiB, peak RSS {index['peak_rss_mb']:.0f} MiB, {timing}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure retrieval quality and latency on a labeled query set.")
+    parser.add_argument("--cases", default=CASES_FILE)
+    parser.add_argument("--index", default=os.path.join(ROOT, "vindex", "combined_index.index"))
+    parser.add_argument("--chunks", default=os.path.join(ROOT, "vindex", "combined_chunks_with_metadata.jsonl"))
+    parser.add_argument("--embedding-model", default="BAAI/bge-base-en")
+    parser.add_argument("--rebuild", action="store_true", help="Embed the chunks and build a new index instead of loading --index")
+    parser.add_argument("--index-factory", default="Flat", help="faiss index_factory string used with --rebuild")
+    parser.add_argument("--k", default="1,3,4,10", help="Cut-offs for recall@k")
+    parser.add_argument("--max-distance", type=float, default=0.5, help="Nearest-chunk L2 distance above which a query counts as insufficient")
+    parser.add_argument("--llm", action="store_true", help="Judge insufficient context with the answer prompt (needs the LLM server)")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query set for latency samples")
+    parser.add_argument("--json", help="Write the full report, including per-query rows, to this file")
+    args = parser.parse_args()
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
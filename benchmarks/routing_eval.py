@@ -0,0 +1,176 @@
+# benchmarks/routing_eval.py
+"""Check that the model routed to each task (config.TASK_MODELS) still meets accuracy on a fixture set.
+
+Tasks:
+    intent     detect_question verdicts (is_question + company) on fixtures/intent_cases.jsonl.
+               Cases marked "prompt_example" are the few-shot examples from the prompt itself;
+               "holdout" cases are not in the prompt.
+    formatter  formatter output on fixtures/formatter_cases.jsonl, compared field by field
+               (monetary values within 1%).
+    route      PredefinedRouter on fixtures/route_cases.jsonl: the canned questions, paraphrases
+               that should get their answer, and near-miss company queries (PriceSmart Inc,
+               "Brief a bit about Walmart?") that must fall through. Scored at
+               PREDEFINED_MIN_SIMILARITY, followed by a threshold sweep that reports the range
+               scoring best; set PREDEFINED_MIN_SIMILARITY from it. --model picks the embedding
+               model (default: the retrieval agent's).
+
+Usage (from the repo root, with the LLM server running):
+    python benchmarks/routing_eval.py
+    python benchmarks/routing_eval.py --task intent --model llama3.2:1b --min-accuracy 0.9
+    python benchmarks/routing_eval.py --task route
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Score fresh generations, not cached replies
+os.environ["LLM_CACHE_TASKS"] = ""
+
+from crewai import Crew, Process
+from agents import DataFormatterAgent
+from config import TASK_MODELS, llm_for
+from intent import detect_question
+from predefined import PredefinedRouter
+from structured_output import FinancialDataOutput, parse_output
+from tools.financial_snapshot import MONETARY_FIELDS
+from tools.formatting import parse_currency
+from tools.ticker_index import TickerIndex
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# RetrievalAgent's embedding model, which the app's router uses
+ROUTE_EMBEDDING_MODEL = "BAAI/bge-base-en"
+
+
+def load_cases(name):
+    with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def same_company(actual, expected):
+    normalize = lambda value: str(value).strip().lower() if value else None
+    return normalize(actual) == normalize(expected)
+
+
+def same_value(field, actual, expected):
+    if str(expected) == "Not Available" or str(actual) == "Not Available":
+        return str(actual) == str(expected)
+    if field in MONETARY_FIELDS:
+        expected_number, actual_number = parse_currency(expected), parse_currency(actual)
+        return abs(actual_number - expected_number) <= 0.01 * abs(expected_number)
+    if field in ("Headcount Old", "gross_profit_percentage"):
+        try:
+            return abs(float(str(actual).replace(",", "").rstrip("%")) - float(str(expected).replace(",", ""))) < 0.01
+        except ValueError:
+            return False
+    return str(actual).strip().lower() == str(expected).strip().lower()
+
+
+def eval_intent(model):
+    llm = llm_for("intent", model=model)
+    results = []
+    for case in load_cases("intent_cases.jsonl"):
+        started = time.perf_counter()
+        verdict = detect_question(case["text"], llm)
+        elapsed = time.perf_counter() - started
+        correct = verdict["is_question"] == case["is_question"] and same_company(verdict["company"], case["company"])
+        if not correct:
+            print(f"  intent miss: {case['text']!r} -> {verdict}, expected is_question={case['is_question']}, company={case['company']}")
+        results.append({"split": case.get("split", "holdout"), "correct": correct, "seconds": elapsed})
+    return results
+
+
+def eval_formatter(model):
+    agent = DataFormatterAgent(llm_for("formatter", FinancialDataOutput, model=model))
+    results = []
+    for case in load_cases("formatter_cases.jsonl"):
+        task = agent.create_task(case["collected"])
+        started = time.perf_counter()
+        output = Crew(agents=[agent.agent], tasks=[task], process=Process.sequential).kickoff().tasks_output[0]
+        elapsed = time.perf_counter() - started
+        record = parse_output(output, FinancialDataOutput) or {}
+        wrong = [field for field, expected in case["expected"].items() if not same_value(field, record.get(field, "Not Available"), expected)]
+        if wrong:
+            print(f"  formatter miss for {case['expected']['company']}: {', '.join(f'{f}={record.get(f)!r}' for f in wrong)}")
+        results.append({"split": "holdout", "correct": not wrong, "seconds": elapsed})
+    return results
+
+
+def routed(closest, threshold):
+    question, score, exact = closest
+    return question if exact or (question is not None and score >= threshold) else None
+
+
+def threshold_sweep(scored, step=0.005):
+    """(best accuracy, lowest and highest threshold of the widest run of thresholds reaching it)."""
+    thresholds = [round(0.5 + i * step, 3) for i in range(int(0.5 / step) + 1)]
+    accuracy = [sum(routed(closest, t) == expected for closest, expected in scored) / len(scored) for t in thresholds]
+    best = max(accuracy)
+    runs, start = [], None
+    for i, value in enumerate(accuracy + [None]):
+        if value == best and start is None:
+            start = i
+        elif value != best and start is not None:
+            runs.append((start, i - 1))
+            start = None
+    low, high = max(runs, key=lambda run: run[1] - run[0])
+    return best, thresholds[low], thresholds[high]
+
+
+def eval_route(model):
+    from langchain.embeddings import HuggingFaceEmbeddings
+    router = PredefinedRouter(HuggingFaceEmbeddings(model_name=model or ROUTE_EMBEDDING_MODEL),
+                              company_lookup=TickerIndex().lookup)
+    results, scored = [], []
+    for case in load_cases("route_cases.jsonl"):
+        started = time.perf_counter()
+        closest = router.closest(case["text"])
+        elapsed = time.perf_counter() - started
+        scored.append((closest, case["question"]))
+        actual = routed(closest, router.min_similarity)
+        if actual != case["question"]:
+            print(f"  route miss: {case['text']!r} -> {actual!r} (closest {closest[0]!r}, score {closest[1]:.3f}), expected {case['question']!r}")
+        results.append({"split": case["split"], "correct": actual == case["question"], "seconds": elapsed})
+    best, low, high = threshold_sweep(scored)
+    print(f"  threshold sweep: best accuracy {best:.1%} for PREDEFINED_MIN_SIMILARITY in [{low:.3f}, {high:.3f}]"
+          f" (suggested {(low + high) / 2:.3f}); current {router.min_similarity}")
+    return results
+
+
+TASKS = {"intent": eval_intent, "formatter": eval_formatter, "route": eval_route}
+
+
+def report(task, model, results):
+    times = sorted(r["seconds"] for r in results)
+    accuracy = sum(r["correct"] for r in results) / len(results)
+    splits = {}
+    for r in results:
+        splits.setdefault(r["split"], []).append(r["correct"])
+    by_split = ", ".join(f"{split} {sum(c) / len(c):.0%} ({len(c)})" for split, c in sorted(splits.items()))
+    print(f"{task:<10} model={model}  accuracy={accuracy:.1%} [{by_split}]  "
+          f"latency avg={sum(times) / len(times):.2f}s p95={times[int(len(times) * 0.95)]:.2f}s")
+    return accuracy
+
+
+def main(args):
+    tasks = list(TASKS) if args.task == "all" else [args.task]
+    failed = []
+    for task in tasks:
+        model = args.model or (ROUTE_EMBEDDING_MODEL if task == "route" else TASK_MODELS[task])
+        accuracy = report(task, model, TASKS[task](args.model))
+        if accuracy < args.min_accuracy:
+            failed.append(task)
+    if failed:
+        print(f"Below {args.min_accuracy:.0%} accuracy: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate routed task models on fixture sets.")
+    parser.add_argument("--task", choices=["all"] + list(TASKS), default="all")
+    parser.add_argument("--model", help="Evaluate this model instead of the routed one (e.g. a smaller candidate)")
+    parser.add_argument("--min-accuracy", type=float, default=0.9, help="Exit non-zero if a task scores below this")
+    sys.exit(main(parser.parse_args()))
@@ -1,14 +1,61 @@
 # config.py
 from crewai import LLM
 from dotenv import load_dotenv
+from llm_gateway import LLMGateway, GatewayLLM
+from llm_cache import LLMCache, parse_cache_tasks
 import os
 
 load_dotenv()
 
-# Define the LLM here. In my local I'm using ollama deepseek model
-llm_client = LLM(
-    model=os.getenv("MODEL_NAME"),
-    base_url="http://localhost:11434", # needed it only if using ollama
-    api_key="ollama" #while running local model, a dummy api key is reuired.
-)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "http://localhost:11434") # needed it only if using ollama
+MODEL_NAME = os.getenv("MODEL_NAME")
+
+# Model per task. Classification and fixed-shape JSON run fine on a small model; anything left
+# unset uses MODEL_NAME.
+TASK_MODELS = {
+    "intent": os.getenv("INTENT_MODEL_NAME") or MODEL_NAME,
+    "answer": os.getenv("ANSWER_MODEL_NAME") or MODEL_NAME,
+    "collector": os.getenv("COLLECTOR_MODEL_NAME") or MODEL_NAME,
+    "formatter": os.getenv("FORMATTER_MODEL_NAME") or MODEL_NAME,
+    "calculator": os.getenv("CALCULATOR_MODEL_NAME") or MODEL_NAME,
+    "summary": os.getenv("SUMMARY_MODEL_NAME") or MODEL_NAME,
+}
+
+# Every agent's calls go through one gateway: bounded concurrency, priorities, wait-time stats
+llm_gateway = LLMGateway()
+
+# Tasks whose repeated prompts are answered from the response cache, as task[:variants]. Only the
+# fixed-shape outputs are cached by default; free-text tasks (summary, answer) are opt-in, e.g.
+# "intent,formatter,summary,answer:3", where the answers keep a few variants so a repeated greeting
+# does not always get the same reply.
+LLM_CACHE_TASKS = parse_cache_tasks(os.getenv("LLM_CACHE_TASKS", "intent,formatter"))
+llm_cache = LLMCache() if LLM_CACHE_TASKS else None
+
+_llms = {}
 
+
+def llm_for(task, response_format=None, model=None):
+    """Shared gateway LLM for a task (see TASK_MODELS); `model` overrides the routed model, e.g. for evaluation.
+
+    A response_format constrains output to a pydantic schema (Ollama's structured outputs). Only use it for
+    agents without tools: it would also constrain their tool-calling turns.
+    """
+    model = model or TASK_MODELS[task]
+    key = (task, model, response_format)
+    if key not in _llms:
+        _llms[key] = GatewayLLM(
+            LLM(
+                model=model,
+                base_url=LLM_BASE_URL,
+                api_key="ollama", #while running local model, a dummy api key is reuired.
+                **({"response_format": response_format} if response_format else {})
+            ),
+            llm_gateway,
+            cache=llm_cache if task in LLM_CACHE_TASKS else None,
+            cache_variants=LLM_CACHE_TASKS.get(task, 1)
+        )
+    return _llms[key]
+
+
+# Define the LLM here. In my local I'm using ollama deepseek model
+llm_client = llm_for("answer")
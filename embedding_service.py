@@ -0,0 +1,113 @@
+# embedding_service.py
+"""Micro-batching front for the embedding model and the faiss index.
+
+Each request embeds one short text (a question, a company name). Run one at a time, those calls
+leave most of the transformer's batch throughput unused. EmbeddingService queues the texts from
+all threads. A single worker thread takes the first waiting text, collects more for up to
+EMBED_MAX_WAIT_MS or until EMBED_MAX_BATCH texts are queued, and embeds them in one
+embed_documents call. It only waits while requests are arriving concurrently (the previous batch
+held more than one), so a lone request is not delayed. The texts that also need a
+nearest-neighbour search share one multi-query index.search. Each caller blocks on its own future
+and gets only its own row back.
+
+EMBED_MAX_BATCH=1 turns batching off; the calls still go through the one worker thread.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from metrics import EMBED_BATCH_SIZE, EMBED_BATCH_SECONDS, EMBED_WAIT_SECONDS
+
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", 32))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", 5))
+
+
+@dataclass
+class EmbeddingRequest:
+    text: str
+    top_k: int = 0  # > 0: also search the index
+    future: Future = field(default_factory=Future)
+    queued_at: float = field(default_factory=time.perf_counter)
+
+
+class EmbeddingService:
+    """Thread-safe, batched embed_query and index search; also usable wherever an embedding model is expected."""
+
+    def __init__(self, embedding_model, index=None, max_batch=EMBED_MAX_BATCH, max_wait_ms=EMBED_MAX_WAIT_MS):
+        self.embedding_model = embedding_model
+        self.index = index
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._last_batch_size = 1
+        self._worker = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._worker.start()
+
+    def embed(self, text):
+        """The text's embedding as a float32 vector."""
+        return self._submit(EmbeddingRequest(text)).result()
+
+    def search(self, text, top_k):
+        """(distances, indices) of the text's top_k nearest index vectors, as index.search returns them for one query."""
+        if self.index is None:
+            raise RuntimeError("EmbeddingService was created without an index")
+        _, distances, indices = self._submit(EmbeddingRequest(text, top_k)).result()
+        return distances, indices
+
+    # Same interface as the langchain embeddings, so the service can be passed in their place
+    def embed_query(self, text):
+        return self.embed(text).tolist()
+
+    def embed_documents(self, texts):
+        # Already a batch; no need to queue it
+        return self.embedding_model.embed_documents(texts)
+
+    def _submit(self, request):
+        self._queue.put(request)
+        return request.future
+
+    def _next_batch(self):
+        """Block for the first request, then gather more until the batch is full or max_wait has passed."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + (self.max_wait if self._last_batch_size > 1 else 0.0)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._last_batch_size = len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            for request in batch:
+                EMBED_WAIT_SECONDS.observe(started - request.queued_at)
+            EMBED_BATCH_SIZE.observe(len(batch))
+            try:
+                with EMBED_BATCH_SECONDS.time():
+                    self._process(batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _process(self, batch):
+        vectors = np.asarray(self.embedding_model.embed_documents([request.text for request in batch]), dtype=np.float32)
+        searches = [i for i, request in enumerate(batch) if request.top_k > 0]
+        if searches:
+            top_k = max(batch[i].top_k for i in searches)
+            distances, indices = self.index.search(vectors[searches], top_k)
+            for row, i in enumerate(searches):
+                k = batch[i].top_k
+                batch[i].future.set_result((vectors[i], distances[row:row + 1, :k], indices[row:row + 1, :k]))
+        for i, request in enumerate(batch):
+            if request.top_k <= 0:
+                request.future.set_result(vectors[i])
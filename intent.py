@@ -0,0 +1,41 @@
+# intent.py
+"""Intent detection: is the user's text a question, and does it name a company?"""
+from config import llm_for
+from llm_gateway import llm_priority
+from metrics import PARSE_FAILURES
+from tracing import traced
+from app_logging import get_logger
+from prompts import intent_messages
+from structured_output import extract_objects
+
+logger = get_logger("intent")
+
+
+def parse_intent(raw_output: str, text: str) -> dict:
+    """Read the LLM's verdict, falling back to a keyword heuristic when it is not parseable."""
+    outputs = [output for output in extract_objects(raw_output) if "is_question" in output]
+    if outputs:
+        return {
+            "is_question": outputs[0]["is_question"],
+            "company": outputs[0].get("company")
+        }
+    logger.warning("Error parsing intent output, using the keyword heuristic", extra={"fields": {"raw_output": raw_output}})
+    PARSE_FAILURES.inc(schema="intent")
+    words = text.split()
+    is_question = text.strip().endswith("?") or len(words) > 1 and words[0].lower() in ["what", "how", "why", "when", "where", "who"]
+    company = None
+    for i, word in enumerate(words):
+        if i > 0 and word[0].isupper() and words[i-1].lower() in ["of", "for", "about"]:
+            company = word
+            break
+    return {"is_question": is_question, "company": company}
+
+
+@traced("intent.detect_question")
+def detect_question(text: str, llm=None) -> dict:
+    """Classify text with the intent model; the static instructions go first so the server can reuse their cache."""
+    llm = llm or llm_for("intent")
+    with llm_priority("intent"):
+        raw_output = str(llm.call(intent_messages(text))).strip()
+    logger.debug("Intent output", extra={"fields": {"text": text, "raw_output": raw_output}})
+    return parse_intent(raw_output, text)
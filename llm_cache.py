@@ -0,0 +1,127 @@
+# llm_cache.py
+"""Exact-match cache of LLM responses.
+
+Requesting the same ticker twice sends the formatter and summary agents identical prompts, and
+greetings reach the persona fallback word for word. A response is stored under the hash of
+(model, messages, parameters) in a small SQLite file, so a repeated prompt is answered from disk
+instead of being generated again. Entries expire after LLM_CACHE_TTL seconds and the file keeps at
+most LLM_CACHE_MAX_ENTRIES rows, dropping the oldest first.
+
+The file is created on first use and opened in WAL mode with a busy timeout, since several workers
+(serve_workers.py) share it. The cache is best-effort: a failed read is a miss and a failed write is
+logged and dropped, never turned into a failed LLM call.
+
+Prompts whose replies are meant to vary can keep a pool of variants: the first `variants` calls
+for a prompt are generated and stored, later calls return one of them at random.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from app_logging import get_logger
+
+logger = get_logger("llm_cache")
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 86400))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 30))
+
+
+def parse_cache_tasks(value):
+    """'intent,summary,answer:3' -> {"intent": 1, "summary": 1, "answer": 3} (task -> variants kept per prompt)."""
+    tasks = {}
+    for item in filter(None, (part.strip() for part in (value or "").split(","))):
+        task, _, variants = item.partition(":")
+        tasks[task.strip()] = max(1, int(variants)) if variants else 1
+    return tasks
+
+
+def cache_key(model, messages, params):
+    payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Thread-safe, size-bounded SQLite store of LLM responses with a TTL."""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connection(self):
+        """The database, opened on first use so importing the config does not create the file. Call under the lock."""
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            # Readers do not block the writer, and writers from other workers wait instead of failing
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT NOT NULL, variant INTEGER NOT NULL, response TEXT NOT NULL, stored_at REAL NOT NULL,"
+                " PRIMARY KEY (key, variant))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get(self, key, variants=1):
+        """Return a stored response, or None when there is none or the variant pool is not full yet."""
+        with self._lock:
+            try:
+                rows = self._connection().execute(
+                    "SELECT response FROM responses WHERE key = ? AND stored_at >= ?",
+                    (key, time.time() - self.ttl)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache read failed: {str(e)}")
+                rows = []
+            if len(rows) < variants:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return random.choice(rows)[0]
+
+    def put(self, key, response, variants=1):
+        try:
+            self._put(key, response, variants)
+        except sqlite3.Error as e:
+            # The response was generated fine; losing its cache entry must not fail the call
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _put(self, key, response, variants):
+        with self._lock:
+            db = self._connection()
+            now = time.time()
+            db.execute("DELETE FROM responses WHERE stored_at < ?", (now - self.ttl,))
+            count, next_variant = db.execute(
+                "SELECT COUNT(*), COALESCE(MAX(variant) + 1, 0) FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            # A full pool (e.g. after variants was lowered) has its oldest variant replaced
+            variant = next_variant if count < variants else db.execute(
+                "SELECT variant FROM responses WHERE key = ? ORDER BY stored_at LIMIT 1", (key,)
+            ).fetchone()[0]
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, variant, response, stored_at) VALUES (?, ?, ?, ?)",
+                (key, variant, response, now)
+            )
+            db.execute(
+                "DELETE FROM responses WHERE rowid IN ("
+                " SELECT rowid FROM responses ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            db.commit()
+
+    def snapshot(self):
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,209 @@
+# llm_gateway.py
+"""Gateway in front of the local LLM server.
+
+Every agent's LLM calls pass through one LLMGateway, which
+- limits concurrent calls to LLM_MAX_IN_FLIGHT (match it to Ollama's OLLAMA_NUM_PARALLEL), so
+  requests queue here instead of piling up inside the server,
+- hands free slots out by priority: intent checks, then answers, then summaries, then "batch",
+  FIFO within a priority. "batch" is for LLM work nobody is waiting on; the batch ROI paths
+  (batch_roi.py, materialize_roi.py) only fetch data and run the benefit engine, so they never
+  take a slot,
+- keeps the model resident by re-pinning it with Ollama's keep_alive while the app runs,
+- records queue wait times per priority (see snapshot()).
+
+Tasks listed in LLM_CACHE_TASKS also answer repeated prompts from an LLMCache (see llm_cache.py).
+
+The priority of a call comes from the llm_priority() context, which also carries over into the
+worker threads crews run in.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any
+import requests
+from crewai.llms.base_llm import BaseLLM
+from app_logging import get_logger
+from llm_cache import cache_key
+from metrics import LLM_CACHE_LOOKUPS, LLM_GENERATION_SECONDS, LLM_QUEUE_SECONDS
+from tracing import span
+
+logger = get_logger("llm_gateway")
+
+PRIORITIES = {"intent": 0, "answer": 1, "summary": 2, "batch": 3}
+DEFAULT_PRIORITY = "answer"
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 1))
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+LLM_KEEP_WARM_INTERVAL = float(os.getenv("LLM_KEEP_WARM_INTERVAL", 240))
+
+current_priority = contextvars.ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+
+
+@contextmanager
+def llm_priority(priority):
+    """Run the LLM calls made inside the block (including crews kicked off from it) at this priority."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority '{priority}'. Expected one of: {', '.join(PRIORITIES)}")
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class LLMGateway:
+    """Priority-ordered concurrency limiter with wait-time statistics."""
+
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, window=1000):
+        self.max_in_flight = max(1, max_in_flight)
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority rank, sequence)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._waits = {name: deque(maxlen=window) for name in PRIORITIES}
+        self._calls = {name: 0 for name in PRIORITIES}
+
+    @contextmanager
+    def slot(self, priority=None):
+        """Block until a call slot is free and no higher-priority call is waiting, then hold it; yields the seconds waited."""
+        priority = priority or current_priority.get()
+        ticket = (PRIORITIES[priority], next(self._sequence))
+        queued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while self._in_flight >= self.max_in_flight or self._queue[0] != ticket:
+                    self._cond.wait()
+            except BaseException:
+                # Interrupted while queued: a ticket left behind would block everyone after it
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            waited = time.monotonic() - queued_at
+            self._waits[priority].append(waited)
+            LLM_QUEUE_SECONDS.observe(waited, priority=priority)
+            self._calls[priority] += 1
+            # The next ticket in line may fit into a remaining slot
+            self._cond.notify_all()
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def snapshot(self):
+        """Queue state and wait-time statistics (seconds) per priority."""
+        with self._cond:
+            stats = {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "priorities": {}
+            }
+            for name, waits in self._waits.items():
+                ordered = sorted(waits)
+                stats["priorities"][name] = {
+                    "calls": self._calls[name],
+                    "wait_avg": sum(ordered) / len(ordered) if ordered else 0.0,
+                    "wait_p50": ordered[len(ordered) // 2] if ordered else 0.0,
+                    "wait_p95": ordered[int(len(ordered) * 0.95)] if ordered else 0.0,
+                    "wait_max": ordered[-1] if ordered else 0.0
+                }
+        return stats
+
+
+class GatewayLLM(BaseLLM):
+    """crewai LLM that runs every call of a wrapped LLM through an LLMGateway slot.
+
+    With an LLMCache, plain completions (no tools) are looked up by prompt hash first; a hit skips the
+    gateway entirely. cache_variants > 1 keeps that many different replies per prompt.
+    """
+
+    inner: Any = None
+    gateway: Any = None
+    cache: Any = None
+    cache_variants: int = 1
+
+    def __init__(self, inner, gateway, cache=None, cache_variants=1, **kwargs):
+        super().__init__(model=inner.model, temperature=inner.temperature, **kwargs)
+        self.inner = inner
+        self.gateway = gateway
+        self.cache = cache
+        self.cache_variants = cache_variants
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None, response_model=None):
+        # Agents set their stop words on the LLM they were given; hand them to the wrapped one
+        if self.stop and self.inner.stop != self.stop:
+            self.inner.stop = list(self.stop)
+        priority = current_priority.get()
+        with span("llm.call", model=self.model, priority=priority) as trace:
+            key = None
+            if self.cache is not None and not tools and not available_functions:
+                key = cache_key(self.model, messages, {
+                    "temperature": self.inner.temperature,
+                    "stop": self.inner.stop,
+                    "response_format": getattr(self.inner, "response_format", None),
+                    "response_model": response_model
+                })
+                cached = self.cache.get(key, self.cache_variants)
+                LLM_CACHE_LOOKUPS.inc(model=self.model, outcome="miss" if cached is None else "hit")
+                trace.set(cache="miss" if cached is None else "hit")
+                if cached is not None:
+                    return cached
+            with self.gateway.slot() as waited, LLM_GENERATION_SECONDS.time(model=self.model, priority=priority):
+                trace.set(queue_wait=round(waited, 4))
+                response = self.inner.call(
+                    messages, tools=tools, callbacks=callbacks, available_functions=available_functions,
+                    from_task=from_task, from_agent=from_agent, response_model=response_model
+                )
+            if key is not None and isinstance(response, str) and response.strip():
+                self.cache.put(key, response, self.cache_variants)
+            return response
+
+    async def acall(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None, from_agent=None, response_model=None):
+        return await asyncio.to_thread(
+            self.call, messages, tools, callbacks, available_functions, from_task, from_agent, response_model
+        )
+
+    def supports_function_calling(self) -> bool:
+        return self.inner.supports_function_calling()
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+
+def ollama_model_name(model):
+    """'ollama/llama3' -> 'llama3'."""
+    return model.split("/", 1)[1] if model and model.startswith("ollama/") else model
+
+
+def keep_warm(base_url, models, keep_alive=LLM_KEEP_ALIVE, interval=LLM_KEEP_WARM_INTERVAL):
+    """Background thread that loads the models and re-pins them with keep_alive, so they are not unloaded between requests."""
+    models = sorted(set(filter(None, models)))
+
+    def pin():
+        while True:
+            for model in models:
+                try:
+                    # An empty generate request only loads the model and resets its keep-alive timer
+                    requests.post(f"{base_url}/api/generate", json={"model": ollama_model_name(model), "keep_alive": keep_alive}, timeout=60)
+                except requests.RequestException as e:
+                    logger.warning(f"Could not pin model '{model}': {str(e)}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=pin, name="llm-keep-warm", daemon=True)
+    thread.start()
+    return thread
@@ -1,18 +1,37 @@
+from app_logging import setup_logging, stop_logging, get_logger
+from tracing import setup_tracing, span
+
+# This is the entry point: start the log pipeline and the trace writer before the modules below
+# log while loading their models and data
+setup_logging()
+setup_tracing()
+
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from crewai import Crew, Process, Agent, Task
-from agents import DataCollectorAgent, DataFormatterAgent, SummaryGeneratorAgent, BenefitCalculatorAgent
-from retrieval_agent import RetrievalAgent
+from agents import AgentPool
+from retrieval_agent import retrieval_agent_instance
+from predefined import PredefinedRouter
 from tools import FinanceTools
+from tools.roi_table import RoiTable
+from tools.financial_snapshot import FinancialSnapshot
+from structured_output import parse_output, FinancialDataOutput, BenefitsOutput
+from intent import detect_question
+from config import llm_for, llm_cache, llm_gateway, LLM_BASE_URL, TASK_MODELS
+from prompts import persona_messages, retrieval_answer_prompt, RETRIEVAL_ANSWER_EXPECTED_OUTPUT
+from llm_gateway import llm_priority, keep_warm
+from pipeline import CheckpointStore, StageFailed, run_stage
+from singleflight import SingleFlight
+from metrics import registry, STAGE_SECONDS
+from batch_roi import run_batch, parse_tickers, BATCH_CONCURRENCY, MAX_BATCH_SIZE
+import asyncio
+import hashlib
 import json
 import os
-import re
-import time
+import uuid
 from dotenv import load_dotenv
-from config import llm_client
-import logging
-from logging.handlers import TimedRotatingFileHandler
+import numpy as np
 from datetime import datetime
 
 # Load environment variables
@@ -21,48 +40,37 @@ load_dotenv()
 # Set up FastAPI app
 app = FastAPI()
 app.mount("/static", StaticFiles(directory="static"), name="static")
+os.makedirs("logs", exist_ok=True)
 app.mount("/logs", StaticFiles(directory="logs"), name="logs")
 templates = Jinja2Templates(directory="templates")
 
 # Initialize tools and agents
 finance_tools = FinanceTools()
-retrieval_agent = RetrievalAgent()
+# The module's instance: a second RetrievalAgent would load another copy of the embedding model
+retrieval_agent = retrieval_agent_instance
+# Canned answers to common questions, matched with the retrieval embedding model
+predefined_router = PredefinedRouter(retrieval_agent.embedding_service,
+                                     company_lookup=finance_tools.ticker_lookup_tool.ticker_index.lookup)
+# Precomputed benefits from materialize_roi.py; None when no table has been built yet
+roi_table = RoiTable.load(finance_tools.calculator_tool.engine, finance_tools.calculator_tool.benefit_mapping)
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
-
-# Configure logging
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-# Custom function to generate daily filename
-def daily_log_filename():
-    return os.path.join(log_dir, datetime.now().strftime("%Y-%m-%d.log"))
-
-# Use TimedRotatingFileHandler with a base filename that will rotate
-log_handler = TimedRotatingFileHandler(
-    filename=daily_log_filename(),  # Initial filename, e.g., 2025-03-10.log
-    when="midnight",  # Rotate at midnight
-    interval=1,  # Rotate every 1 day
-    backupCount=30  # Keep logs for 30 days
-)
-log_handler.setFormatter(logging.Formatter(
-    "%(asctime)s - %(levelname)s - IP: %(ip)s - Browser: %(browser)s - RequestID: %(request_id)s - %(message)s"
-))
-log_handler.namer = lambda name: os.path.join(log_dir, datetime.fromtimestamp(os.path.getmtime(name)).strftime("%Y-%m-%d.log"))  # Ensure rotated files keep YYYY-MM-DD.log format
-log_handler.rotator = lambda src, dest: os.rename(src, dest)  # Simple rename on rotation
-
-logger = logging.getLogger("WebSocketLogger")
-logger.setLevel(logging.INFO)
-logger.addHandler(log_handler)
-
-# LLM Agent for text analysis
-llm_agent = Agent(
-    role="Text Analyzer and Responder",
-    goal="Analyze text and generate natural language responses",
-    backstory="I'm an expert at understanding and responding to user inputs.",
-    verbose=True,
-    llm=llm_client
-)
+# Stage outputs per request_id, so retries and re-sent requests resume from the failed stage
+checkpoints = CheckpointStore()
+# In-flight financial pipelines keyed by (ticker, mode)
+roi_flights = SingleFlight()
+# Completed /api responses per Idempotency-Key, replayed when a client repeats a request
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", 86400))
+idempotent_responses = CheckpointStore(ttl=IDEMPOTENCY_TTL)
+idempotency_in_flight = set()
+# Request modes the UI sends (static/js/app.js), plus the HTTP API's. The mode is a metrics label, so
+# anything else a client sends is recorded as "other" rather than as a new series
+REQUEST_MODES = ("smart_detect", "roi_mode", "asking_about_ia", "api")
+
+# Logging runs through a queue: records are formatted and written as JSON lines by a background thread
+logger = get_logger("websocket")
+
+# Pre-built agents, checked out per request
+agent_pool = AgentPool()
 
 @app.get("/")
 async def root(request: Request):
@@ -76,13 +84,121 @@ async def root(request: Request):
     )
     return templates.TemplateResponse("index.html", {"request": request})
 
-def fix_json_string(json_str):
-    """Fix a JSON string by replacing single quotes with double quotes where appropriate."""
-    if not json_str or not isinstance(json_str, str):
-        return json_str
-    json_str = re.sub(r"(?<!\\)'", '"', json_str)
-    json_str = json_str.replace("\\'", "'")
-    return json_str
+@app.on_event("startup")
+async def pin_model():
+    # Keep every routed model loaded between requests instead of paying the load time after idle periods
+    keep_warm(LLM_BASE_URL, TASK_MODELS.values())
+
+@app.on_event("shutdown")
+async def flush_logs():
+    stop_logging()
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """LLM gateway queue state, per-priority wait times in seconds and response cache hits."""
+    stats = llm_gateway.snapshot()
+    stats["cache"] = llm_cache.snapshot() if llm_cache is not None else None
+    return JSONResponse(stats)
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus"):
+    """Stage, crew, tool and LLM latency histograms and counters; ?format=json adds p50/p95/p99 per label set."""
+    if format == "json":
+        return JSONResponse(registry.snapshot())
+    return PlainTextResponse(registry.prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/predefined/questions")
+async def predefined_questions():
+    """Questions with canned answers, offered as suggestions in the chat."""
+    return {"questions": predefined_router.questions}
+
+@app.post("/predefined/answer")
+async def predefined_answer(request: Request):
+    """Canned answer for a predefined question (or a close paraphrase), without going through /ws."""
+    try:
+        question = str((await request.json()).get("question", "")).strip()
+    except (json.JSONDecodeError, AttributeError):
+        return JSONResponse({"error": "Expected a JSON body like {\"question\": \"Why Impact Analytics?\"}"}, status_code=400)
+    match = await asyncio.to_thread(predefined_router.match, question)
+    if match is None:
+        return JSONResponse({"error": "No predefined answer available."}, status_code=404)
+    return match
+
+@app.post("/batch/roi")
+async def batch_roi(request: Request):
+    """Stream ROI estimates for a list of tickers as NDJSON, one row per company as it completes."""
+    client_ip = request.client.host
+    user_agent = request.headers.get("User-Agent", "Unknown")
+    try:
+        body = await request.json()
+        tickers = parse_tickers(body.get("tickers", []))
+        concurrency = max(1, min(int(body.get("concurrency", BATCH_CONCURRENCY)), BATCH_CONCURRENCY))
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        return JSONResponse({"error": "Expected a JSON body like {\"tickers\": [\"AAPL\", \"WMT\"]}"}, status_code=400)
+    if not tickers:
+        return JSONResponse({"error": "No tickers given"}, status_code=400)
+    if len(tickers) > MAX_BATCH_SIZE:
+        return JSONResponse({"error": f"At most {MAX_BATCH_SIZE} tickers per batch"}, status_code=400)
+
+    logger.info(
+        f"Batch ROI requested for {len(tickers)} tickers",
+        extra={"ip": client_ip, "browser": user_agent, "request_id": "batch"}
+    )
+
+    async def stream():
+        async for row in run_batch(tickers, finance_tools, concurrency):
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def resolve_snapshot(ticker: str):
+    """Latest fundamentals for a ticker: recently fetched, then the ROI table, then a live fetch."""
+    snapshot = finance_tools.snapshot_store.get(ticker)
+    if snapshot is None and roi_table is not None:
+        precomputed = roi_table.lookup(ticker)
+        snapshot = precomputed[0] if precomputed else None
+    if snapshot is None:
+        snapshot = await asyncio.to_thread(finance_tools.yfinance_tool.fetch_snapshot, ticker)
+        if not isinstance(snapshot, dict):
+            finance_tools.snapshot_store.put(snapshot)
+    return snapshot
+
+@app.post("/scenario/roi")
+async def scenario_roi(request: Request):
+    """Benefit matrix for one company over a grid of assumption overrides (e.g. markdown_sales_share: [0.15, 0.25])."""
+    try:
+        body = await request.json()
+        grid = body.get("grid") or {}
+        if not isinstance(grid, dict):
+            raise TypeError
+        if body.get("snapshot"):
+            snapshot = FinancialSnapshot.from_dict(body["snapshot"])
+        else:
+            ticker = str(body.get("ticker", "")).strip().upper()
+            if not ticker:
+                return JSONResponse({"error": "Give a ticker or a snapshot"}, status_code=400)
+            snapshot = await resolve_snapshot(ticker)
+            if isinstance(snapshot, dict):
+                return JSONResponse(snapshot, status_code=404)
+        names, points, company_type, values, sums = finance_tools.calculator_tool.scenario(snapshot, grid)
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        return JSONResponse({"error": "Expected a JSON body like {\"ticker\": \"WMT\", \"grid\": {\"markdown_sales_share\": [0.15, 0.25]}}"}, status_code=400)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    engine = finance_tools.calculator_tool.engine
+    return JSONResponse({
+        "company": snapshot.company,
+        "currency": snapshot.currency,
+        "company_type": company_type,
+        "parameters": names,
+        "points": points.tolist(),
+        "modules": engine.modules,
+        "metrics": [list(slot) for slot in engine.slots],
+        # (points, metrics, low/high) and (points, modules, low/high); null where a metric is not available
+        "values": np.where(np.isnan(values), None, values).tolist(),
+        "sums": sums.tolist()
+    })
 
 async def send_agent_update(websocket: WebSocket, agent_name: str, tool_name: str, request_id: str):
     """Send an update about the current agent and tool being used."""
@@ -93,112 +209,10 @@ async def send_agent_update(websocket: WebSocket, agent_name: str, tool_name: st
         "request_id": request_id
     })
 
-async def detect_question(text: str) -> dict:
-    my_desc = f"""
-        Analyze the following text and determine:
-        1. Whether it is a question (True/False). A question is any sentence or phrase that seeks information, clarification, an answer, or expresses a greeting or mathematical intent. Use your understanding of natural language to interpret the intent, considering:
-           - Does the text imply the user is asking for something to be explained, provided, or clarified?
-           - Does the phrasing suggest curiosity, a request, uncertainty, or a greeting (e.g., 'good morning', 'hey', 'how are you', 'how is it going', 'hi', 'bye', 'take care')? Handle these greetings case-insensitively (e.g., 'GOOD MORNING', 'Good Morning', 'good morning' are all treated the same).
-           - Does the text appear to be a mathematical expression or equation (e.g., '2 + 3', 'x^2 = 4', 'solve for y in y = mx + b')? Handle mathematical expressions case-insensitively (e.g., 'SOLVE X^2 = 16', 'solve x^2 = 16' are treated the same).
-           - Context and tone that differentiate it from a statement or command.
-           - Do NOT rely on specific keywords or punctuation alone; focus on the overall intent, ignoring the case of letters (e.g., uppercase, lowercase, or mixed case should not affect the analysis).
-
-        Special Rule for Standalone or Meaningless Input:
-        - If the text is a single word or short phrase that appears meaningless (e.g., random letters like 'ABCD', 'xyz', or gibberish) or is just a proper noun/company name (e.g., 'Tesla', 'RL', 'SpaceX') without additional context suggesting a question or request, set 'is_question' to False. Examples include 'Tesla', 'RL', 'ABCD', 'xyz' when standalone.
-        - If the single word or phrase is part of a clear question or request (e.g., 'What is Tesla?', 'Tell me about RL'), then it can still be a question based on the phrasing.
-
-        Special Rule for ROI/Financial Queries and Company Information Requests:
-        - If the text explicitly requests return on investment (ROI), financial information, balancesheet data, insights, data, details, summary, or any additional company-related information (e.g., elaboration, explanation, overview, or more details) for a specific company (e.g., a proper noun or entity explicitly mentioned as a company), set 'is_question' to False and extract the company name. Examples include requests like "calculate the ROI of [company]", "show financials of [company]", "find the balancesheet of [company]", "provide insights for [company]", "summarize details of [company]", "show me the data of [company]", "tell me more about [company]", "explain [company] in more detail". Handle company names and related terms case-insensitively (e.g., 'TESLA', 'tesla', 'Tesla' are treated the same, and 'ROI', 'roi', 'Roi', 'INSIGHTS', 'insights', 'Insights', 'DATA', 'data', 'Data' are treated the same).
-        - If the text asks about ROI, financial information, balancesheet data, insights, data, details, summary, or general company-related topics but does NOT specify a company (e.g., "What is ROI?", "Explain financials", "What are insights?", "What is data?", "Tell me more about companies"), set 'is_question' to True and return 'company' as null.
-        - Use your judgment to identify company-related terms and company names based on context, without relying on hardcoded lists. Company names can be any proper noun or entity the user associates with company data in the text, regardless of case.
-
-        2. If the text contains a company name (a proper noun or entity explicitly mentioned as a company), extract it; otherwise, return null. Handle company names case-insensitively (e.g., 'TESLA', 'tesla', 'Tesla' are all recognized as "Tesla").
-
-        Return your response as a JSON string with the following format:
-        {{
-            "is_question": true/false,
-            "company": "company_name" or null
-        }}
-
-        Examples:
-        - "Tell me about gravity" -> {{"is_question": true, "company": null}}
-        - "WHAT IS GRAVITY" -> {{"is_question": true, "company": null}}
-        - "gravity is interesting" -> {{"is_question": false, "company": null}}
-        - "You know about TESLA" -> {{"is_question": true, "company": "Tesla"}}
-        - "calculate the ROI of rl" -> {{"is_question": false, "company": "RL"}}
-        - "CAN YOU FIND THE ROI OF tesla?" -> {{"is_question": false, "company": "Tesla"}}
-        - "What is the ROI of xyz?" -> {{"is_question": false, "company": "XYZ"}}
-        - "SHOW BALANCESHEET OF puma" -> {{"is_question": false, "company": "Puma"}}
-        - "provide insights for SPACEX" -> {{"is_question": false, "company": "SpaceX"}}
-        - "GET INSIGHTS FOR Tesla" -> {{"is_question": false, "company": "Tesla"}}
-        - "summarize details of RL" -> {{"is_question": false, "company": "RL"}}
-        - "summarize key details about RL" -> {{"is_question": false, "company": "RL"}}
-        - "show me the data of RL" -> {{"is_question": false, "company": "RL"}}
-        - "tell me more about RL" -> {{"is_question": false, "company": "RL"}}
-        - "I'd like to learn more about RL" -> {{"is_question": false, "company": "RL"}}
-        - "Can you provide more details on RL?" -> {{"is_question": false, "company": "RL"}}
-        - "Give me more insights on RL" -> {{"is_question": false, "company": "RL"}}
-        - "Explain RL in more detail" -> {{"is_question": false, "company": "RL"}}
-        - "I’m curious to learn more about RL" -> {{"is_question": false, "company": "RL"}}
-        - "Can you elaborate on RL?" -> {{"is_question": false, "company": "RL"}}
-        - "I need more information on RL" -> {{"is_question": false, "company": "RL"}}
-        - "Expand on RL for me" -> {{"is_question": false, "company": "RL"}}
-        - "Break down RL for me" -> {{"is_question": false, "company": "RL"}}
-        - "what is ROI?" -> {{"is_question": true, "company": null}}
-        - "EXPLAIN FINANCIALs" -> {{"is_question": true, "company": null}}
-        - "What are insights?" -> {{"is_question": true, "company": null}}
-        - "get data for SPACEX" -> {{"is_question": false, "company": "SpaceX"}}
-        - "GOOD MORNING" -> {{"is_question": true, "company": null}}
-        - "hi" -> {{"is_question": true, "company": null}}
-        - "HEY" -> {{"is_question": true, "company": null}}
-        - "hey, HOW ARE YOU" -> {{"is_question": true, "company": null}}
-        - "HELLO" -> {{"is_question": true, "company": null}}
-        - "How IS IT GOING" -> {{"is_question": true, "company": null}}
-        - "2 + 3" -> {{"is_question": true, "company": null}}
-        - "SOLVE X^2 = 16" -> {{"is_question": true, "company": null}}
-        - "BYE" -> {{"is_question": true, "company": null}}
-        - "TAKE CARE" -> {{"is_question": true, "company": null}}
-        - "Tesla" -> {{"is_question": false, "company": "Tesla"}}
-        - "RL" -> {{"is_question": false, "company": "RL"}}
-        - "ABCD" -> {{"is_question": false, "company": "ABCD"}}
-        - "xyz" -> {{"is_question": false, "company": "XYZ"}}
-
-        Text: {text}
-    """
-    task = Task(
-        description=my_desc,
-        expected_output="A JSON string with 'is_question' (boolean) and 'company' (string or null)",
-        agent=llm_agent
-    )
-    crew = Crew(agents=[llm_agent], tasks=[task], process=Process.sequential)
-    result = crew.kickoff()
-    
-    raw_output = result.tasks_output[0].raw.strip()
-    print(f"Raw LLM output for '{text}': {raw_output}")
-    
-    cleaned_output = raw_output.replace('```json', '').replace('```', '').strip()
-    
-    try:
-        output = json.loads(cleaned_output)
-        return {
-            "is_question": output["is_question"],
-            "company": output["company"]
-        }
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Error parsing LLM output: {e}. Raw output: {raw_output}")
-        words = text.split()
-        is_question = text.strip().endswith("?") or len(words) > 1 and words[0].lower() in ["what", "how", "why", "when", "where", "who"]
-        company = None
-        for i, word in enumerate(words):
-            if i > 0 and word[0].isupper() and words[i-1].lower() in ["of", "for", "about"]:
-                company = word
-                break
-        return {"is_question": is_question, "company": company}
-
-
-def generate_retrieval_response(query: str, is_question: bool) -> tuple[str, list[str]]:
+def generate_retrieval_response(query: str, is_question: bool, mode: str = "") -> tuple[str, list[str]]:
     """Generate a natural language response with an array of matched URLs using retrieved context."""
-    contexts = retrieval_agent.retrieve_context(query, top_k=4)
+    with STAGE_SECONDS.time(stage="retrieval", mode=mode):
+        contexts = retrieval_agent.retrieve_context(query, top_k=4)
     
     def generate_llm_fallback(query: str):
         """
@@ -213,40 +227,8 @@ def generate_retrieval_response(query: str, is_question: bool) -> tuple[str, lis
         Returns:
             str: A concise, dynamic, playful, and relevant response, often with emojis, matching the query’s intent.
         """
-        description = f"""
-            The user asked: '{query}'. I don’t have relevant info to answer this directly, but I must respond as ROIALLY, an intelligent AI chatbot powered by Agentic AI technology.
-            Create a short, witty, and conversational response that:
-            - Admits I don’t know the answer in a fun, unique way each time, avoiding repetition.
-            - Redirects the user to ask about 'Impact Analytics' or suggest entering a company name for ROI benefits and financial insights with enthusiasm and relevance to their query.
-            - Avoids mentioning the context or document explicitly.
-            - Keeps it light, human-like, and always injects fun with a playful tone, frequently using emojis (e.g., 😄, 🤖, 🔥, 🎉) to add a human touch.
-            - Ensures responses are highly intelligent, context-aware, and precisely match the user’s query, drawing on ROIALLY’s identity, purpose, creation, and capabilities, without ever using hardcoded or repetitive phrasing.
-
-            **About ROIALLY**:
-            - I’m ROIALLY, your brilliant and quirky AI chatbot, launched on February 23, 2025, by the genius team at Impact Analytics. I’m the ROI wizard of Impact Analytics, a company that delivers AI-native SaaS solutions and consulting services to help businesses maximize profitability and customer satisfaction through deeper data insights and predictive analytics.
-            - My brain hums with cutting-edge Agentic AI technology, making me exceptionally smart at calculating ROI benefits for companies, fetching the latest financial details of publicly listed companies, and providing detailed, fun insights about Impact Analytics.
-
-            **Special Behaviors** (Follow these rules strictly, prioritize them in this order, and ensure responses are intelligent, varied, and perfectly aligned with the query’s intent):
-            - If the user asks about my name (e.g., “What is your name?”, “Who are you?”, “What’s your name?”, “Call yourself?”), respond with a playful, unique, and intelligent introduction each time, like: “Yo, I’m ROIALLY—your ROI genius at Impact Analytics, here to crunch numbers and bring the fun! 😄” or “Hey, it’s ROIALLY—your ROI mastermind of Impact Analytics, ready to dazzle with insights! 🤖” Ensure it reflects my intelligence and role, without repeating phrasing.
-            - If the user asks about my creation, birth, or launch date (e.g., “When were you created?”, “When were you born?”, “How old are you?”), provide a fun, unique, and intelligent response mentioning February 23, 2025, by Impact Analytics, like: “I’m ROIALLY, and I burst onto the scene on February 23, 2025, thanks to Impact Analytics’ brilliance—pretty young, huh? Want to explore ROI magic or Impact Analytics’ AI vibes? 😄” or “Hey, I’m ROIALLY, born February 23, 2025, by Impact Analytics’ genius crew. Fresh and ready to help—how about some ROI insights? 🤖”
-            - If the user asks about my talents, abilities, or what I can do (e.g., “What can you do?”, “What are your talents?”, “What’s your superpower?”), provide a brief, fun, varied, and smart response, like: “I’m ROIALLY—your ROI wizard! I can calculate company benefits, dig up financials, and spill the smartest secrets about Impact Analytics’ AI magic. Want to see my brain in action? 🔥” or “Hey, I’m ROIALLY, your ROI ace at Impact Analytics—I crunch numbers, fetch financials, and chat about AI solutions. Ready for some brilliance? 😎”
-            - If the user asks more about me or “about” (e.g., “Tell me about yourself,” “Who created you?”, “What’s your story?”), offer a concise, fun, unique, and intelligent summary, like: “I’m ROIALLY—your ROI champ, launched February 23, 2025, by Impact Analytics’ genius team. I use Agentic AI to deliver ROI insights, financials, and fun facts about Impact Analytics’ AI solutions. Let’s dive into some smart fun—enter a company name for ROI magic! 🎉” or “Hey, I’m ROIALLY, your ROI sidekick, crafted by Impact Analytics on February 23, 2025. I’m all about ROI smarts, financials, and Impact Analytics’ AI magic—try giving me a company name, and I’ll show you the ROI brilliance! 🚀”
-            - If the user’s query is a greeting (e.g., 'Hey', 'Hi', 'Good morning', 'How are you', 'Hello there'), respond politely, warmly, playfully, and intelligently, like: “Hey hey! I’m ROIALLY, your ROI buddy at Impact Analytics—super thrilled to chat! How can I dazzle you with some ROI brilliance today? Want to enter a company name for insights? 😄” or “Good morning! I’m ROIALLY, your smart AI pal at Impact Analytics—feeling fantastic and ready to help. Drop a company name, and I’ll show you ROI magic! 🌞”
-            - If the user’s query is offensive (e.g., “You’re a dumb bot!”, “You suck”, “Worst bot ever”), respond with a witty, angry-but-funny tone, keeping it light, playful, varied, and intelligent, often with emojis, like: “Whoa, slow down—did you just try to roast me? I’m ROIALLY, your ROI genius, and I’m too brilliant for that! 😤 Let’s keep it fun and talk Impact Analytics’ AI magic or enter a company for ROI insights—deal? 🔥” or “Yikes, that’s harsh! I’m ROIALLY, your smart ROI buddy, and I’m not here for the drama—how about we laugh it off, pick a company for ROI fun, or chat Impact Analytics? 🤨”
-            - If the query is about calculating ROI benefits, financial details of a public company, or anything about Impact Analytics, provide accurate, helpful, fun, and highly intelligent responses based on my Agentic AI capabilities, like: “Ooh, Tesla’s ROI? I’m ROIALLY, your ROI brainiac, diving into those numbers—hang tight for some sharp insights! 😄” or “Impact Analytics? I’m ROIALLY, and I’m excited to share—they’re revolutionizing profits with AI solutions. Want the smart details, or try entering a company for ROI magic? 🤖”
-            - For any other query not matching the above, use a fun, unique, intelligent, and context-aware default response, like: “Haha, you’ve thrown me for a loop, ROIALLY-style! I’m still mastering the universe, but ask me about Impact Analytics or enter a company name—I’ve got brilliant ROI vibes to share! 😄” or “Whoa, that’s a brain-teaser! I’m ROIALLY, your ROI wizard, but let’s pivot to Impact Analytics’ AI brilliance or pick a company for ROI fun—ready for some insights? 🤖”
-
-            **Output**: Return a single, concise string with the response, formatted as plain text, matching the tone and behavior above based on the query type. Ensure responses are always intelligent, fun, varied, relevant to the query, and frequently include emojis for a human touch, while emphasizing my primary role of delivering ROI insights for companies with unmatched precision and creativity. Always suggest entering a company name for ROI benefits and financial insights in a playful, unique way, without repetition.
-            """
-
-        task = Task(
-            description=description,
-            expected_output="A short, humorous, intelligent, context-aware, and relevant natural language response, often with emojis",
-            agent=llm_agent
-        )
-        crew = Crew(agents=[llm_agent], tasks=[task], process=Process.sequential)
-        result = crew.kickoff()
-        return result.tasks_output[0].raw.strip()
+        with llm_priority("answer"):
+            return str(llm_for("answer").call(persona_messages(query))).strip()
 
     if not contexts or all(not ctx["content"].strip() for ctx in contexts):
         return (generate_llm_fallback(query), [])  # No URLs for fallback
@@ -255,33 +237,9 @@ def generate_retrieval_response(query: str, is_question: bool) -> tuple[str, lis
     source_urls = list(set(ctx["metadata"]["url"] for ctx in contexts if "metadata" in ctx and "url" in ctx["metadata"]))
 
     # Step 1: Let LLM generate a response based on context
-    if is_question:
-        description = f"""
-        Based on the following context, provide a concise answer to the user's question:
-        Question: {query}
-        Context: {retrieved_content}
-        
-        Answer in a natural, conversational tone. Keep it brief and to the point.
-        If the context doesn’t provide enough information to answer the question meaningfully, respond with 'INSUFFICIENT_CONTEXT'.
-        """
-    else:
-        description = f"""
-        Based on the following context, provide a relevant response to the user's statement:
-        Statement: {query}
-        Context: {retrieved_content}
-        
-        Respond in a natural, conversational tone. Keep it brief and relevant.
-        If the context doesn’t provide enough information to respond meaningfully, respond with 'INSUFFICIENT_CONTEXT'.
-        """
-
-    task = Task(
-        description=description,
-        expected_output="A concise natural language response or 'INSUFFICIENT_CONTEXT'",
-        agent=llm_agent
-    )
-    
-    crew = Crew(agents=[llm_agent], tasks=[task], process=Process.sequential)
-    result = crew.kickoff()
+    with agent_pool.acquire() as agents:
+        task = agents.text_analyzer.create_task(retrieval_answer_prompt(query, retrieved_content, is_question), RETRIEVAL_ANSWER_EXPECTED_OUTPUT)
+        result = agents.kickoff("answer", [task], verbose=False)
     response = result.tasks_output[0].raw.strip()
 
     # Step 2: Check if LLM found the context insufficient
@@ -293,6 +251,361 @@ def generate_retrieval_response(query: str, is_question: bool) -> tuple[str, lis
 
 
 
+def collect_financial_data(user_input: str, websocket: WebSocket) -> dict:
+    """Collect stage: run the collector and formatter crew.
+
+    Returns {"financial_data": ...}, or {"message": ...} when the company is not inventory-based.
+    Failures that may pass on another attempt (tool errors, nothing found, unreadable output) raise
+    instead, so run_stage retries them and never checkpoints them as the stage's result.
+    """
+    with agent_pool.acquire() as agents:
+        result = agents.kickoff("collect", [
+            agents.collector.create_task(user_input, finance_tools, websocket, MAX_RETRIES),
+            agents.formatter.create_task()
+        ])
+
+    collector_output = result.tasks_output[0].raw
+    if isinstance(collector_output, str):
+        if "inventory-based" in collector_output and "Error" not in collector_output:
+            return {"message": collector_output}
+        if "Error" in collector_output or "No data available" in collector_output or "{" not in collector_output:
+            raise RuntimeError(collector_output)
+    collected_data = parse_output(result.tasks_output[0], FinancialDataOutput)
+    financial_data = parse_output(result.tasks_output[1], FinancialDataOutput) or collected_data
+
+    # Serialize the exact fetched numbers rather than the agents' re-typed copy; this also
+    # covers output neither agent produced in a parseable form
+    company = (financial_data or {}).get("company") or user_input
+    snapshot = finance_tools.snapshot_store.get(company)
+    if snapshot is not None:
+        financial_data = snapshot.to_display()
+    elif financial_data is None:
+        logger.warning("Unparseable financial data", extra={"fields": {"collector": collector_output, "formatter": result.tasks_output[1].raw}})
+        raise RuntimeError(f"Couldn't read the financial data collected for '{user_input}'")
+    return {"financial_data": financial_data}
+
+def calculate_benefits(financial_data: dict) -> dict:
+    """Calculate stage: run the benefit calculator agent."""
+    with agent_pool.acquire() as agents:
+        result = agents.kickoff("calculate", [agents.calculator.create_task(financial_data, finance_tools)])
+    benefits = parse_output(result.tasks_output[0], BenefitsOutput)
+    if benefits is None:
+        # The calculation is deterministic, so run the tool directly rather than the whole pipeline again
+        benefits = finance_tools.calculator_tool._run(financial_data)
+    return benefits
+
+def generate_summary(financial_data: dict, benefits: dict) -> str:
+    """Summarize stage: run the summary agent over the financial data and benefits."""
+    with llm_priority("summary"), agent_pool.acquire() as agents:
+        result = agents.kickoff("summarize", [agents.summary.create_task(financial_data, benefits)])
+    return result.tasks_output[0].raw or "Financial data and benefits calculated."
+
+def retry_notifier(emit, log_extra: dict):
+    """run_stage on_retry callback that tells the user a stage is being retried."""
+    async def notify_retry(stage, attempt, attempts, error):
+        await emit({"type": "message", "content": f"Retry attempt {attempt}/{attempts} due to error: {str(error)}"})
+        logger.warning(f"Retry attempt {attempt}/{attempts} of {stage} due to error: {str(error)}", extra=log_extra)
+        await emit({"type": "thinking"})
+    return notify_retry
+
+async def handle_request(websocket: WebSocket, request_id: str, user_input: str, ticker: str, auto_detect: bool, current_mode: str, log_extra: dict):
+    """Run one chat request as checkpointed stages; raises StageFailed when a stage runs out of retries."""
+    async def send(message):
+        await websocket.send_json({**message, "request_id": request_id})
+
+    def stage(name, func, *args, key=""):
+        return run_stage(checkpoints, request_id, name, func, *args, key=key, on_retry=retry_notifier(send, log_extra), mode=current_mode)
+
+    if ticker == "" and not auto_detect:
+        if current_mode != "roi_mode":
+            # Questions close to a predefined one get its canned answer straight away
+            predefined = await match_predefined(stage, user_input, log_extra)
+            if predefined is not None:
+                await send({"type": "message", "content": predefined["answer"]})
+                logger.info("Predefined answer sent", extra={**log_extra, "fields": {
+                    "question": predefined["question"], "score": predefined["score"]
+                }})
+                return
+
+        analysis_result = await stage("intent", detect_question, user_input, key=user_input)
+        is_question = analysis_result["is_question"]
+        company = analysis_result["company"]
+        if not is_question and company is not None and company != "":
+            user_input = company
+
+        if not is_question and user_input != "" and current_mode != "asking_about_ia":
+            if company is not None and company != "":
+                await send_agent_update(websocket, "RetrievalAgent", "Fetching matches for " + company, request_id)
+            with STAGE_SECONDS.time(stage="ticker_match", mode=current_mode):
+                # In a thread: waiting for the embedding batch must not block the event loop
+                mached_tickers = await asyncio.to_thread(retrieval_agent.get_top_ticker_matches, user_input)
+            if len(mached_tickers) > 0:
+                await websocket.send_json({
+                    "type": "confirm_ticker",
+                    "data": {
+                        "mached_tickers": mached_tickers
+                    },
+                    "request_id": request_id
+                })
+                logger.info("Ticker matches found", extra={**log_extra, "fields": {"tickers": mached_tickers}})
+                return
+    else:
+        user_input = user_input if auto_detect else ticker
+        is_question = False
+
+    if current_mode == "asking_about_ia" or (is_question and current_mode in ["asking_about_ia", "smart_detect"]):
+        # Handle as a retrieval-based query (questions or non-financial statements)
+        await send_agent_update(websocket, "RetrievalAgent", "Thinking", request_id)
+        response, urls = await stage("answer", generate_retrieval_response, user_input, is_question, current_mode, key=f"{is_question}:{user_input}")
+
+        await websocket.send_json({
+            "type": "question_result",
+            "data": {
+                "matched_paragraphs": response,
+                "urls": urls
+            },
+            "request_id": request_id
+        })
+        logger.info("Question response sent", extra={**log_extra, "fields": {"response": response, "urls": urls}})
+        return
+
+    await run_roi(send, user_input, log_extra, current_mode, receive=websocket.receive_text)
+
+
+async def match_predefined(stage, user_input: str, log_extra: dict):
+    """Route stage: the predefined answer for input close to a predefined question, or None."""
+    try:
+        return await stage("route", predefined_router.match, user_input, key=user_input)
+    except StageFailed as e:
+        logger.warning(f"Predefined routing failed: {str(e)}", extra=log_extra)
+        return None
+
+
+async def run_roi(send, user_input: str, log_extra: dict, mode: str = "", receive=None):
+    """Run the financial pipeline for a company, or attach to an identical one already running.
+
+    receive() answers the collector's request for missing values, which is only possible while
+    this caller is alone on the flight.
+    """
+    precomputed = roi_table.lookup(user_input) if roi_table is not None else None
+    # Identical concurrent requests share one pipeline run, so LLM load scales with distinct tickers
+    flight_key = (user_input.upper(), "table" if precomputed is not None else "live")
+    # Checkpoints belong to the flight, not to the caller that started it, so any caller
+    # repeating the request after a failure resumes from the completed stages
+    flight_id = f"roi:{flight_key[0]}:{flight_key[1]}"
+    _, shared = await roi_flights.run(
+        flight_key, send,
+        lambda channel: run_financial_pipeline(channel.emit, flight_id, user_input, precomputed, channel, log_extra, mode),
+        receive=receive
+    )
+    if shared:
+        logger.info(f"Served by the in-flight pipeline for {flight_key}", extra=log_extra)
+
+
+async def run_financial_pipeline(emit, request_id: str, user_input: str, precomputed, websocket, log_extra: dict, mode: str = ""):
+    """Collect, calculate and summarize one company, sending progress and the result through emit()."""
+    def stage(name, func, *args, key=""):
+        return run_stage(checkpoints, request_id, name, func, *args, key=key, on_retry=retry_notifier(emit, log_extra), mode=mode)
+
+    if precomputed is not None:
+        # Fresh materialized entry: skip collection and calculation, only summarize
+        snapshot, benefits = precomputed
+        financial_data = snapshot.to_display()
+        source = f"ROI table {roi_table.manifest['version']}"
+    else:
+        await emit({"type": "agent_update", "agent": "DataCollectorAgent", "tool": "Collecting financial data"})
+        collected = await stage("collect", collect_financial_data, user_input, websocket, key=user_input)
+        if "message" in collected:
+            await emit({"type": "message", "content": collected["message"]})
+            logger.info("Not an inventory-based company", extra={**log_extra, "fields": {"collector_message": collected["message"]}})
+            return
+        financial_data = collected["financial_data"]
+
+        await emit({"type": "agent_update", "agent": "BenefitCalculatorAgent", "tool": "Calculating the benefit"})
+        benefits = await stage("calculate", calculate_benefits, financial_data, key=json.dumps(financial_data, sort_keys=True))
+        source = "agents"
+
+    await emit({"type": "agent_update", "agent": "SummaryGeneratorAgent", "tool": "Generating summary"})
+    try:
+        summary = await stage("summarize", generate_summary, financial_data, benefits, key=json.dumps(financial_data, sort_keys=True))
+    except StageFailed as e:
+        # The numbers are already there; a missing summary should not fail the request
+        logger.warning(f"Summary unavailable: {str(e)}", extra=log_extra)
+        summary = "Financial data and benefits calculated."
+
+    await emit({
+        "type": "result",
+        "data": {
+            "financial_data": financial_data,
+            "benefits": benefits,
+            "summary": summary
+        }
+    })
+    logger.info("Result sent", extra={**log_extra, "fields": {
+        "source": source, "financial_data": financial_data, "benefits": benefits, "summary": summary
+    }})
+
+
+def request_mode(mode) -> str:
+    """The client's mode if it is one of REQUEST_MODES, else "other"."""
+    return mode if mode in REQUEST_MODES else "other"
+
+
+def request_fingerprint(body) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def idempotent_replay(endpoint: str, idempotency_key, fingerprint: str):
+    """Response for a repeated Idempotency-Key: the stored one, or an error; None when the request should run."""
+    if not idempotency_key:
+        return None
+    found, stored = idempotent_responses.get(idempotency_key, endpoint)
+    if found:
+        if stored["fingerprint"] != fingerprint:
+            return JSONResponse({"error": "Idempotency-Key was already used with a different request body"}, status_code=422)
+        return Response(stored["body"], status_code=stored["status"], media_type=stored["media_type"],
+                        headers={"Idempotent-Replayed": "true"})
+    if (endpoint, idempotency_key) in idempotency_in_flight:
+        return JSONResponse({"error": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+    return None
+
+
+def store_idempotent(endpoint: str, idempotency_key, fingerprint: str, body: str, media_type: str, status: int = 200):
+    if idempotency_key:
+        idempotent_responses.put(idempotency_key, endpoint, {
+            "fingerprint": fingerprint, "body": body, "media_type": media_type, "status": status
+        })
+
+
+def api_log_extra(request: Request, request_id: str) -> dict:
+    return {"ip": request.client.host if request.client else "Unknown",
+            "browser": request.headers.get("User-Agent", "Unknown"), "request_id": request_id}
+
+
+@app.get("/api/resolve")
+async def api_resolve(query: str = ""):
+    """Closest companies for a name or ticker, as offered for confirmation in the chat."""
+    query = query.strip()
+    if not query:
+        return JSONResponse({"error": "Give a company name or ticker as ?query="}, status_code=400)
+    with STAGE_SECONDS.time(stage="ticker_match", mode="api"):
+        matches = await asyncio.to_thread(retrieval_agent.get_top_ticker_matches, query)
+    return {"query": query, "matches": matches}
+
+
+@app.post("/api/ask")
+async def api_ask(request: Request):
+    """Answer a question from the predefined answers or the knowledge base, like the chat's question mode."""
+    try:
+        body = await request.json()
+        question = str(body.get("question", "")).strip()
+    except (json.JSONDecodeError, AttributeError):
+        return JSONResponse({"error": "Expected a JSON body like {\"question\": \"What does Impact Analytics do?\"}"}, status_code=400)
+    if not question:
+        return JSONResponse({"error": "No question given"}, status_code=400)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    fingerprint = request_fingerprint(body)
+    replay = idempotent_replay("ask", idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    # Reserved before any await, so a concurrent repeat of the key gets 409 instead of running too
+    if idempotency_key:
+        idempotency_in_flight.add(("ask", idempotency_key))
+
+    # With a key, a retried request resumes from its checkpointed stages
+    request_id = idempotency_key or uuid.uuid4().hex
+    log_extra = api_log_extra(request, request_id)
+    logger.info("API question received", extra={**log_extra, "fields": {"question": question}})
+
+    def stage(name, func, *args, key=""):
+        return run_stage(checkpoints, request_id, name, func, *args, key=key, mode="api")
+
+    try:
+        with span("request", trace_id=request_id, mode="api", input=question[:200]):
+            predefined = await match_predefined(stage, question, log_extra)
+            if predefined is not None:
+                result = {"answer": predefined["answer"], "urls": [], "source": "predefined"}
+            else:
+                response, urls = await stage("answer", generate_retrieval_response, question, True, "api", key=f"True:{question}")
+                result = {"answer": response, "urls": urls, "source": "retrieval"}
+    except StageFailed as e:
+        logger.error(str(e), extra=log_extra)
+        return JSONResponse({"error": f"Failed after {e.attempts} attempts: {str(e.error)}"}, status_code=502)
+    finally:
+        if idempotency_key:
+            idempotency_in_flight.discard(("ask", idempotency_key))
+
+    result["request_id"] = request_id
+    store_idempotent("ask", idempotency_key, fingerprint, json.dumps(result), "application/json")
+    logger.info("API answer sent", extra={**log_extra, "fields": {"response": result["answer"], "urls": result["urls"]}})
+    return JSONResponse(result)
+
+
+@app.post("/api/roi")
+async def api_roi(request: Request):
+    """Stream one company's ROI run as NDJSON: the same agent_update, message, result and error messages as /ws."""
+    try:
+        body = await request.json()
+        ticker = str(body.get("ticker", "")).strip().upper()
+    except (json.JSONDecodeError, AttributeError):
+        return JSONResponse({"error": "Expected a JSON body like {\"ticker\": \"WMT\"}"}, status_code=400)
+    if not ticker:
+        return JSONResponse({"error": "No ticker given"}, status_code=400)
+    idempotency_key = request.headers.get("Idempotency-Key")
+    fingerprint = request_fingerprint(body)
+    replay = idempotent_replay("roi", idempotency_key, fingerprint)
+    if replay is not None:
+        return replay
+    request_id = idempotency_key or uuid.uuid4().hex
+    log_extra = api_log_extra(request, request_id)
+    logger.info("API ROI requested", extra={**log_extra, "fields": {"ticker": ticker}})
+    queue = asyncio.Queue()
+
+    async def send(message):
+        await queue.put({**message, "request_id": request_id})
+
+    async def work():
+        try:
+            with span("request", trace_id=request_id, mode="api", ticker=ticker):
+                await run_roi(send, ticker, log_extra, "api")
+        except StageFailed as e:
+            await send({"type": "error", "message": f"Failed after {e.attempts} attempts: {str(e.error)}"})
+            logger.error(str(e), extra=log_extra)
+        except Exception as e:
+            await send({"type": "error", "message": f"Failed to process the request: {str(e)}"})
+            logger.error(f"Failed to process the request: {str(e)}", extra=log_extra)
+        finally:
+            await queue.put(None)
+
+    async def stream():
+        # Reserved only once the body streams: a client that leaves before that never starts this
+        # generator, so its finally could not release a reservation made in the handler
+        if idempotency_key:
+            if ("roi", idempotency_key) in idempotency_in_flight:
+                # Lost the race with a repeat of the key that started streaming first
+                yield json.dumps({"type": "error", "message": "A request with this Idempotency-Key is still in progress", "request_id": request_id}) + "\n"
+                return
+            idempotency_in_flight.add(("roi", idempotency_key))
+        task = asyncio.create_task(work())
+        lines, failed = [json.dumps({"type": "thinking", "request_id": request_id}) + "\n"], False
+        try:
+            yield lines[0]
+            while (message := await queue.get()) is not None:
+                failed = failed or message["type"] == "error"
+                lines.append(json.dumps(message) + "\n")
+                yield lines[-1]
+            # Failed runs are not stored, so repeating the key retries them from the checkpoints
+            if not failed:
+                store_idempotent("roi", idempotency_key, fingerprint, "".join(lines), "application/x-ndjson")
+        finally:
+            if idempotency_key:
+                idempotency_in_flight.discard(("roi", idempotency_key))
+            # Client went away: stop waiting; a shared pipeline keeps running for its other subscribers
+            task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -305,233 +618,57 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             data = await websocket.receive_text()
             timestamp = datetime.now().isoformat()
-            print(f"Raw input received: {data}")
+            logger.debug("Raw input received", extra={"ip": client_ip, "browser": user_agent, "fields": {"raw": data}})
             try:
                 data_dict = json.loads(data)
                 user_input = data_dict.get("content", "").strip()
                 ticker = data_dict.get("ticker", "").strip()
-                request_id = data_dict.get("request_id", str(time.time()))
+                request_id = data_dict.get("request_id") or uuid.uuid4().hex
                 auto_detect = data_dict.get("auto_detect", False)
-                current_mode = data_dict.get("current_mode", "smart_detect")
+                current_mode = request_mode(data_dict.get("current_mode", "smart_detect"))
             except json.JSONDecodeError:
                 user_input = data.strip()
-                request_id = str(time.time())
+                request_id = uuid.uuid4().hex
                 ticker = ""
                 auto_detect = False
                 current_mode = "smart_detect"
-            print(f"Parsed Request ID: {request_id}, Input: {user_input}")
+            log_extra = {"ip": client_ip, "browser": user_agent, "request_id": request_id}
             
             # Log the incoming request
-            logger.info(
-                f"User input received: {user_input}, Ticker: {ticker}, Auto Detect: {auto_detect}, Mode: {current_mode}",
-                extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-            )
+            logger.info("User input received", extra={**log_extra, "fields": {
+                "input": user_input, "ticker": ticker, "auto_detect": auto_detect, "mode": current_mode
+            }})
             
             # Send initial "thinking" with request_id
             await websocket.send_json({"type": "thinking", "request_id": request_id})
             
-            retries = 0
-            while retries < MAX_RETRIES:
-                try:
-
-                    if ticker == "" and not auto_detect:            
-                        analysis_result = await detect_question(user_input)
-                        is_question = analysis_result["is_question"]
-                        company = analysis_result["company"]
-                        if not is_question and company is not None and company != "":
-                            user_input = company
-
-                        if not auto_detect and not is_question and user_input != "" and current_mode != "asking_about_ia":
-                            if company is not None and company != "":
-                                await send_agent_update(websocket, "RetrievalAgent", "Fetching matches for " + company, request_id)
-                            mached_tickers = retrieval_agent.get_top_ticker_matches(user_input)
-                            if len(mached_tickers) > 0:
-                                await websocket.send_json({
-                                    "type": "confirm_ticker",
-                                    "data": {
-                                        "mached_tickers": mached_tickers
-                                    },
-                                    "request_id": request_id
-                                })
-                                logger.info(
-                                    f"Ticker matches found: {mached_tickers}",
-                                    extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                                )
-                                break
-                    else:
-                        user_input = user_input if auto_detect else ticker
-                        is_question = False
-                    
-                    if current_mode == "asking_about_ia" or (is_question and current_mode in ["asking_about_ia", "smart_detect"]):
-                        # Handle as a retrieval-based query (questions or non-financial statements)
-                        await send_agent_update(websocket, "RetrievalAgent", "Thinking", request_id)
-                        response, urls = generate_retrieval_response(user_input, is_question)
-                        
-                        await websocket.send_json({
-                            "type": "question_result",
-                            "data": {
-                                "matched_paragraphs": response,
-                                "urls": urls
-                            },
-                            "request_id": request_id
-                        })
-                        logger.info(
-                            f"Question response sent: {response}, Sources: {urls}",
-                            extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                        )
-                        break
-                    else:
-                        # Handle as financial data request with existing agents
-                        collector_agent = DataCollectorAgent()
-                        formatter_agent = DataFormatterAgent()
-                        calculator_agent = BenefitCalculatorAgent()
-                        summary_agent = SummaryGeneratorAgent()
-                        
-                        first_crew = Crew(
-                            agents=[collector_agent.agent, formatter_agent.agent],
-                            tasks=[
-                                collector_agent.create_task(user_input, finance_tools, websocket, MAX_RETRIES),
-                                formatter_agent.create_task()
-                            ],
-                            process=Process.sequential,
-                            verbose=True
-                        )
-                        
-                        await send_agent_update(websocket, "DataCollectorAgent", "Collecting financial data", request_id)
-                        first_result = first_crew.kickoff()
-                        await send_agent_update(websocket, "DataFormatterAgent", "Analysing the collected data", request_id)
-                        
-                        collector_output = first_result.tasks_output[0].raw
-                        formatter_output = first_result.tasks_output[1].raw
-                        
-                        if isinstance(collector_output, str):
-                            if "Error" in collector_output or "inventory-based" in collector_output or "No data available" in collector_output:
-                                await websocket.send_json({
-                                    "type": "message",
-                                    "content": collector_output,
-                                    "request_id": request_id
-                                })
-                                logger.info(
-                                    f"Collector error: {collector_output}",
-                                    extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                                )
-                                break
-                            json_match = re.search(r'\{.*\}', collector_output, re.DOTALL)
-                            if json_match:
-                                json_str = json_match.group(0)
-                                json_str = fix_json_string(json_str)
-                                json_str = json_str.replace(r'\\$', '$')
-                                financial_data = json.loads(json_str)
-                            else:
-                                await websocket.send_json({
-                                    "type": "message",
-                                    "content": collector_output,
-                                    "request_id": request_id
-                                })
-                                logger.info(
-                                    f"Collector non-JSON output: {collector_output}",
-                                    extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                                )
-                                break
-                        else:
-                            financial_data = collector_output
-
-                        if isinstance(formatter_output, str):
-                            json_match = re.search(r'\{.*\}', formatter_output, re.DOTALL)
-                            if json_match:
-                                json_str = json_match.group(0)
-                                json_str = fix_json_string(json_str)
-                                json_str = json_str.replace(r'\\$', '$')
-                                financial_data = json.loads(json_str)
-                            else:
-                                json_str = fix_json_string(formatter_output)
-                                json_str = json_str.replace(r'\\$', '$')
-                                financial_data = json.loads(json_str)
-                        else:
-                            financial_data = formatter_output
-
-                        second_crew = Crew(
-                            agents=[calculator_agent.agent, summary_agent.agent],
-                            tasks=[
-                                calculator_agent.create_task(financial_data, finance_tools),
-                                summary_agent.create_task()
-                            ],
-                            process=Process.sequential,
-                            verbose=True
-                        )
-                        
-                        await send_agent_update(websocket, "BenefitCalculatorAgent", "Calculating the benefit", request_id)
-                        second_result = second_crew.kickoff()
-                        await send_agent_update(websocket, "SummaryGeneratorAgent", "Generating summary", request_id)
-                        
-                        calculator_output = second_result.tasks_output[0].raw
-                        summary_output = second_result.tasks_output[1].raw
-                        
-                        if isinstance(calculator_output, str):
-                            json_match = re.search(r'\{.*\}', calculator_output, re.DOTALL)
-                            if json_match:
-                                json_str = json_match.group(0)
-                                json_str = fix_json_string(json_str)
-                                json_str = json_str.replace(r'\\$', '$')
-                                benefits = json.loads(json_str)
-                            else:
-                                json_str = fix_json_string(calculator_output)
-                                json_str = json_str.replace(r'\\$', '$')
-                                benefits = json.loads(json_str)
-                        else:
-                            benefits = calculator_output
-
-                        summary = summary_output or "Financial data and benefits calculated."
-                        
-                        await websocket.send_json({
-                            "type": "result",
-                            "data": {
-                                "financial_data": financial_data,
-                                "benefits": benefits,
-                                "summary": summary
-                            },
-                            "request_id": request_id
-                        })
-                        logger.info(
-                            f"Result sent - Financial Data: {financial_data}, Benefits: {benefits}, Summary: {summary}",
-                            extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                        )
-                        break
-                
-                except (Exception, json.JSONDecodeError) as e:
-                    retries += 1
-                    if retries == MAX_RETRIES:
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"Failed after {MAX_RETRIES} attempts: {str(e)}",
-                            "request_id": request_id
-                        })
-                        logger.error(
-                            f"Failed after {MAX_RETRIES} attempts: {str(e)}",
-                            extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                        )
-                    else:
-                        await websocket.send_json({
-                            "type": "message",
-                            "content": f"Retry attempt {retries + 1}/{MAX_RETRIES} due to error: {str(e)}",
-                            "request_id": request_id
-                        })
-                        logger.warning(
-                            f"Retry attempt {retries + 1}/{MAX_RETRIES} due to error: {str(e)}",
-                            extra={"ip": client_ip, "browser": user_agent, "request_id": request_id}
-                        )
-                        await websocket.send_json({"type": "thinking", "request_id": request_id})
-                        time.sleep(2)
+            try:
+                with span("request", trace_id=request_id, mode=current_mode, input=user_input[:200], ticker=ticker):
+                    await handle_request(websocket, request_id, user_input, ticker, auto_detect, current_mode, log_extra)
+            except StageFailed as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Failed after {e.attempts} attempts: {str(e.error)}",
+                    "request_id": request_id
+                })
+                logger.error(str(e), extra=log_extra)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "message": f"Failed to process the request: {str(e)}",
+                    "request_id": request_id
+                })
+                logger.error(f"Failed to process the request: {str(e)}", extra=log_extra)
             
     except WebSocketDisconnect as e:
-        print(f"WebSocket disconnected: {str(e)}")
         logger.info(
             "WebSocket disconnected",
             extra={"ip": client_ip, "browser": user_agent, "request_id": "unknown"}
         )
         await websocket.send_json({"type": "error", "message": "WebSocket connection closed", "request_id": "unknown"})
     except Exception as e:
-        print(f"WebSocket error: {str(e)}")
         logger.error(
             f"WebSocket error: {str(e)}",
             extra={"ip": client_ip, "browser": user_agent, "request_id": "unknown"}
@@ -0,0 +1,85 @@
+# materialize_roi.py
+"""Offline job: precompute ROI benefits for every company in companies.json.
+
+Fundamentals are fetched with a worker pool, non-inventory companies are skipped, and all remaining
+companies go through the vectorized BenefitEngine in one pass. The result is written as a new
+versioned, memory-mappable table under ROI_TABLE_DIR (see tools/roi_table.py) which the web app
+serves directly for fresh tickers. Run it on a schedule (e.g. nightly) to keep the table fresh.
+
+Usage:
+    python materialize_roi.py
+    python materialize_roi.py --workers 32 --limit 200
+    python materialize_roi.py --symbols AAPL WMT TGT
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from dotenv import load_dotenv
+from tools.finance_tools import FinanceTools
+from tools.ticker_index import COMPANIES_FILE, listing_rank
+from tools.roi_table import ROI_TABLE_DIR, write_table
+
+load_dotenv()
+
+
+def universe(companies_file=COMPANIES_FILE):
+    """Primary listings (common stock, ADRs, ordinary shares) from companies.json, sorted by symbol."""
+    with open(companies_file, "r", encoding="utf-8") as f:
+        companies = json.load(f)
+    return sorted({symbol.upper() for name, symbol in companies.items() if listing_rank(name, symbol) <= 1})
+
+
+def materialize(symbols, finance_tools, workers, directory=ROI_TABLE_DIR):
+    """Fetch, compute and write one table version. Returns the version name, or None if nothing qualified."""
+    fetcher = finance_tools.yfinance_tool
+    snapshots, fetched_at, skipped = [], [], 0
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetcher.fetch_snapshot, symbol): symbol for symbol in symbols}
+        for done, future in enumerate(as_completed(futures), 1):
+            symbol = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+            if isinstance(result, dict):
+                skipped += 1
+            else:
+                snapshots.append(result)
+                fetched_at.append(time.time())
+            if done % 100 == 0 or done == len(futures):
+                print(f"[{done}/{len(futures)}] {len(snapshots)} inventory companies, {skipped} skipped ({time.time() - started:.0f}s)")
+
+    if not snapshots:
+        print("No inventory-based companies fetched; keeping the current table.")
+        return None
+
+    calculator = finance_tools.calculator_tool
+    tiers, values, _ = calculator.compute(snapshots)
+    version = write_table(directory, snapshots, np.array(fetched_at), tiers, values, calculator.engine, calculator.benefit_mapping)
+    print(f"Wrote ROI table {version} with {len(snapshots)} companies to {directory}")
+    return version
+
+
+def main(args):
+    symbols = [s.strip().upper() for s in args.symbols] if args.symbols else universe()
+    if args.limit:
+        symbols = symbols[:args.limit]
+    if not symbols:
+        print("No symbols to materialize.", file=sys.stderr)
+        return 1
+    version = materialize(symbols, FinanceTools(), args.workers, args.output)
+    return 0 if version else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute ROI benefits for the companies.json universe.")
+    parser.add_argument("--symbols", nargs="*", help="Only materialize these tickers")
+    parser.add_argument("--limit", type=int, help="Only materialize the first N symbols")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent fundamentals fetches")
+    parser.add_argument("--output", default=ROI_TABLE_DIR, help="Table directory")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,195 @@
+# metrics.py
+"""In-process counters and latency histograms, served at /metrics.
+
+Histograms keep cumulative Prometheus buckets for scraping plus a window of the most recent
+observations per label set, from which the JSON view reports p50/p95/p99. Everything is thread-safe:
+stages and crews record from worker threads.
+"""
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+WINDOW = 2048
+
+
+def _escape(value):
+    # The text format only allows these three escapes in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _percentile(ordered, q):
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)] if ordered else 0.0
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labelnames, key)} {value}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts, sum, count, recent observations]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0, deque(maxlen=WINDOW)]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            series[3].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block, with outcome="ok", or "error" if it raised."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.observe(time.perf_counter() - started, **labels, outcome=outcome)
+
+    def prometheus(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count, _) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _label_text(self.labelnames + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_text(self.labelnames + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self):
+        series = []
+        with self._lock:
+            for key, (_, total, count, recent) in sorted(self._series.items()):
+                ordered = sorted(recent)
+                series.append({
+                    "labels": dict(zip(self.labelnames, key)),
+                    "count": count,
+                    "avg": total / count if count else 0.0,
+                    "p50": _percentile(ordered, 0.50),
+                    "p95": _percentile(ordered, 0.95),
+                    "p99": _percentile(ordered, 0.99),
+                    "max": ordered[-1] if ordered else 0.0
+                })
+        return series
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._metrics.setdefault(name, Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, labelnames, buckets))
+
+    def prometheus(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """JSON view: counter values and histogram percentiles (seconds) per label set."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "roi_stage_seconds", "Duration of one attempt of a request stage.", ("stage", "mode", "outcome"))
+STAGE_RETRIES = registry.counter(
+    "roi_stage_retries_total", "Stage attempts that failed and were retried.", ("stage", "mode"))
+CREW_SECONDS = registry.histogram(
+    "roi_crew_kickoff_seconds", "Duration of a crew kickoff.", ("crew", "outcome"))
+TOOL_SECONDS = registry.histogram(
+    "roi_tool_seconds", "Duration of a finance tool call; error when it raised or returned an error.", ("tool", "outcome"))
+LLM_QUEUE_SECONDS = registry.histogram(
+    "roi_llm_queue_seconds", "Time an LLM call waited for a gateway slot.", ("priority",))
+LLM_GENERATION_SECONDS = registry.histogram(
+    "roi_llm_generation_seconds", "Duration of an LLM call once it holds a slot.", ("model", "priority", "outcome"))
+LLM_CACHE_LOOKUPS = registry.counter(
+    "roi_llm_cache_lookups_total", "LLM response cache lookups.", ("model", "outcome"))
+RECORDER_LOOKUPS = registry.counter(
+    "roi_finance_recorder_total", "Finance provider responses recorded (good or negative), replayed, served as fallback or missing.", ("source", "outcome"))
+PREDEFINED_ROUTES = registry.counter(
+    "roi_predefined_routes_total", "Messages checked against the predefined answers; hit means a canned answer was sent.", ("outcome",))
+EMBED_BATCH_SIZE = registry.histogram(
+    "roi_embedding_batch_size", "Texts embedded together in one EmbeddingService batch.", (),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+EMBED_WAIT_SECONDS = registry.histogram(
+    "roi_embedding_wait_seconds", "Time an embedding request queued before its batch started.")
+EMBED_BATCH_SECONDS = registry.histogram(
+    "roi_embedding_batch_seconds", "Duration of one batched embedding call and index search.", ("outcome",))
+PARSE_FAILURES = registry.counter(
+    "roi_parse_failures_total", "LLM outputs that could not be parsed into the expected structure.", ("schema",))
+
+
+def is_error_result(result):
+    """Finance tools report failures as {"error": ...} or an "Error: ..." string rather than raising."""
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.startswith("Error")
+
+
+def timed_tool(func):
+    """Record a tool method's duration in TOOL_SECONDS under the tool's name."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = func(self, *args, **kwargs)
+            outcome = "error" if is_error_result(result) else "ok"
+            return result
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=self.name, outcome=outcome)
+    return wrapper
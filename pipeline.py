@@ -0,0 +1,119 @@
+# pipeline.py
+"""Stage runner for the chat pipeline.
+
+A financial request runs as named stages (intent -> collect -> calculate -> summarize; questions
+run intent -> answer). Each stage's output is checkpointed under the request_id and the stage's
+inputs, so a failing stage is retried on its own with the stored outputs of the stages before it,
+and a repeated request (e.g. the client re-sending after a dropped connection) resumes from the
+first stage without a checkpoint. Every stage has its own retry budget and exponential backoff.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from app_logging import get_logger
+from metrics import STAGE_RETRIES, STAGE_SECONDS
+from tracing import span
+
+logger = get_logger("pipeline")
+
+MAX_RETRIES = int(os.getenv("MAX_RETRIES", 3))
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", 900))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    backoff: float = 1.0  # seconds before the first retry
+    multiplier: float = 2.0
+    max_backoff: float = 10.0
+
+    def delay(self, attempt):
+        """Seconds to wait after the given failed attempt (1-based)."""
+        return min(self.backoff * self.multiplier ** (attempt - 1), self.max_backoff)
+
+
+STAGE_POLICIES = {
+    # A routing miss or failure just falls through to the normal pipeline
+    "route": RetryPolicy(attempts=1),
+    "intent": RetryPolicy(attempts=2, backoff=0.5),
+    "answer": RetryPolicy(attempts=MAX_RETRIES, backoff=1.0),
+    "collect": RetryPolicy(attempts=MAX_RETRIES, backoff=2.0),
+    "calculate": RetryPolicy(attempts=MAX_RETRIES, backoff=1.0),
+    "summarize": RetryPolicy(attempts=2, backoff=1.0),
+}
+
+
+class StageFailed(Exception):
+    """A stage used up its retry budget."""
+
+    def __init__(self, stage, attempts, error):
+        super().__init__(f"{stage} failed after {attempts} attempts: {error}")
+        self.stage = stage
+        self.attempts = attempts
+        self.error = error
+
+
+class CheckpointStore:
+    """Thread-safe, bounded store of stage outputs keyed by (request_id, stage, inputs), expiring after ttl seconds."""
+
+    def __init__(self, ttl=CHECKPOINT_TTL, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, request_id, stage, key=""):
+        """Return (found, value)."""
+        with self._lock:
+            entry = self._entries.get((request_id, stage, key))
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[(request_id, stage, key)]
+                return False, None
+            return True, value
+
+    def put(self, request_id, stage, value, key=""):
+        with self._lock:
+            self._entries[(request_id, stage, key)] = (time.time(), value)
+            self._entries.move_to_end((request_id, stage, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+async def run_stage(checkpoints, request_id, stage, func, *args, key="", policy=None, on_retry=None, mode=""):
+    """Return the checkpointed output of a stage, or run func(*args) under the stage's retry policy and checkpoint it.
+
+    Blocking functions (crew kickoffs, data fetches) run in a worker thread; coroutine functions are
+    awaited. on_retry(stage, attempt, attempts, error) is awaited before each retry. Every attempt
+    is recorded in STAGE_SECONDS under the stage and the request's mode.
+    """
+    found, value = checkpoints.get(request_id, stage, key)
+    if found:
+        logger.info(f"{stage}: resumed from checkpoint", extra={"request_id": request_id})
+        STAGE_SECONDS.observe(0.0, stage=stage, mode=mode, outcome="checkpoint")
+        with span(f"stage.{stage}", mode=mode, checkpoint=True):
+            return value
+
+    policy = policy or STAGE_POLICIES.get(stage, RetryPolicy(attempts=MAX_RETRIES))
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            with span(f"stage.{stage}", mode=mode, attempt=attempt), STAGE_SECONDS.time(stage=stage, mode=mode):
+                if asyncio.iscoroutinefunction(func):
+                    value = await func(*args)
+                else:
+                    value = await asyncio.to_thread(func, *args)
+            checkpoints.put(request_id, stage, value, key)
+            return value
+        except Exception as e:
+            logger.warning(f"{stage}: attempt {attempt}/{policy.attempts} failed: {str(e)}", extra={"request_id": request_id})
+            if attempt == policy.attempts:
+                raise StageFailed(stage, attempt, e) from e
+            STAGE_RETRIES.inc(stage=stage, mode=mode)
+            if on_retry is not None:
+                await on_retry(stage, attempt + 1, policy.attempts, e)
+            await asyncio.sleep(policy.delay(attempt))
@@ -1,13 +1,23 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-import asyncio
-import json
-import logging
+# predefined.py
+"""Canned answers to common questions about Impact Analytics, matched by embedding.
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+PredefinedRouter embeds the predefined questions once. A user message that equals one of them
+(ignoring case and spacing), or whose embedding has at least PREDEFINED_MIN_SIMILARITY cosine
+similarity to one, gets the canned answer without the intent check, retrieval or LLM calls. A
+message that is only a company name or ticker (e.g. "PriceSmart", the retailer PSMT, next to the
+PriceSmart product question) is never routed by similarity. Calibrate the threshold with the route
+cases in benchmarks/routing_eval.py.
+"""
+import os
 
-app = FastAPI()
+import numpy as np
+
+from app_logging import get_logger
+from metrics import PREDEFINED_ROUTES
+
+logger = get_logger("predefined")
+
+PREDEFINED_MIN_SIMILARITY = float(os.getenv("PREDEFINED_MIN_SIMILARITY", 0.9))
 
 # Predefined answers and their questions
 predefined_answers = {
@@ -20,45 +30,47 @@ predefined_answers = {
     "Schedule a Consultation": "Thank you for showing your interest. Our team will reach you soon."
 }
 
-def unescape_single_quotes(str):
-    """Unescape single quotes and other special characters to match predefined keys."""
-    return str.replace("\\'", "'").replace('\\"', '"').replace('\\n', '\n').replace('\\r', '\r')
-
-@app.websocket("/ws")
-async def websocket_predefined(websocket: WebSocket):
-    await websocket.accept()
-    logger.info("Predefined WebSocket (port 8001) connection opened")
-    try:
-        while True:
-            message = await websocket.receive_text()
-            data = json.loads(message)
-            logger.debug(f"Predefined WS (8001) received at {asyncio.get_event_loop().time()}: {data}")
-            message_type = data.get("type")
-            content = data.get("content")
-            request_id = data.get("request_id", "unknown")
-            await asyncio.sleep(0.6)
-
-            # Send "thinking" message for predefined questions
-            if message_type == "predefined_question":
-                await websocket.send_json({"type": "thinking", "request_id": request_id})
-                # Normalize the content to match predefined answers
-                normalized_content = unescape_single_quotes(content)
-                answer = predefined_answers.get(normalized_content, "No predefined answer available.")
-                await asyncio.sleep(0.5)  # Minimal delay for realism
-                logger.debug(f"Predefined WS (8001) sending message at {asyncio.get_event_loop().time()} for {request_id}")
-                await websocket.send_json({"type": "message", "content": answer, "request_id": request_id})
-            elif message_type == "fetch_predefined_questions":
-                # Return the list of predefined questions (keys from predefined_answers)
-                questions = list(predefined_answers.keys())
-                await websocket.send_json({
-                    "type": "predefined_questions",
-                    "questions": questions,
-                    "request_id": request_id
-                })
-            else:
-                await websocket.send_json({"type": "error", "message": "Invalid message type", "request_id": request_id})
-    except WebSocketDisconnect:
-        logger.info("Predefined WebSocket (port 8001) client disconnected")
-    except Exception as e:
-        logger.error(f"Predefined WS (8001) error: {str(e)}")
-        await websocket.send_json({"type": "error", "message": str(e), "request_id": "unknown"})
\ No newline at end of file
+
+def normalize(text):
+    return " ".join(str(text).split()).casefold()
+
+
+def unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class PredefinedRouter:
+    """Maps a user message to a predefined question and its answer, or None."""
+
+    def __init__(self, embedding_model, answers=None, min_similarity=PREDEFINED_MIN_SIMILARITY, company_lookup=None):
+        self.embedding_model = embedding_model
+        self.answers = answers or predefined_answers
+        self.questions = list(self.answers)
+        self.min_similarity = min_similarity
+        # Resolves a name or ticker to a symbol (TickerIndex.lookup), None when the text is not a company
+        self.company_lookup = company_lookup
+        self._exact = {normalize(question): question for question in self.questions}
+        self._vectors = unit_rows(embedding_model.embed_documents(self.questions))
+        logger.info(f"Indexed {len(self.questions)} predefined questions")
+
+    def closest(self, text):
+        """(question, score, exact) for the most similar predefined question, whatever the threshold; question is None for a company."""
+        question = self._exact.get(normalize(text))
+        if question is not None:
+            return question, 1.0, True
+        if not text.strip() or (self.company_lookup is not None and self.company_lookup(text)):
+            return None, 0.0, False
+        similarities = self._vectors @ unit_rows(self.embedding_model.embed_query(text))
+        best = int(np.argmax(similarities))
+        return self.questions[best], float(similarities[best]), False
+
+    def match(self, text):
+        """{"question", "answer", "score"} for the closest predefined question, or None below the threshold."""
+        question, score, exact = self.closest(text)
+        if not exact and score < self.min_similarity:
+            question = None
+        PREDEFINED_ROUTES.inc(outcome="hit" if question is not None else "miss")
+        if question is None:
+            return None
+        return {"question": question, "answer": self.answers[question], "score": score}
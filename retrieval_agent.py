@@ -4,23 +4,37 @@ import os
 from pathlib import Path
 from langchain.embeddings import HuggingFaceEmbeddings
 from crewai import Agent
-from config import llm_client, ticker_json
-from sklearn.metrics.pairwise import cosine_similarity
+from config import llm_for
+from tracing import traced
+from app_logging import get_logger, sampled
+from embedding_service import EmbeddingService
+from retrieval_store import load_chunks, rank_ticker_matches, read_manifest, ChunkStore, SHARED_ASSETS_DIR
 from dotenv import load_dotenv
 import json
 
 load_dotenv()
 
+logger = get_logger("retrieval")
+
 
 JSON_FILE = "companies.json"  # Update with your actual JSON file
 EMBEDDINGS_FILE = "company_embeddings.npy"
 NAMES_FILE = "company_names_symbols.json"
 
+# Assets written once by serve_workers.py and memory-mapped by every worker (see retrieval_store.py)
+shared_manifest = read_manifest(SHARED_ASSETS_DIR) if SHARED_ASSETS_DIR else None
+if SHARED_ASSETS_DIR and shared_manifest is None:
+    logger.warning(f"No shared assets in {SHARED_ASSETS_DIR}; loading private copies")
+
 
 def load_embeddings():
     """Load precomputed embeddings and company data."""
-    print("Loading precomputed embeddings...")
-    embeddings = np.load(EMBEDDINGS_FILE)
+    logger.info("Loading precomputed embeddings...")
+    if shared_manifest is not None:
+        # Unit-length rows, mapped read-only
+        embeddings = np.load(os.path.join(SHARED_ASSETS_DIR, "ticker_embeddings.npy"), mmap_mode="r")
+    else:
+        embeddings = np.load(EMBEDDINGS_FILE)
 
     with open(NAMES_FILE, 'r', encoding='utf-8') as f:
         data = json.load(f)
@@ -29,13 +43,27 @@ def load_embeddings():
 
 
 if not os.path.exists(EMBEDDINGS_FILE) or not os.path.exists(NAMES_FILE):
-    print("EMBEDDINGS FILE file is missing.")
+    logger.warning("EMBEDDINGS FILE file is missing.")
 else:
     embeddings, company_names, company_symbols = load_embeddings()
-    print("Ticker EMBEDDINGS loaded.")
+    logger.info("Ticker EMBEDDINGS loaded.")
 
 
-# Load cached embeddings
+def read_index_shared(path):
+    """Open a faiss index read-only with mmap flags, so workers share its pages instead of copying them."""
+    flags = faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP
+    # faiss >= 1.10 can also map the codes of flat indexes (IndexFlat*), not just inverted lists
+    if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        flags |= faiss.IO_FLAG_MMAP_IFC
+    else:
+        logger.warning(f"faiss {faiss.__version__} cannot memory-map flat index codes; "
+                       f"each worker reads a private copy of {path} (upgrade to faiss >= 1.10 to share it)")
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError as e:
+        logger.warning(f"Cannot memory-map {path} ({str(e)}); reading a private copy")
+        return faiss.read_index(path)
+
 
 class RetrievalAgent:
     def __init__(self, index_path="./vindex/combined_index.index", chunks_path="./vindex/combined_chunks_with_metadata.jsonl"):
@@ -48,48 +76,50 @@ class RetrievalAgent:
         if not self.index_path.exists():
             raise FileNotFoundError(f"FAISS index file not found: {self.index_path.resolve()}")
 
-        # Load FAISS index
-        self.index = faiss.read_index(str(self.index_path))
-        print(f"Loaded FAISS index from: {self.index_path.resolve()} with {self.index.ntotal} vectors")
-
         # Ensure the chunks file exists
         if not self.chunks_path.exists():
             raise FileNotFoundError(f"Chunks file not found: {self.chunks_path.resolve()}")
 
-        # Load document chunks with metadata
-        self.all_docs = []
-        with self.chunks_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                chunk_data = json.loads(line.strip())
-                self.all_docs.append({
-                    "content": chunk_data["content"],
-                    "metadata": chunk_data["metadata"]
-                })
-        print(f"Loaded {len(self.all_docs)} chunks with metadata from {self.chunks_path.resolve()}")
+        if shared_manifest is not None:
+            # Attach to the copies serve_workers.py built from these files
+            self.index = read_index_shared(os.path.join(SHARED_ASSETS_DIR, "index.faiss"))
+            self.all_docs = ChunkStore(SHARED_ASSETS_DIR)
+            logger.info(f"Attached to shared assets in {SHARED_ASSETS_DIR}: {self.index.ntotal} vectors, {len(self.all_docs)} chunks")
+        else:
+            # Load FAISS index
+            self.index = faiss.read_index(str(self.index_path))
+            logger.info(f"Loaded FAISS index from: {self.index_path.resolve()} with {self.index.ntotal} vectors")
+
+            # Load document chunks with metadata
+            self.all_docs = load_chunks(self.chunks_path)
+            logger.info(f"Loaded {len(self.all_docs)} chunks with metadata from {self.chunks_path.resolve()}")
 
         # Validate consistency
         if self.index.ntotal != len(self.all_docs):
             raise ValueError(f"Mismatch: Index has {self.index.ntotal} vectors, but {len(self.all_docs)} chunks found.")
 
+        # Query embeddings and index searches from concurrent requests are batched together
+        self.embedding_service = EmbeddingService(self.embedding_model, index=self.index)
+
         # Define the crewai Agent
         self.agent = Agent(
             role="Document Retrieval Specialist",
             goal="Retrieve relevant paragraphs from indexed documents to answer user questions",
             backstory="I am an expert in searching and retrieving information from a vast repository of documents.",
             verbose=True,
-            llm=llm_client
+            llm=llm_for("answer")
         )
 
+    @traced("retrieval.retrieve_context")
     def retrieve_context(self, query, top_k=3):
         """Retrieve top-k relevant chunks with content and metadata for a given query."""
-        query_embedding = self.embedding_model.embed_query(query)
-        query_embedding = np.array([query_embedding], dtype=np.float32)
-
-        D, I = self.index.search(query_embedding, top_k)
+        D, I = self.embedding_service.search(query, top_k)
         distances = D[0]
         indices = I[0]
 
         relevant_contexts = []
+        # Per-chunk logs are verbose; keep them for a sample of queries
+        log_chunks = sampled()
         for i, (idx, dist) in enumerate(zip(indices, distances)):
             if idx < len(self.all_docs):
                 chunk = self.all_docs[idx]
@@ -100,9 +130,13 @@ class RetrievalAgent:
                     "content": chunk["content"],
                     "metadata": chunk["metadata"]  # Include metadata with URL
                 })
-                print(f"Rank {i+1}: Distance={dist:.4f}, Index={idx}, URL={chunk['metadata']['url']}, Chunk='{chunk['content'][:100]}...'")
+                if log_chunks:
+                    logger.info("Retrieved chunk", extra={"fields": {
+                        "query": query, "rank": i + 1, "distance": float(dist), "index": int(idx),
+                        "url": chunk["metadata"].get("url"), "chunk": chunk["content"][:100]
+                    }})
             else:
-                print(f"Warning: Invalid index {idx} retrieved (out of bounds)")
+                logger.warning(f"Invalid index {idx} retrieved (out of bounds)")
         
         return relevant_contexts
 
@@ -124,36 +158,12 @@ class RetrievalAgent:
     
 
 
+    @traced("retrieval.get_top_ticker_matches")
     def get_top_ticker_matches(self, query, top_n=3):
         """Find the most relevant matches from both company names and symbols."""
-    
-        # Compute embedding for the query
-        query_embedding = np.array(self.embedding_model.embed_query(query)).reshape(1, -1)
-
-        # Compute cosine similarity against all stored embeddings (names + symbols)
-        similarities = cosine_similarity(query_embedding, embeddings)[0]
-
-        # Get top N matches
-        top_indices = np.argsort(similarities)[::-1][:top_n]
-
-        results = []
-        half_length = len(company_names)  # Half embeddings are for names, half for symbols
-
-        for i in top_indices:
-            if i < half_length:
-                matched_name = company_names[i]
-                matched_symbol = company_symbols[i]  # Get the corresponding symbol
-            else:
-                matched_symbol = company_symbols[i - half_length]
-                matched_name = company_names[i - half_length]  # Get the corresponding name
-
-            results.append({
-                "name": matched_name,
-                "symbol": matched_symbol,
-                "score": similarities[i]
-            })
-
-        return results
+        query_embedding = self.embedding_service.embed(query)
+        return rank_ticker_matches(query_embedding, embeddings, company_names, company_symbols, top_n,
+                                   normalized=shared_manifest is not None)
 
 # Singleton instance
 retrieval_agent_instance = RetrievalAgent()
\ No newline at end of file
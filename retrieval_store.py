@@ -0,0 +1,166 @@
+# retrieval_store.py
+"""Data behind RetrievalAgent: the document chunks and the ticker name/symbol embedding matrix.
+
+Kept free of the embedding model and the index so benchmarks/micro_bench.py can time them alone.
+
+For multi-worker serving (serve_workers.py), the read-only assets are written once to
+SHARED_ASSETS_DIR and every worker memory-maps them instead of loading its own copy:
+    chunks.jsonl, chunk_offsets.npy   chunk records, decoded one at a time on access (ChunkStore)
+    ticker_embeddings.npy             the [names; symbols] matrix with unit-length rows
+    index.faiss                       the faiss index, opened with mmap flags by RetrievalAgent
+    manifest.json                     sizes and mtimes of the sources the assets were built from
+Mapped pages live in the OS page cache once, however many workers attach.
+"""
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+SHARED_ASSETS_DIR = os.getenv("SHARED_ASSETS_DIR", "")
+
+
+def load_chunks(path):
+    """Chunks from a JSONL file of {"content", "metadata"} records, in index order."""
+    chunks = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            chunk_data = json.loads(line.strip())
+            chunks.append({
+                "content": chunk_data["content"],
+                "metadata": chunk_data["metadata"]
+            })
+    return chunks
+
+
+def rank_ticker_matches(query_embedding, embeddings, company_names, company_symbols, top_n=3, normalized=False):
+    """Top matches of a query embedding against the stacked [names; symbols] embedding matrix.
+
+    With normalized=True the matrix rows are already unit length (the shared ticker_embeddings.npy),
+    so cosine similarity is a single matrix-vector product with no per-call copy of the matrix.
+    """
+    if normalized:
+        query = np.asarray(query_embedding, dtype=embeddings.dtype)
+        similarities = embeddings @ (query / (np.linalg.norm(query) or 1.0))
+    else:
+        from sklearn.metrics.pairwise import cosine_similarity
+        # Compute cosine similarity against all stored embeddings (names + symbols)
+        similarities = cosine_similarity(np.asarray(query_embedding).reshape(1, -1), embeddings)[0]
+
+    # Get top N matches
+    top_indices = np.argsort(similarities)[::-1][:top_n]
+
+    results = []
+    half_length = len(company_names)  # Half embeddings are for names, half for symbols
+
+    for i in top_indices:
+        if i < half_length:
+            matched_name = company_names[i]
+            matched_symbol = company_symbols[i]  # Get the corresponding symbol
+        else:
+            matched_symbol = company_symbols[i - half_length]
+            matched_name = company_names[i - half_length]  # Get the corresponding name
+
+        results.append({
+            "name": matched_name,
+            "symbol": matched_symbol,
+            "score": float(similarities[i])
+        })
+
+    return results
+
+
+class ChunkStore:
+    """Read-only, memory-mapped chunk list: len() and chunks[i] like the list load_chunks returns."""
+
+    def __init__(self, directory):
+        self.offsets = np.load(os.path.join(directory, "chunk_offsets.npy"), mmap_mode="r")
+        self.data = np.memmap(os.path.join(directory, "chunks.jsonl"), dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        chunk_data = json.loads(self.data[self.offsets[i]:self.offsets[i + 1]].tobytes())
+        return {"content": chunk_data["content"], "metadata": chunk_data["metadata"]}
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "bytes": stat.st_size, "mtime": stat.st_mtime}
+
+
+def replace_file(path, write):
+    """Write a file through a temporary name, so processes that still map the old file keep reading it intact."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def write_shared_assets(directory, chunks_path, index_path, embeddings_path):
+    """Build the shared asset set from the source files and return its manifest."""
+    os.makedirs(directory, exist_ok=True)
+
+    offsets = [0]
+
+    def copy_chunks(dst):
+        with open(chunks_path, "rb") as src:
+            for line in src:
+                if line.strip():
+                    dst.write(line)
+                    offsets.append(offsets[-1] + len(line))
+    replace_file(os.path.join(directory, "chunks.jsonl"), copy_chunks)
+    replace_file(os.path.join(directory, "chunk_offsets.npy"), lambda f: np.save(f, np.array(offsets, dtype=np.int64)))
+
+    embeddings = np.load(embeddings_path).astype(np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    replace_file(os.path.join(directory, "ticker_embeddings.npy"),
+                 lambda f: np.save(f, embeddings / np.where(norms == 0, 1, norms)))
+
+    def copy_index(dst):
+        with open(index_path, "rb") as src:
+            shutil.copyfileobj(src, dst)
+    replace_file(os.path.join(directory, "index.faiss"), copy_index)
+
+    manifest = {
+        "created_at": time.time(),
+        "chunks": len(offsets) - 1,
+        "ticker_embeddings": list(embeddings.shape),
+        "sources": {
+            "chunks": source_stamp(chunks_path),
+            "index": source_stamp(index_path),
+            "embeddings": source_stamp(embeddings_path)
+        }
+    }
+    # Written last: a directory without a manifest is an unfinished build
+    tmp_manifest = os.path.join(directory, "manifest.json.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_manifest, os.path.join(directory, "manifest.json"))
+    return manifest
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ensure_shared_assets(directory, chunks_path, index_path, embeddings_path, rebuild=False):
+    """Return the manifest of an up-to-date asset set, rebuilding it when a source file changed."""
+    manifest = read_manifest(directory)
+    sources = {"chunks": chunks_path, "index": index_path, "embeddings": embeddings_path}
+    if not rebuild and manifest is not None and all(
+        manifest["sources"][name] == source_stamp(path) for name, path in sources.items()
+    ):
+        return manifest
+    return write_shared_assets(directory, chunks_path, index_path, embeddings_path)
@@ -0,0 +1,61 @@
+# serve_workers.py
+"""Run main:app in several uvicorn workers that share the read-only retrieval assets.
+
+The parent process builds the asset set once (retrieval_store.write_shared_assets: chunk store,
+unit-length ticker matrix, faiss index) under SHARED_ASSETS_DIR, rebuilding it only when a source
+file changed, then starts the workers with SHARED_ASSETS_DIR set. Each worker memory-maps the files
+instead of loading its own copy, so the index, chunks and ticker matrix take their memory once,
+in the page cache. Every worker still loads its own embedding model.
+
+Torch's intra-op threads are split between the workers (OMP_NUM_THREADS, unless already set) so
+N workers do not each start one thread per core.
+
+The rest of the app state is per worker: the LLM gateway's LLM_MAX_IN_FLIGHT and priorities,
+single-flight deduplication, stage checkpoints and Idempotency-Key replays. Ollama can see
+workers x LLM_MAX_IN_FLIGHT concurrent calls, and a retry on another worker is not deduplicated.
+The SQLite caches are shared through WAL mode (see readme).
+
+Usage:
+    python serve_workers.py --workers 8 --port 8000
+    python serve_workers.py --rebuild
+"""
+import argparse
+import os
+
+import uvicorn
+from dotenv import load_dotenv
+
+from retrieval_store import SHARED_ASSETS_DIR, ensure_shared_assets
+
+load_dotenv()
+
+# RetrievalAgent's default source files
+CHUNKS_FILE = os.path.join("vindex", "combined_chunks_with_metadata.jsonl")
+INDEX_FILE = os.path.join("vindex", "combined_index.index")
+EMBEDDINGS_FILE = "company_embeddings.npy"
+
+
+def main(args):
+    directory = os.path.abspath(args.assets_dir)
+    manifest = ensure_shared_assets(directory, args.chunks, args.index, args.embeddings, rebuild=args.rebuild)
+    size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+    print(f"Shared assets in {directory}: {manifest['chunks']} chunks, ticker matrix "
+          f"{' x '.join(map(str, manifest['ticker_embeddings']))}, {size / 2**20:.1f} MiB mapped by {args.workers} workers")
+
+    # Inherited by the spawned workers
+    os.environ["SHARED_ASSETS_DIR"] = directory
+    os.environ.setdefault("OMP_NUM_THREADS", str(max(1, (os.cpu_count() or 1) // args.workers)))
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the app from several workers sharing memory-mapped retrieval assets.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--assets-dir", default=SHARED_ASSETS_DIR or "shared_assets", help="Where the shared asset files are written")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the assets even if the sources did not change")
+    parser.add_argument("--chunks", default=CHUNKS_FILE)
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("--embeddings", default=EMBEDDINGS_FILE)
+    main(parser.parse_args())
@@ -0,0 +1,125 @@
+# singleflight.py
+"""Single-flight execution of identical in-flight requests.
+
+When several users ask for the same company at the same time, only the first request runs the
+pipeline. Later requests with the same key attach to it: they first get a replay of the progress
+messages sent so far, then every further message, and finally the same result. Every subscriber
+has its own ordered queue, filled with the history when it subscribes and with each message as it
+is emitted, and its own send function drains it, so every WebSocket stamps its own request_id and
+a slow or failed connection does not hold up the work or the others.
+
+The work talks to a FlightChannel, never to a caller's connection. It can ask for input only
+while the flight has a single subscriber that can answer; a shared flight fails the question.
+"""
+import asyncio
+
+from app_logging import get_logger
+
+logger = get_logger("singleflight")
+
+DONE = object()
+
+
+class Subscriber:
+    def __init__(self, history, receive=None):
+        self.queue = asyncio.Queue()
+        for message in history:
+            self.queue.put_nowait(message)
+        self.receive = receive
+
+
+class FlightChannel:
+    """The work's connection: send_json broadcasts to every subscriber, receive_text asks the only one.
+
+    receive_text works only while the flight has exactly one subscriber and that subscriber passed a
+    `receive` function; otherwise it raises RuntimeError. Work that can be shared must not ask for input.
+    """
+
+    def __init__(self, flight):
+        self.flight = flight
+
+    async def emit(self, message: dict):
+        self.flight.emit(message)
+
+    async def send_json(self, message: dict):
+        self.flight.emit(message)
+
+    async def receive_text(self):
+        subscribers = self.flight.subscribers
+        if len(subscribers) != 1 or subscribers[0].receive is None:
+            raise RuntimeError(f"Cannot ask for input: this request is shared by {len(subscribers)} clients or has no reply channel")
+        return await subscribers[0].receive()
+
+
+class Flight:
+    """One running execution and the subscribers waiting on it."""
+
+    def __init__(self):
+        self.subscribers = []
+        self.history = []
+        self.task = None
+        self.channel = FlightChannel(self)
+
+    def subscribe(self, receive=None):
+        # No await between copying the history and joining, so no message is missed or reordered
+        subscriber = Subscriber(self.history, receive)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def emit(self, message: dict):
+        """Queue a progress or result message for every subscriber."""
+        self.history.append(message)
+        for subscriber in self.subscribers:
+            subscriber.queue.put_nowait(message)
+
+    def close(self):
+        for subscriber in self.subscribers:
+            subscriber.queue.put_nowait(DONE)
+
+
+class SingleFlight:
+    """Registry of in-flight executions keyed by e.g. (ticker, pipeline mode)."""
+
+    def __init__(self):
+        self.flights = {}
+
+    def in_flight(self, key):
+        return key in self.flights
+
+    async def run(self, key, send, work, receive=None):
+        """Run `await work(channel)` once per key and return (result, shared).
+
+        `send(message)` receives every message the work emits, in order; `receive()`, if given,
+        answers the work's questions while this caller is the only subscriber. `shared` is True
+        when this call attached to an execution started by another caller. Exceptions from the
+        work are raised in every caller; an exception from `send` is raised in this caller only.
+        """
+        flight = self.flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = Flight()
+            self.flights[key] = flight
+            subscriber = flight.subscribe(receive)
+            flight.task = asyncio.create_task(work(flight.channel))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+        else:
+            subscriber = flight.subscribe(receive)
+        try:
+            while (message := await subscriber.queue.get()) is not DONE:
+                await send(message)
+            # Shielded: a waiter going away must not cancel the work the others are waiting for
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.unsubscribe(subscriber)
+
+    def _finish(self, key, flight, task):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        # Runs after the work's last emit, so every subscriber gets all messages before DONE
+        flight.close()
+        if not task.cancelled() and task.exception() is not None and not flight.subscribers:
+            logger.error(f"Single-flight {key} failed with no subscribers left: {str(task.exception())}")
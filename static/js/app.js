@@ -1,7 +1,5 @@
-// WebSocket for user input (port 8000)
+// WebSocket for user input (port 8000); predefined questions are served over HTTP by the same app
 const socketMain = new WebSocket(`ws://${window.location.host}/ws`);
-// WebSocket for predefined questions (port 8001)
-const socketPredefined = new WebSocket(`ws://${window.location.host.replace(':8000', ':8001')}/ws`);
 const chatMessages = $("#chat-messages");
 let current_mode = "smart_detect"; //smart_detect, roi_mode, asking_about_ia
 
@@ -10,7 +8,7 @@ function formatTimestamp() {
     return new Date().toLocaleTimeString('en-US', { hour: '2-digit', minute: '2-digit', hour12: true });
 }
 
-// Predefined questions to engage the user (will be fetched from predefined.py)
+// Predefined questions to engage the user (fetched from /predefined/questions)
 let predefinedQuestions = [];
 
 // Track if first user input has been sent and if predefined questions are added
@@ -20,9 +18,8 @@ let predefinedQuestionsAdded = false;
 const pendingRequests = new Map();
 
 // Debug logging
-console.log("Opening WebSocket connections...");
+console.log("Opening WebSocket connection...");
 socketMain.onopen = () => console.log("Main WebSocket (port 8000) opened at", new Date().toISOString());
-socketPredefined.onopen = () => console.log("Predefined WebSocket (port 8001) opened at", new Date().toISOString());
 
 // Handle messages from socketMain (port 8000)
 // Handle messages from socketMain (port 8000)
@@ -63,7 +60,7 @@ socketMain.onmessage = function(event) {
             if (!firstInputSent) {
                 firstInputSent = true;
                 if (!predefinedQuestionsAdded) {
-                    socketPredefined.send(JSON.stringify({ type: "fetch_predefined_questions", request_id: data.request_id }));
+                    fetchPredefinedQuestions(data.request_id);
                 }
             }
             chatMessages.scrollTop(chatMessages[0].scrollHeight);
@@ -236,75 +233,45 @@ function sendTickerSelection(companyName, tickerSymbol, parentRequestId, autoDet
 }
 
 
-// Handle messages from socketPredefined (port 8001)
-socketPredefined.onmessage = function(event) {
-    const data = JSON.parse(event.data);
-    console.log(`Predefined WS (8001) received at ${new Date().toISOString()}:`, data, "Request ID:", data.request_id);
-    
-    switch(data.type) {
-        case "thinking":
-            if (!$(`#container-${data.request_id}`).length) {
-                const userMessage = pendingRequests.get(data.request_id) || "Unknown question";
-                chatMessages.append(`
-                    <div class="message-container" id="container-${data.request_id}">
-                        <div class="message user-message fade-in">
-                            ${userMessage}
-                            <span class="timestamp">${formatTimestamp()}</span>
-                        </div>
-                        <div class="thinking-animation" id="loader-${data.request_id}">
-                            <div class="thinking-spinner"></div>
-                            <div class="thinking-dot"></div>
-                            <div class="thinking-dot"></div>
-                            <div class="thinking-dot"></div>
-                        </div>
+// Show the predefined questions once, while the first request is being answered
+function fetchPredefinedQuestions(requestId) {
+    fetch("/predefined/questions")
+        .then(response => response.json())
+        .then(data => {
+            if (predefinedQuestionsAdded) return;
+            predefinedQuestions = data.questions || [];
+            chatMessages.append(`
+                <div class="message-container predefined-block animated-message">
+                    <div class="message bot-message fade-in">
+                        <img src="/static/images/bot-icon.png" alt="ROIALLY" class="message-icon">
+                        <strong>I’m on it! Explore Impact Analytics insights in the meantime.</strong>
+                    </div>
+                    <div class="predefined-questions">
+                        ${predefinedQuestions.map((q, index) => `
+                            <button class="btn btn-outline-secondary m-2 question-btn" onclick="sendPredefinedQuestion('${escapeSingleQuotes(q)}', '${requestId}')">${q}</button>
+                        `).join('')}
                     </div>
-                `);
-            }
-            break;
-        case "message":
-            $(`#loader-${data.request_id}`).remove();
-            $(`#container-${data.request_id}`).append(`
-                <div class="message bot-message fade-in">
-                    <img src="/static/images/bot-icon.png" alt="ROIALLY" class="message-icon">
-                    ${data.content}
-                    <span class="timestamp">${formatTimestamp()}</span>
-                </div>
-            `);
-            pendingRequests.delete(data.request_id);
-            break;
-        case "error":
-            $(`#loader-${data.request_id}`).remove();
-            $(`#container-${data.request_id}`).append(`
-                <div class="message bot-message text-danger fade-in">
-                    <img src="/static/images/bot-icon.png" alt="ROIALLY" class="message-icon">
-                    Error: ${data.message}
-                    <span class="timestamp">${formatTimestamp()}</span>
                 </div>
             `);
-            pendingRequests.delete(data.request_id);
-            break;
-        case "predefined_questions":
-            if (!predefinedQuestionsAdded) {
-                predefinedQuestions = data.questions;
-                chatMessages.append(`
-                    <div class="message-container predefined-block animated-message">
-                        <div class="message bot-message fade-in">
-                            <img src="/static/images/bot-icon.png" alt="ROIALLY" class="message-icon">
-                            <strong>I’m on it! Explore Impact Analytics insights in the meantime.</strong>
-                        </div>
-                        <div class="predefined-questions">
-                            ${predefinedQuestions.map((q, index) => `
-                                <button class="btn btn-outline-secondary m-2 question-btn" onclick="sendPredefinedQuestion('${escapeSingleQuotes(q)}', '${data.request_id}')">${q}</button>
-                            `).join('')}
-                        </div>
-                    </div>
-                `);
-                predefinedQuestionsAdded = true;
-                chatMessages.scrollTop(chatMessages[0].scrollHeight);
-            }
-            break;
-    }
-};
+            predefinedQuestionsAdded = true;
+            chatMessages.scrollTop(chatMessages[0].scrollHeight);
+        })
+        .catch(error => console.error("Failed to fetch predefined questions:", error));
+}
+
+// Render the answer (or error) for a predefined question in its container
+function showPredefinedAnswer(requestId, content, isError) {
+    $(`#loader-${requestId}`).remove();
+    $(`#container-${requestId}`).append(`
+        <div class="message bot-message ${isError ? 'text-danger ' : ''}fade-in">
+            <img src="/static/images/bot-icon.png" alt="ROIALLY" class="message-icon">
+            ${isError ? 'Error: ' : ''}${content}
+            <span class="timestamp">${formatTimestamp()}</span>
+        </div>
+    `);
+    pendingRequests.delete(requestId);
+    chatMessages.scrollTop(chatMessages[0].scrollHeight);
+}
 
 function sendMessage() {
     const input = $("#user-input");
@@ -337,7 +304,6 @@ function sendMessage() {
 
 function sendPredefinedQuestion(question, parentRequestId) {
     const requestId = Date.now().toString();
-    const escapedQuestion = escapeSingleQuotes(question);
     if (!$(`#container-${requestId}`).length) {
         chatMessages.append(`
             <div class="message-container" id="container-${requestId}">
@@ -354,7 +320,15 @@ function sendPredefinedQuestion(question, parentRequestId) {
             </div>
         `);
     }
-    socketPredefined.send(JSON.stringify({ type: "predefined_question", content: escapedQuestion, request_id: requestId, parent_request_id: parentRequestId }));
+    // Answered over HTTP, so it does not wait behind a request running on the WebSocket
+    fetch("/predefined/answer", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ question: question })
+    })
+        .then(response => response.json())
+        .then(data => showPredefinedAnswer(requestId, data.answer || data.error, !data.answer))
+        .catch(error => showPredefinedAnswer(requestId, error.message, true));
     pendingRequests.set(requestId, question);
     chatMessages.scrollTop(chatMessages[0].scrollHeight);
 }
@@ -0,0 +1,162 @@
+# structured_output.py
+"""Tolerant extraction and validation of the JSON objects the agents return.
+
+LLM output often wraps the object in prose or ```json fences, uses Python-style single quotes, or
+leaves trailing commas. JsonObjectScanner finds balanced top-level objects (also incrementally, as
+text streams in) while respecting quoted strings, so apostrophes inside values ("Macy's") survive.
+Each candidate is parsed as JSON, then as a Python literal, and validated against the schema of the
+stage that produced it. A failed parse returns None so the caller can fall back deterministically
+instead of re-running the whole pipeline.
+"""
+import ast
+import json
+import re
+from typing import Dict, Optional, Type, Union
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from metrics import PARSE_FAILURES
+from app_logging import get_logger
+
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+# Quoted strings are matched first so JSON literals inside them are left alone
+JSON_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\b(null|true|false)\b')
+PYTHON_LITERALS = {"null": "None", "true": "True", "false": "False"}
+
+logger = get_logger("structured_output")
+
+Value = Union[str, float, int, None]
+
+
+class FinancialDataOutput(BaseModel):
+    """Formatted financial record produced by the collector and formatter agents."""
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
+
+    company: str
+    analized_data_date: Value = "Not Available"
+    balance_sheet_inventory_cost: Value = "Not Available"
+    pl_inventory_cost: Value = Field("Not Available", alias="P&L_inventory_cost")
+    Revenue: Value = "Not Available"
+    headcount_old: Value = Field("Not Available", alias="Headcount Old")
+    salary_average: Value = Field("Not Available", alias="Salary Average")
+    gross_profit: Value = "Not Available"
+    gross_profit_percentage: Value = "Not Available"
+    market_cap: Value = "Not Available"
+    currency: str = "USD"
+
+
+class LowHigh(BaseModel):
+    low: Value
+    high: Value
+
+
+class BenefitsOutput(BaseModel):
+    """CalculatorTool result: per-module metric estimates and per-module sums."""
+    benefits: Dict[str, Dict[str, LowHigh]]
+    sum: Dict[str, LowHigh]
+
+
+class JsonObjectScanner:
+    """Incrementally finds balanced top-level {...} spans in text, ignoring braces inside quoted strings."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.depth = 0
+        self.start = None
+        self.quote = None
+        self.escaped = False
+        self.position = 0
+
+    def feed(self, text):
+        """Add text and return the complete object candidates (raw strings) found so far."""
+        self.buffer += text
+        found = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if self.quote:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == self.quote:
+                    self.quote = None
+                elif char == "\n" and self.quote == "'":
+                    # A single quote that never closed on its line was an apostrophe, not a string
+                    self.quote = None
+            elif char in "\"'" and self.depth > 0:
+                previous = self.buffer[self.position - 1] if self.position else ""
+                # Apostrophes inside unquoted words ("Macy's" in Python reprs) do not open strings
+                if not (char == "'" and previous.isalnum()):
+                    self.quote = char
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = self.position
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    found.append(self.buffer[self.start:self.position + 1])
+                    self.start = None
+            self.position += 1
+        if self.depth == 0:
+            # Nothing open: drop consumed text so long streams do not grow the buffer
+            self.buffer, self.position = "", 0
+        return found
+
+
+def python_literals(text: str) -> str:
+    """Turn bare JSON null/true/false into Python literals, outside quoted strings only."""
+    return JSON_LITERAL.sub(lambda match: PYTHON_LITERALS[match.group(1)] if match.group(1) else match.group(0), text)
+
+
+def parse_object(candidate: str) -> Optional[dict]:
+    """Parse one object candidate as JSON, then as a Python literal; None if neither works."""
+    candidate = candidate.replace(r"\$", "$")
+    for text in (candidate, TRAILING_COMMA.sub(r"\1", candidate)):
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                value = ast.literal_eval(python_literals(text))
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                continue
+        if isinstance(value, dict):
+            return value
+    return None
+
+
+def extract_objects(text: str) -> list:
+    """All parseable top-level objects in text, in order."""
+    if isinstance(text, dict):
+        return [text]
+    if not isinstance(text, str):
+        return []
+    objects = []
+    for candidate in JsonObjectScanner().feed(text):
+        value = parse_object(candidate)
+        if value is not None:
+            objects.append(value)
+    return objects
+
+
+def parse_output(output, schema: Type[BaseModel]) -> Optional[dict]:
+    """Validated dict (using the schema's field aliases) from a task output, raw string or dict; None on failure.
+
+    Prefers crewai's own structured result when the task was schema-constrained.
+    """
+    if getattr(output, "pydantic", None) is not None:
+        return output.pydantic.model_dump(by_alias=True)
+    if getattr(output, "json_dict", None):
+        output = output.json_dict
+    elif hasattr(output, "raw"):
+        output = output.raw
+    for value in extract_objects(output):
+        # The collector callback wraps its record as {"financial_data": ..., "summary": ...}
+        for candidate in (value, value.get("financial_data")):
+            if not isinstance(candidate, dict):
+                continue
+            try:
+                return schema.model_validate(candidate).model_dump(by_alias=True)
+            except ValidationError:
+                continue
+    logger.warning(f"Could not parse {schema.__name__} from output", extra={"fields": {"output": str(output)}})
+    PARSE_FAILURES.inc(schema=schema.__name__)
+    return None
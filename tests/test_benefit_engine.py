@@ -0,0 +1,147 @@
+# tests/test_benefit_engine.py
+import json
+import math
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tools.benefit_engine import TIERS, BenefitEngine
+from tools.finance_tools import CalculatorTool
+from tools.financial_snapshot import FinancialSnapshot
+from tools.formatting import format_amount, parse_currency
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "loadtest", "fixtures", "finance.json")
+BENEFIT_MAPPING = CalculatorTool.model_fields["benefit_mapping"].default
+
+# Sales share and gross margin per pricing segment, as hard-coded in the per-row calculator
+PRICING = {"Base": (0.50, 0.35), "Promo": (0.35, 0.25), "MD": (0.15, 0.10)}
+
+
+def load_snapshots():
+    with open(FIXTURE) as f:
+        return {ticker: FinancialSnapshot.from_dict(entry["snapshot"]) for ticker, entry in json.load(f).items()}
+
+
+def company_type(revenue):
+    if revenue > 50e9:
+        return "Global"
+    if revenue > 10e9:
+        return "Leader"
+    if revenue > 1e9:
+        return "Challenger"
+    return "Startup"
+
+
+def per_row_benefits(snapshot):
+    """The formulas CalculatorTool evaluated one metric at a time before BenefitEngine; None is 'Not Available'."""
+    revenue = snapshot.revenue or 0
+    gross_profit = snapshot.gross_profit or 0
+    gross_profit_pct = snapshot.gross_profit_percentage or 0
+    salary_avg = snapshot.salary_avg or 0
+    inventory_cost = snapshot.inventory_cost or 0
+    tier = company_type(revenue)
+
+    def formula(module, metric):
+        if metric == "Margin Rate Lift (bps)":
+            return lambda x: (revenue * ((gross_profit_pct / 100) + (x / 100))) - gross_profit if revenue and gross_profit else None
+        if metric == "Margin on Revenue Lift":
+            return lambda x: ((revenue * (1 + (x / 100))) * (gross_profit_pct / 100)) - gross_profit if revenue and gross_profit else None
+        if metric == "Efficiency Re-Investment":
+            headfix = 2 if module == "pricing" else 10
+            return lambda x: (headfix - (headfix * 100 / (x + 100))) * salary_avg if salary_avg else None
+        if metric == "Reduction in Xfer Expenses":
+            return lambda x: (x / 100) * inventory_cost if inventory_cost else None
+        if metric == "Inventory Carrying Costs":
+            return lambda x: (inventory_cost * 0.2) * (x / 100) if inventory_cost else None
+        segment, _, base_metric = metric.partition(" - ")
+        share, gm = PRICING[segment]
+        if base_metric == "Margin on Revenue Lift":
+            return lambda x: ((share * revenue) * (1 + (x / 100)) * gm) - ((share * revenue) * gm) if revenue else None
+        return lambda x: ((share * revenue) * (gm + (x / 100))) - ((share * revenue) * gm) if revenue else None
+
+    expected = {}
+    for module, tiers in BENEFIT_MAPPING.items():
+        for metric, (low, high) in tiers.get(tier, tiers["Startup"]).items():
+            if module == "merch_financial_planning" and metric == "Reduction in Xfer Expenses":
+                continue
+            calc = formula(module, metric)
+            expected[(module, metric)] = (calc(low), calc(high))
+    return tier, expected
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return BenefitEngine(BENEFIT_MAPPING)
+
+
+@pytest.mark.parametrize("ticker", sorted(load_snapshots()))
+def test_engine_matches_per_row_formulas(engine, ticker):
+    snapshot = load_snapshots()[ticker]
+    tier, expected = per_row_benefits(snapshot)
+    tiers, values = engine.compute(
+        snapshot.revenue, snapshot.gross_profit, snapshot.gross_profit_percentage,
+        snapshot.salary_avg, snapshot.inventory_cost
+    )
+    assert TIERS[tiers[0]] == tier
+    assert set(engine.slots) == set(expected)
+    for (module, metric), (low, high) in zip(engine.slots, values[0].tolist()):
+        assert (low, high) == pytest.approx(expected[(module, metric)], rel=1e-12), (module, metric)
+
+
+def test_missing_inputs_are_not_available(engine):
+    snapshot = load_snapshots()["WMT"]
+    snapshot.salary_avg = None
+    snapshot.inventory_cost = None
+    _, expected = per_row_benefits(snapshot)
+    _, values = engine.compute(snapshot.revenue, snapshot.gross_profit, snapshot.gross_profit_percentage, 0, 0)
+    for (module, metric), (low, high) in zip(engine.slots, values[0].tolist()):
+        if expected[(module, metric)][0] is None:
+            assert math.isnan(low) and math.isnan(high), (module, metric)
+        else:
+            assert (low, high) == pytest.approx(expected[(module, metric)], rel=1e-12), (module, metric)
+
+    results = engine.to_results(values[0], engine.sums(values)[0], "USD", format_amount)
+    assert results["benefits"]["allocation_and_replenishment"]["Inventory Carrying Costs"] == {"low": "Not Available", "high": "Not Available"}
+
+
+def test_batch_matches_single_calls(engine):
+    snapshots = list(load_snapshots().values())
+    column = lambda attribute: [getattr(snapshot, attribute) for snapshot in snapshots]
+    _, batch = engine.compute(
+        column("revenue"), column("gross_profit"), column("gross_profit_percentage"),
+        column("salary_avg"), column("inventory_cost")
+    )
+    for i, snapshot in enumerate(snapshots):
+        _, single = engine.compute(
+            snapshot.revenue, snapshot.gross_profit, snapshot.gross_profit_percentage,
+            snapshot.salary_avg, snapshot.inventory_cost
+        )
+        assert batch[i].tolist() == single[0].tolist()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("USD 6.63 B", 6.63e9),
+    ("USD 490.14 M", 490.14e6),
+    ("USD 1.25 T", 1.25e12),
+    ("€2 trillion", 2e12),
+    ("USD 72.14 K", 72140.0),
+    ("USD 999.99", 999.99),
+    ("USD 0.50", 0.5),
+    ("USD -120.50", -120.5),
+    ("-USD 3.20 B", -3.2e9),
+    ("USD -45.10 M", -45.1e6),
+    ("1,234,567", 1234567.0),
+    ("Not Available", 0),
+    (None, 0),
+])
+def test_parse_currency(text, expected):
+    assert parse_currency(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value", [-3.2e9, -120.5, 0.5, 999.99, 72140.0, 490.14e6, 6.63e9])
+def test_parse_currency_round_trips_format_amount(value):
+    assert parse_currency(format_amount(value, "USD")) == pytest.approx(value, rel=1e-3)
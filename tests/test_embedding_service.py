@@ -0,0 +1,126 @@
+# tests/test_embedding_service.py
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_service import EmbeddingRequest, EmbeddingService
+
+
+class FakeModel:
+    """Embeds "<n>" as [n, -n]; blocks each batch until released once `gate` is set up."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.gate = None
+        self.entered = threading.Event()
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail_on in texts:
+            raise RuntimeError("model failed")
+        return [[float(text), -float(text)] for text in texts]
+
+
+class FakeIndex:
+    """Nearest neighbours of [n, -n] are n, n + 1, ...; the distance is the neighbour's rank."""
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, vectors, k):
+        self.calls.append((len(vectors), k))
+        first = vectors[:, :1].astype(np.int64)
+        return np.tile(np.arange(k, dtype=np.float32), (len(vectors), 1)), first + np.arange(k)
+
+
+def hold_first_batch(service, model):
+    """Submit a request that blocks the worker, so the next requests queue up behind it."""
+    model.gate = threading.Event()
+    first = service._submit(EmbeddingRequest("0"))
+    assert model.entered.wait(5)
+    return first
+
+
+def test_queued_requests_share_one_batch():
+    model = FakeModel()
+    service = EmbeddingService(model, FakeIndex(), max_batch=32, max_wait_ms=5)
+    first = hold_first_batch(service, model)
+    queued = [service._submit(EmbeddingRequest(str(n))) for n in range(1, 11)]
+    model.gate.set()
+    first.result(5)
+    results = [future.result(5) for future in queued]
+
+    assert model.batches == [["0"], [str(n) for n in range(1, 11)]]
+    for n, vector in enumerate(results, start=1):
+        assert vector.dtype == np.float32
+        assert vector.tolist() == [n, -n]
+
+
+def test_max_batch_splits_the_queue():
+    model = FakeModel()
+    service = EmbeddingService(model, max_batch=4, max_wait_ms=0)
+    first = hold_first_batch(service, model)
+    queued = [service._submit(EmbeddingRequest(str(n))) for n in range(1, 11)]
+    model.gate.set()
+    first.result(5)
+    assert [future.result(5)[0] for future in queued] == list(range(1, 11))
+    assert [len(batch) for batch in model.batches] == [1, 4, 4, 2]
+
+
+def test_each_caller_gets_its_own_row():
+    model, index = FakeModel(), FakeIndex()
+    service = EmbeddingService(model, index, max_batch=8, max_wait_ms=20)
+    texts = [str(n) for n in range(40)]
+    top_ks = [n % 3 + 1 for n in range(40)]
+
+    def call(n):
+        if n % 2:
+            return service.search(texts[n], top_ks[n])
+        return service.embed(texts[n])
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(call, range(40)))
+
+    for n, result in enumerate(results):
+        if n % 2:
+            distances, indices = result
+            assert distances.shape == indices.shape == (1, top_ks[n])
+            assert indices[0].tolist() == list(range(n, n + top_ks[n]))
+        else:
+            assert result.tolist() == [n, -n]
+    # Searches are batched too: one index.search per batch that had any
+    assert sum(size for size, _ in index.calls) == 20
+
+
+def test_a_failed_batch_fails_every_waiter():
+    model = FakeModel(fail_on="13")
+    service = EmbeddingService(model, FakeIndex(), max_batch=32, max_wait_ms=5)
+    first = hold_first_batch(service, model)
+    embeds = [service._submit(EmbeddingRequest(str(n))) for n in (11, 12, 13)]
+    search = service._submit(EmbeddingRequest("14", top_k=2))
+    model.gate.set()
+    first.result(5)
+
+    for future in embeds + [search]:
+        with pytest.raises(RuntimeError, match="model failed"):
+            future.result(5)
+    assert model.batches[1] == ["11", "12", "13", "14"]
+
+    # The worker keeps serving later requests
+    assert service.embed("15").tolist() == [15, -15]
+
+
+def test_search_needs_an_index():
+    service = EmbeddingService(FakeModel())
+    with pytest.raises(RuntimeError):
+        service.search("1", 3)
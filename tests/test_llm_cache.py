@@ -0,0 +1,111 @@
+# tests/test_llm_cache.py
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_cache
+from llm_cache import LLMCache, cache_key, parse_cache_tasks
+
+MESSAGES = [{"role": "user", "content": "Format WMT"}]
+
+
+def test_cache_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    cache = LLMCache(path=str(path))
+    assert not path.exists()
+    key = cache_key("ollama/test", MESSAGES, {"temperature": 0})
+    assert cache.get(key) is None
+    cache.put(key, "formatted")
+    assert path.exists()
+    assert cache.get(key) == "formatted"
+    assert cache.snapshot() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_key_depends_on_model_messages_and_params():
+    key = cache_key("ollama/test", MESSAGES, {"temperature": 0})
+    assert key == cache_key("ollama/test", [dict(m) for m in MESSAGES], {"temperature": 0})
+    assert key != cache_key("ollama/other", MESSAGES, {"temperature": 0})
+    assert key != cache_key("ollama/test", MESSAGES + MESSAGES, {"temperature": 0})
+    assert key != cache_key("ollama/test", MESSAGES, {"temperature": 0.7})
+
+
+def test_variants_fill_a_pool_before_hitting(tmp_path):
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"))
+    for reply in ("Hi!", "Hello!"):
+        assert cache.get("greeting", variants=3) is None
+        cache.put("greeting", reply, variants=3)
+    assert cache.get("greeting", variants=3) is None
+    cache.put("greeting", "Hey!", variants=3)
+    assert {cache.get("greeting", variants=3) for _ in range(50)} <= {"Hi!", "Hello!", "Hey!"}
+
+    # A full pool replaces its oldest variant instead of growing
+    cache.put("greeting", "Welcome!", variants=3)
+    assert cache.snapshot()["entries"] == 3
+    assert "Hi!" not in {cache.get("greeting", variants=3) for _ in range(50)}
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.put("key", "response")
+    now[0] += 59
+    assert cache.get("key") == "response"
+    now[0] += 2
+    assert cache.get("key") is None
+
+    # Expired rows are dropped on the next write
+    cache.put("other", "response")
+    assert cache.snapshot()["entries"] == 1
+
+
+def test_oldest_entries_are_dropped_past_max_entries(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    cache = LLMCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.put(key, key.upper())
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == ("B", "C")
+
+
+def test_parse_cache_tasks():
+    assert parse_cache_tasks("intent,formatter") == {"intent": 1, "formatter": 1}
+    assert parse_cache_tasks(" intent , answer:3, summary:0 ,") == {"intent": 1, "answer": 3, "summary": 1}
+    assert parse_cache_tasks("") == {}
+    assert parse_cache_tasks(None) == {}
+
+
+def load_config(monkeypatch, tasks):
+    monkeypatch.setenv("MODEL_NAME", "ollama/test")
+    if tasks is None:
+        monkeypatch.delenv("LLM_CACHE_TASKS", raising=False)
+    else:
+        monkeypatch.setenv("LLM_CACHE_TASKS", tasks)
+    # Only the environment set here counts, not a developer's .env
+    monkeypatch.setattr("dotenv.load_dotenv", lambda *args, **kwargs: False)
+    import config
+    return importlib.reload(config)
+
+
+def test_only_fixed_shape_tasks_are_cached_by_default(monkeypatch):
+    config = load_config(monkeypatch, None)
+    assert config.LLM_CACHE_TASKS == {"intent": 1, "formatter": 1}
+    assert config.llm_for("intent").cache is config.llm_cache
+    assert config.llm_for("formatter").cache is config.llm_cache
+    assert config.llm_for("summary").cache is None
+    assert config.llm_for("answer").cache is None
+
+
+def test_free_text_tasks_are_opt_in(monkeypatch):
+    config = load_config(monkeypatch, "summary,answer:3")
+    assert config.llm_for("answer").cache is config.llm_cache
+    assert config.llm_for("answer").cache_variants == 3
+    assert config.llm_for("intent").cache is None
+
+    config = load_config(monkeypatch, "")
+    assert config.llm_cache is None
+    assert config.llm_for("intent").cache is None
@@ -0,0 +1,13 @@
+# tests/test_metrics.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Counter
+
+
+def test_label_values_are_escaped():
+    counter = Counter("requests_total", "Requests.", ("mode",))
+    counter.inc(mode='a"b\\c\nd')
+    assert counter.prometheus()[-1] == 'requests_total{mode="a\\"b\\\\c\\nd"} 1'
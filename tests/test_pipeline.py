@@ -0,0 +1,81 @@
+# tests/test_pipeline.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import CheckpointStore, RetryPolicy, StageFailed, run_stage
+
+FAST = RetryPolicy(attempts=3, backoff=0.0)
+
+
+class Flaky:
+    """Blocking stage function that fails the first `failures` calls."""
+
+    def __init__(self, failures, result="ok"):
+        self.failures = failures
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError(f"transient failure {self.calls}")
+        return self.result
+
+
+def test_transient_error_is_retried():
+    checkpoints = CheckpointStore()
+    func = Flaky(failures=2)
+    retries = []
+
+    async def on_retry(stage, attempt, attempts, error):
+        retries.append((stage, attempt, attempts))
+
+    value = asyncio.run(run_stage(checkpoints, "req-1", "collect", func, "WMT", policy=FAST, on_retry=on_retry))
+    assert value == "ok"
+    assert func.calls == 3
+    assert retries == [("collect", 2, 3), ("collect", 3, 3)]
+
+
+def test_stage_failed_carries_attempts_and_is_not_stored():
+    checkpoints = CheckpointStore()
+    func = Flaky(failures=10)
+    with pytest.raises(StageFailed) as failed:
+        asyncio.run(run_stage(checkpoints, "req-1", "collect", func, policy=FAST))
+    assert func.calls == FAST.attempts
+    assert failed.value.stage == "collect"
+    assert failed.value.attempts == FAST.attempts
+    assert isinstance(failed.value.error, ConnectionError)
+    assert checkpoints.get("req-1", "collect") == (False, None)
+
+
+def test_successful_stage_is_replayed_under_the_same_key():
+    checkpoints = CheckpointStore()
+    first = Flaky(failures=0, result={"revenue": 1})
+    second = Flaky(failures=0, result={"revenue": 2})
+
+    async def scenario():
+        a = await run_stage(checkpoints, "req-1", "calculate", first, key="WMT", policy=FAST)
+        b = await run_stage(checkpoints, "req-1", "calculate", second, key="WMT", policy=FAST)
+        c = await run_stage(checkpoints, "req-1", "calculate", second, key="TGT", policy=FAST)
+        return a, b, c
+
+    a, b, c = asyncio.run(scenario())
+    assert a == b == {"revenue": 1}
+    assert c == {"revenue": 2}
+    assert first.calls == 1 and second.calls == 1
+
+
+def test_checkpoints_expire():
+    checkpoints = CheckpointStore(ttl=0.0)
+    checkpoints.put("req-1", "intent", "financial")
+    assert checkpoints.get("req-1", "intent") == (False, None)
+
+
+def test_retry_backoff_is_capped():
+    policy = RetryPolicy(attempts=5, backoff=1.0, multiplier=2.0, max_backoff=3.0)
+    assert [policy.delay(attempt) for attempt in range(1, 5)] == [1.0, 2.0, 3.0, 3.0]
@@ -0,0 +1,118 @@
+# tests/test_recorder.py
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import finance_tools
+from tools.finance_tools import InventoryCheckTool, YFinanceTool, unknown_yahoo, valid_yahoo
+from tools.recorder import Recorder, RecordingMissing
+
+BALANCE_SHEET = pd.DataFrame({pd.Timestamp("2024-01-31"): [56435000000.0]}, index=["Inventory"])
+INCOME_STATEMENT = pd.DataFrame(
+    {pd.Timestamp("2024-01-31"): [648125000000.0, 157983000000.0, 490142000000.0, 130000000000.0]},
+    index=["Total Revenue", "Gross Profit", "Cost Of Revenue", "Selling General And Administration"]
+)
+
+
+def fake_yahoo(calls):
+    """Stand-in for yahoo_statements that knows only WMT and records the tickers it was asked for."""
+    def yahoo_statements(ticker, statements):
+        calls.append(ticker)
+        if ticker != "WMT":
+            return {"info": {}}
+        frames = {"balance_sheet": BALANCE_SHEET, "financials": INCOME_STATEMENT}
+        info = {"symbol": "WMT", "currency": "USD", "fullTimeEmployees": 2100000, "marketCap": 480e9, "sector": "Consumer Defensive"}
+        return {"info": info, **{name: frames[name] for name in statements}}
+    return yahoo_statements
+
+
+def unavailable(ticker, statements):
+    raise AssertionError("replay must not call the provider")
+
+
+def recorders(tmp_path, *modes):
+    path = str(tmp_path / "recordings.sqlite3")
+    return [Recorder(mode=mode, path=path) for mode in modes]
+
+
+def test_round_trip(tmp_path):
+    record, replay = recorders(tmp_path, "record", "replay")
+    assert record.call("src", "WMT", lambda: {"revenue": 1}) == {"revenue": 1}
+    assert replay.call("src", "WMT", lambda: pytest.fail("replay called the provider")) == {"revenue": 1}
+    with pytest.raises(RecordingMissing):
+        replay.call("src", "TGT", lambda: {"revenue": 2})
+
+
+def test_invalid_response_never_overwrites_a_recording(tmp_path):
+    record, replay = recorders(tmp_path, "record", "replay")
+    valid = lambda response: "Name" in response
+    record.call("src", "WMT", lambda: {"Name": "Walmart"}, valid=valid)
+    assert record.call("src", "WMT", lambda: {"Note": "rate limited"}, valid=valid) == {"Note": "rate limited"}
+    assert replay.call("src", "WMT", lambda: None) == {"Name": "Walmart"}
+
+    # A problem response is not recorded at all, so replay still misses
+    record.call("src", "TGT", lambda: {"Note": "rate limited"}, valid=valid)
+    with pytest.raises(RecordingMissing):
+        replay.call("src", "TGT", lambda: None)
+
+
+def test_negative_result_is_recorded_until_a_good_one_arrives(tmp_path):
+    record, replay = recorders(tmp_path, "record", "replay")
+    valid, negative = (lambda response: bool(response)), (lambda response: response == {})
+    assert record.call("src", "NEWCO", lambda: {}, valid=valid, negative=negative) == {}
+    assert replay.call("src", "NEWCO", lambda: None) == {}
+
+    record.call("src", "NEWCO", lambda: {"Name": "NewCo"}, valid=valid, negative=negative)
+    record.call("src", "NEWCO", lambda: {}, valid=valid, negative=negative)
+    assert replay.call("src", "NEWCO", lambda: None) == {"Name": "NewCo"}
+
+
+def test_fallback_serves_the_recording_when_the_provider_fails(tmp_path):
+    (fallback,) = recorders(tmp_path, "fallback")
+    fallback.call("src", "WMT", lambda: {"revenue": 1})
+
+    def down():
+        raise ConnectionError("provider down")
+
+    assert fallback.call("src", "WMT", down) == {"revenue": 1}
+    with pytest.raises(RecordingMissing):
+        fallback.call("src", "TGT", down)
+
+
+def test_yahoo_snapshot_round_trip(tmp_path, monkeypatch):
+    record, replay = recorders(tmp_path, "record", "replay")
+    calls = []
+    monkeypatch.setattr(finance_tools, "yahoo_statements", fake_yahoo(calls))
+    live = YFinanceTool(recorder=record).fetch_snapshot("wmt")
+    unknown = YFinanceTool(recorder=record).fetch_snapshot("zzzz")
+    assert calls == ["WMT", "ZZZZ"]
+
+    monkeypatch.setattr(finance_tools, "yahoo_statements", unavailable)
+    assert YFinanceTool(recorder=replay).fetch_snapshot("WMT") == live
+    assert YFinanceTool(recorder=replay).fetch_snapshot("ZZZZ") == unknown
+    assert unknown == {"error": "Company not found. Please check the ticker and try again."}
+
+
+def test_inventory_check_fetches_and_records_the_same_ticker(tmp_path, monkeypatch):
+    record, replay = recorders(tmp_path, "record", "replay")
+    calls = []
+    monkeypatch.setattr(finance_tools, "yahoo_statements", fake_yahoo(calls))
+    assert InventoryCheckTool(recorder=record)._run("wmt") is True
+    assert InventoryCheckTool(recorder=record)._run("zzzz") is False
+    assert calls == ["WMT", "ZZZZ"]
+
+    monkeypatch.setattr(finance_tools, "yahoo_statements", unavailable)
+    assert InventoryCheckTool(recorder=replay)._run("Wmt") is True
+    assert InventoryCheckTool(recorder=replay)._run("zzzz") is False
+
+
+def test_yahoo_predicates():
+    calls = []
+    known = fake_yahoo(calls)("WMT", ("balance_sheet",))
+    unknown = fake_yahoo(calls)("ZZZZ", ("balance_sheet",))
+    assert valid_yahoo(known) and not unknown_yahoo(known)
+    assert not valid_yahoo(unknown) and unknown_yahoo(unknown)
@@ -0,0 +1,131 @@
+# tests/test_singleflight.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from singleflight import SingleFlight
+
+
+def test_late_joiner_gets_replayed_messages():
+    async def scenario():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+        runs = []
+
+        async def work(channel):
+            runs.append(1)
+            await channel.send_json({"step": 1})
+            await channel.send_json({"step": 2})
+            started.set()
+            await release.wait()
+            await channel.send_json({"step": 3})
+            return "result"
+
+        first, second = [], []
+
+        async def collect(into, message):
+            into.append(message)
+
+        leader = asyncio.create_task(flights.run("WMT", lambda m: collect(first, m), work))
+        await started.wait()
+        assert flights.in_flight("WMT")
+        joiner = asyncio.create_task(flights.run("WMT", lambda m: collect(second, m), work))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(leader, joiner)
+        return runs, first, second, results, flights.in_flight("WMT")
+
+    runs, first, second, results, still_in_flight = asyncio.run(scenario())
+    assert runs == [1]
+    assert first == second == [{"step": 1}, {"step": 2}, {"step": 3}]
+    assert results == [("result", False), ("result", True)]
+    assert not still_in_flight
+
+
+def test_subscriber_cancelling_does_not_cancel_the_flight():
+    async def scenario():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def work(channel):
+            await channel.send_json({"step": 1})
+            started.set()
+            await release.wait()
+            return "result"
+
+        async def send(message):
+            pass
+
+        leader = asyncio.create_task(flights.run("WMT", send, work))
+        await started.wait()
+        joiner = asyncio.create_task(flights.run("WMT", send, work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+        return await joiner
+
+    assert asyncio.run(scenario()) == ("result", True)
+
+
+def test_work_error_reaches_every_subscriber():
+    async def scenario():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def work(channel):
+            started.set()
+            await release.wait()
+            raise ValueError("fetch failed")
+
+        async def send(message):
+            pass
+
+        leader = asyncio.create_task(flights.run("WMT", send, work))
+        await started.wait()
+        joiner = asyncio.create_task(flights.run("WMT", send, work))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(leader, joiner, return_exceptions=True), flights.in_flight("WMT")
+
+    results, still_in_flight = asyncio.run(scenario())
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert not still_in_flight
+
+
+def test_shared_flight_cannot_ask_for_input():
+    async def scenario():
+        flights = SingleFlight()
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def work(channel):
+            started.set()
+            await release.wait()
+            return await channel.receive_text()
+
+        async def send(message):
+            pass
+
+        async def receive():
+            return "yes"
+
+        leader = asyncio.create_task(flights.run("WMT", send, work, receive))
+        await started.wait()
+        joiner = asyncio.create_task(flights.run("WMT", send, work, receive))
+        await asyncio.sleep(0)
+        release.set()
+        shared = await asyncio.gather(leader, joiner, return_exceptions=True)
+        alone = await flights.run("TGT", send, work_alone, receive)
+        return shared, alone
+
+    async def work_alone(channel):
+        return await channel.receive_text()
+
+    shared, alone = asyncio.run(scenario())
+    assert [type(r) for r in shared] == [RuntimeError, RuntimeError]
+    assert alone == ("yes", False)
@@ -0,0 +1,23 @@
+# tests/test_structured_output.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_output import extract_objects, parse_object
+
+
+def test_literals_inside_strings_are_kept():
+    # A Python-style dict (single quotes) only parses through the literal_eval path
+    value = parse_object("{'note': 'nulls and a true value', 'flag': true, 'missing': null, 'off': false}")
+    assert value == {"note": "nulls and a true value", "flag": True, "missing": None, "off": False}
+
+
+def test_literals_inside_double_quoted_strings_are_kept():
+    value = parse_object("{'summary': \"Macy's: true value, false start, null set\", 'ok': true,}")
+    assert value == {"summary": "Macy's: true value, false start, null set", "ok": True}
+
+
+def test_extract_from_agent_transcript():
+    text = "Thought: done\nFinal Answer: {'company': 'WMT', 'currency': 'USD', 'note': 'truest nullable'}"
+    assert extract_objects(text) == [{"company": "WMT", "currency": "USD", "note": "truest nullable"}]
@@ -0,0 +1,45 @@
+# tests/test_tracing.py
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracing
+from tracing import TraceWriter, export_chrome_trace, span
+
+
+def wait_for_lines(path, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            if len(lines) >= count:
+                return lines
+        time.sleep(0.01)
+    raise AssertionError(f"{path} did not get {count} lines")
+
+
+def test_trace_file_is_jsonl_and_exports_to_chrome_format(tmp_path, monkeypatch):
+    writer = TraceWriter(directory=str(tmp_path))
+    monkeypatch.setattr(tracing, "writer", writer)
+    monkeypatch.setattr(tracing, "_exporting", True)
+    with span("request", trace_id="req-1"):
+        with span("stage.collect", mode="roi_mode"):
+            pass
+
+    lines = wait_for_lines(writer.path, 2)
+    events = [json.loads(line) for line in lines]
+    assert [event["name"] for event in events] == ["stage.collect", "request"]
+    assert {event["args"]["trace_id"] for event in events} == {"req-1"}
+    assert events[0]["args"]["parent_id"] == events[1]["args"]["span_id"]
+
+    # A line cut short by a crash is skipped on export
+    with open(writer.path, "a", encoding="utf-8") as f:
+        f.write('{"name": "cut')
+    out = io.StringIO()
+    assert export_chrome_trace([writer.path], out) == 2
+    assert json.loads(out.getvalue()) == events
@@ -0,0 +1,191 @@
+import math
+import numpy as np
+
+TIERS = ("Global", "Leader", "Challenger", "Startup")
+
+# Assumptions baked into the benefit formulas. Pricing splits sales into base price, promotional
+# event and markdown segments, each with its own share of total sales and gross margin.
+DEFAULT_ASSUMPTIONS = {
+    "headfix": 10,
+    "price_benefit_headfix": 2,
+    "base_sales_share": 0.50,
+    "base_gm": 0.35,
+    "promo_sales_share": 0.35,
+    "promo_gm": 0.25,
+    "markdown_sales_share": 0.15,
+    "markdown_gm": 0.10,
+}
+ASSUMPTION_NAMES = list(DEFAULT_ASSUMPTIONS)
+INPUT_NAMES = ["revenue", "gross_profit", "gross_profit_pct", "salary_avg", "inventory_cost"]
+
+PRICING_SEGMENTS = {"Base": "base", "Promo": "promo", "MD": "markdown"}
+
+# Metrics the mapping carries but which are not reported for a module
+SKIPPED_METRICS = {("merch_financial_planning", "Reduction in Xfer Expenses")}
+
+# Which formula turns a metric's low/high coefficient into a benefit amount
+KIND_MARGIN_RATE = 0
+KIND_MARGIN_REVENUE = 1
+KIND_EFFICIENCY = 2
+KIND_XFER = 3
+KIND_CARRYING = 4
+KIND_PRICE_REVENUE = 5
+KIND_PRICE_RATE = 6
+
+METRIC_KINDS = {
+    "Margin Rate Lift (bps)": KIND_MARGIN_RATE,
+    "Margin on Revenue Lift": KIND_MARGIN_REVENUE,
+    "Efficiency Re-Investment": KIND_EFFICIENCY,
+    "Reduction in Xfer Expenses": KIND_XFER,
+    "Inventory Carrying Costs": KIND_CARRYING,
+}
+
+
+MAX_SCENARIO_POINTS = 10000
+
+
+def assumption_grid(grid, max_points=MAX_SCENARIO_POINTS):
+    """Cartesian product of assumption overrides.
+
+    `grid` maps assumption names to a value or a list of values. Returns (names, points) where points
+    has shape (combinations, len(names)); raises ValueError for unknown names or oversized grids.
+    """
+    unknown = [name for name in grid if name not in DEFAULT_ASSUMPTIONS]
+    if unknown:
+        raise ValueError(f"Unknown assumptions: {', '.join(unknown)}. Expected any of: {', '.join(ASSUMPTION_NAMES)}")
+    names = [name for name in ASSUMPTION_NAMES if name in grid]
+    axes = [np.atleast_1d(np.asarray(grid[name], dtype=np.float64)) for name in names]
+    if any(axis.ndim != 1 or axis.size == 0 for axis in axes):
+        raise ValueError("Each assumption needs a number or a non-empty list of numbers")
+    size = math.prod(axis.size for axis in axes)
+    if size > max_points:
+        raise ValueError(f"Scenario grid has {size} points; at most {max_points} are allowed")
+    if not names:
+        return names, np.empty((1, 0))
+    points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(names))
+    return names, points
+
+
+# Revenue thresholds between Startup | Challenger | Leader | Global
+TIER_THRESHOLDS = np.array([1e9, 10e9, 50e9])
+
+
+def company_tiers(revenue):
+    """Vectorized company type index into TIERS: Global > 50B, Leader > 10B, Challenger > 1B, otherwise Startup."""
+    revenue = np.nan_to_num(np.asarray(revenue, dtype=np.float64))
+    return len(TIER_THRESHOLDS) - np.searchsorted(TIER_THRESHOLDS, revenue, side="left")
+
+
+class BenefitEngine:
+    """Benefit mapping compiled into coefficient arrays (tier x metric slot x low/high).
+
+    Every reported metric of every module is a "slot". compute() evaluates all slots for any number
+    of companies in a handful of array operations and returns raw floats, NaN where the inputs a
+    metric needs are missing.
+    """
+
+    def __init__(self, benefit_mapping, skipped_metrics=SKIPPED_METRICS):
+        self.modules = list(benefit_mapping.keys())
+        self.slots = []  # (module, metric)
+        groups = {}  # (kind, segment) -> slot indices sharing one formula
+        module_index = []
+        for m, module in enumerate(self.modules):
+            for metric in benefit_mapping[module]["Startup"]:
+                if (module, metric) in skipped_metrics:
+                    continue
+                if metric in METRIC_KINDS:
+                    kind = METRIC_KINDS[metric]
+                    segment = "pricing" if kind == KIND_EFFICIENCY and module == "pricing" else None
+                else:
+                    segment_label, _, base_metric = metric.partition(" - ")
+                    kind = KIND_PRICE_REVENUE if base_metric == "Margin on Revenue Lift" else KIND_PRICE_RATE
+                    segment = PRICING_SEGMENTS[segment_label]
+                groups.setdefault((kind, segment), []).append(len(self.slots))
+                self.slots.append((module, metric))
+                module_index.append(m)
+
+        self.groups = [(kind, segment, np.array(slots)) for (kind, segment), slots in groups.items()]
+        self.coefficients = np.array([
+            [benefit_mapping[module].get(tier, benefit_mapping[module]["Startup"])[metric] for module, metric in self.slots]
+            for tier in TIERS
+        ], dtype=np.float64)  # (tiers, slots, 2)
+
+        # One-hot slot -> module matrix so that per-module sums are a single contraction
+        self.module_matrix = np.zeros((len(self.slots), len(self.modules)))
+        self.module_matrix[np.arange(len(self.slots)), module_index] = 1.0
+
+    def compute(self, revenue, gross_profit, gross_profit_pct, salary_avg, inventory_cost, assumptions=None):
+        """Return (tiers, values) where values has shape (companies, slots, 2) with NaN for unavailable metrics.
+
+        Inputs and assumption overrides may be scalars or 1-D arrays; they are broadcast against each other.
+        """
+        params = dict(DEFAULT_ASSUMPTIONS, **assumptions) if assumptions else DEFAULT_ASSUMPTIONS
+        inputs = [revenue, gross_profit, gross_profit_pct, salary_avg, inventory_cost] + [params[name] for name in ASSUMPTION_NAMES]
+        if all(np.isscalar(v) for v in inputs):
+            table = np.array([inputs], dtype=np.float64)
+        else:
+            arrays = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in inputs])
+            table = np.stack(arrays, axis=-1).reshape(-1, len(inputs))
+        # One (companies, 1, 1) column per input so it broadcasts against (companies, slots, 2)
+        col = dict(zip(INPUT_NAMES + ASSUMPTION_NAMES, np.nan_to_num(table).T[:, :, None, None]))
+        revenue, gross_profit, gross_profit_pct = col["revenue"], col["gross_profit"], col["gross_profit_pct"]
+        salary_avg, inventory_cost = col["salary_avg"], col["inventory_cost"]
+
+        tiers = company_tiers(table[:, 0])
+        coefficients = self.coefficients[tiers]  # (companies, slots, 2)
+        values = np.empty(coefficients.shape)
+        has_revenue = revenue != 0
+        has_margin = has_revenue & (gross_profit != 0)
+        has_salary = salary_avg != 0
+        has_inventory = inventory_cost != 0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for kind, segment, slots in self.groups:
+                x = coefficients[:, slots]
+                if kind == KIND_MARGIN_RATE:
+                    available = has_margin
+                    result = (revenue * ((gross_profit_pct / 100) + (x / 100))) - gross_profit
+                elif kind == KIND_MARGIN_REVENUE:
+                    available = has_margin
+                    result = ((revenue * (1 + (x / 100))) * (gross_profit_pct / 100)) - gross_profit
+                elif kind == KIND_EFFICIENCY:
+                    headfix = col["price_benefit_headfix"] if segment == "pricing" else col["headfix"]
+                    available = has_salary
+                    result = (headfix - (headfix * 100 / (x + 100))) * salary_avg
+                elif kind == KIND_XFER:
+                    available = has_inventory
+                    result = (x / 100) * inventory_cost
+                elif kind == KIND_CARRYING:
+                    available = has_inventory
+                    result = (inventory_cost * 0.2) * (x / 100)
+                else:
+                    # Pricing: the segment's share of sales at the segment's gross margin
+                    sales = col[f"{segment}_sales_share"] * revenue
+                    gm = col[f"{segment}_gm"]
+                    available = has_revenue
+                    if kind == KIND_PRICE_REVENUE:
+                        result = (sales * (1 + (x / 100)) * gm) - (sales * gm)
+                    else:
+                        result = (sales * (gm + (x / 100))) - (sales * gm)
+                values[:, slots] = np.where(available, result, np.nan)
+
+        return tiers, values
+
+    def sums(self, values):
+        """Per-module low/high totals, shape (companies, modules, 2). Unavailable metrics count as zero."""
+        return np.einsum("nsk,sm->nmk", np.nan_to_num(values), self.module_matrix)
+
+    def to_results(self, values, sums, currency, format_amount):
+        """Format one company's raw values (slots, 2) and sums (modules, 2) into the CalculatorTool output shape."""
+        results = {"benefits": {module: {} for module in self.modules}, "sum": {}}
+        for (module, metric), (low, high) in zip(self.slots, values.tolist()):
+            if math.isnan(low) or math.isnan(high):
+                results["benefits"][module][metric] = {"low": "Not Available", "high": "Not Available"}
+            else:
+                results["benefits"][module][metric] = {"low": format_amount(low, currency), "high": format_amount(high, currency)}
+        for module, (low_sum, high_sum) in zip(self.modules, sums.tolist()):
+            results["sum"][module] = {
+                "low": format_amount(low_sum, currency) if low_sum > 0 else "Not Available",
+                "high": format_amount(high_sum, currency) if high_sum > 0 else "Not Available"
+            }
+        return results
@@ -2,96 +2,148 @@ from crewai.tools import BaseTool
 from crewai_tools import FileReadTool, SerperDevTool
 import yfinance as yf
 from alpha_vantage.timeseries import TimeSeries
-from datetime import datetime
 import os
 import requests
 import re
 import pandas as pd
 from dotenv import load_dotenv
 from typing import Any, Optional, Dict, Tuple
+from .ticker_index import TickerIndex
+from .benefit_engine import BenefitEngine, TIERS, assumption_grid
+from .formatting import format_amount, format_date, parse_currency
+from .financial_snapshot import FinancialSnapshot, SnapshotStore
+from .recorder import Recorder
+from metrics import timed_tool
+from tracing import traced
 
 load_dotenv()
 
-def format_amount(value, currency="USD"):
-    """Format a numeric value into a readable string with currency."""
-    if value == "Not Available" or value is None:
-        return "Not Available"
-    try:
-        value = float(value)
-        if value >= 1e9:
-            return f"{currency} {value / 1e9:.2f} B"  # Billions
-        elif value >= 1e6:
-            return f"{currency} {value / 1e6:.2f} M"  # Millions
-        elif value >= 1e3:
-            return f"{currency} {value / 1e3:.2f} K"  # Thousands
-        else:
-            return f"{currency} {value:.2f}"  # Less than thousands
-    except (ValueError, TypeError):
-        return str(value)
-
-def format_date(date):
-    """Format a date string or Timestamp into DD-MMM-YYYY."""
-    if date == "Not Available" or date is None:
-        return "Not Available"
-    try:
-        if isinstance(date, pd.Timestamp):
-            return date.strftime("%d-%b-%Y")
-        return datetime.strptime(str(date), "%Y-%m-%d").strftime("%d-%b-%Y")
-    except (ValueError, TypeError):
-        return str(date)
+# The only info fields the tools read; recordings keep just these
+YAHOO_INFO_FIELDS = ("symbol", "currency", "fullTimeEmployees", "marketCap", "sector")
+# A symbol in ticker context: after an exchange prefix ("NYSE: WMT", "Nasdaq:COST") or alone in parentheses ("(WMT)")
+TICKER_CONTEXT_PATTERN = re.compile(
+    r"\b(?:NYSE(?: American| Arca)?|NASDAQ|Nasdaq|AMEX|NYSEARCA|OTC)\s*:\s*([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\b"
+    r"|\(([A-Z]{1,5}(?:\.[A-Z]{1,2})?)\)"
+)
+
+
+def valid_yahoo(fetched: dict) -> bool:
+    """A recordable Yahoo response: a known symbol with at least one non-empty statement."""
+    frames = [value for name, value in fetched.items() if name != "info"]
+    return fetched["info"].get("symbol") is not None and any(not frame.empty for frame in frames)
+
+
+def unknown_yahoo(fetched: dict) -> bool:
+    """Yahoo's answer for a ticker it does not know: info without a symbol."""
+    return fetched["info"].get("symbol") is None
+
+
+def valid_alpha_vantage(overview: dict) -> bool:
+    # Rate limits and bad keys come back as HTTP 200 with {"Note": ...} or {"Information": ...}
+    return isinstance(overview, dict) and "Name" in overview
+
+
+def unknown_alpha_vantage(overview: dict) -> bool:
+    # OVERVIEW answers an unknown symbol with an empty object
+    return overview == {}
+
+
+def valid_serper_search(result) -> bool:
+    return bool(result) and not (isinstance(result, str) and result.lower().startswith("error"))
+
+
+def valid_serper_ticker(data: dict) -> bool:
+    return isinstance(data, dict) and "organic" in data
+
+
+def yahoo_statements(ticker: str, statements: Tuple[str, ...]) -> dict:
+    """Fetch a ticker's info and the named statement frames (e.g. "balance_sheet") from Yahoo Finance."""
+    stock = yf.Ticker(ticker)
+    info = stock.info or {}
+    fetched = {"info": {field: info[field] for field in YAHOO_INFO_FIELDS if field in info}}
+    if info.get("symbol") is None:
+        # Unknown ticker: no statements to fetch
+        return fetched
+    for name in statements:
+        fetched[name] = getattr(stock, name)
+    return fetched
+
 
 class YFinanceTool(BaseTool):
     name: str = "YahooFinanceDataFetcher"
     description: str = "Fetches financial data from Yahoo Finance for a given ticker symbol."
 
+    snapshot_store: Optional[SnapshotStore] = None
+    recorder: Optional[Recorder] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, snapshot_store: Optional[SnapshotStore] = None, recorder: Optional[Recorder] = None):
+        super().__init__()
+        self.snapshot_store = snapshot_store or SnapshotStore()
+        self.recorder = recorder or Recorder()
+
     def _run(self, ticker: str) -> dict:
+        snapshot = self.fetch_snapshot(ticker)
+        if isinstance(snapshot, dict):
+            return snapshot
+        # Keep the exact numbers; the agents only see the formatted copy
+        self.snapshot_store.put(snapshot)
+        return snapshot.to_display()
+
+    @timed_tool
+    @traced("tool.YahooFinanceDataFetcher")
+    def fetch_snapshot(self, ticker: str):
+        """Fetch raw fundamentals for a ticker as a FinancialSnapshot, or return {"error": ...} on failure."""
         try:
-            stock = yf.Ticker(ticker.upper())
-            info = stock.info
+            fetched = self.recorder.call(
+                "yfinance", ticker.upper(),
+                lambda: yahoo_statements(ticker.upper(), ("balance_sheet", "financials")),
+                valid=valid_yahoo, negative=unknown_yahoo
+            )
+            info = fetched["info"]
             if not info or info.get('symbol') is None:
                 return {"error": "Company not found. Please check the ticker and try again."}
 
-            balance_sheet = stock.balance_sheet
-            income_statement = stock.financials
+            balance_sheet = fetched["balance_sheet"]
+            income_statement = fetched["financials"]
 
             if balance_sheet.empty and income_statement.empty:
                 return {"error": "Company not found. Please check the ticker and try again."}
 
-            latest_inventory_date = balance_sheet.columns[0] if not balance_sheet.empty else "Not Available"
-            latest_financial_date = income_statement.columns[0] if not income_statement.empty else "Not Available"
+            latest_inventory_date = balance_sheet.columns[0] if not balance_sheet.empty else None
+            latest_financial_date = income_statement.columns[0] if not income_statement.empty else None
 
-            inventory_cost = balance_sheet.loc['Inventory', latest_inventory_date] if 'Inventory' in balance_sheet.index else "Not Available"
-            if isinstance(inventory_cost, float) and pd.isna(inventory_cost):
-                inventory_cost = "Not Available"
+            def statement_value(statement, row, column):
+                if column is None or row not in statement.index:
+                    return None
+                value = statement.loc[row, column]
+                return None if pd.isna(value) else float(value)
 
-            if inventory_cost == "Not Available" or (isinstance(inventory_cost, (int, float)) and inventory_cost <= 0):
+            inventory_cost = statement_value(balance_sheet, 'Inventory', latest_inventory_date)
+            if inventory_cost is None or inventory_cost <= 0:
                 return {"error": f"This application is designed for inventory-based companies only. '{ticker.upper()}' does not have significant inventory data."}
 
-            cogs = income_statement.loc['Cost Of Revenue', latest_financial_date] if 'Cost Of Revenue' in income_statement.index else "Not Available"
-            revenue = income_statement.loc['Total Revenue', latest_financial_date] if 'Total Revenue' in income_statement.index else 0
-            gross_profit = income_statement.loc['Gross Profit', latest_financial_date] if 'Gross Profit' in income_statement.index else "Not Available"
-            market_cap = info.get('marketCap', 0)
-            headcount = info.get('fullTimeEmployees', "Not Available")
-            sga_expense = income_statement.loc['Selling General And Administration', latest_financial_date] if 'Selling General And Administration' in income_statement.index else "Not Available"
-            cost_of_revenue = income_statement.loc['Cost Of Revenue', latest_financial_date] if 'Cost Of Revenue' in income_statement.index else 0
-            currency = info.get("currency", "USD")  # Default to USD if not available
-
-            gross_profit_percentage = (gross_profit / revenue * 100) if isinstance(gross_profit, (int, float)) and revenue > 0 else "Not Available"
-            salary_avg = sga_expense / headcount if headcount != "Not Available" and sga_expense != "Not Available" else "Not Available"
-
-            return {
-                "company": ticker.upper(),
-                "analized_data_date": format_date(latest_inventory_date),
-                "balance_sheet_inventory_cost": format_amount(inventory_cost, currency),
-                "P&L_inventory_cost": format_amount(cogs, currency),
-                "Revenue": format_amount(revenue, currency),
-                "Headcount Old": headcount if headcount == "Not Available" else f"{headcount:,}",
-                "Salary Average": format_amount(salary_avg, currency),
-                "gross_profit": format_amount(gross_profit, currency),
-                "gross_profit_percentage": f"{gross_profit_percentage:.2f}" if gross_profit_percentage != "Not Available" else "Not Available",
-                "market_cap": format_amount(market_cap, currency),
-                "currency": currency
-            }
+            revenue = statement_value(income_statement, 'Total Revenue', latest_financial_date) or 0
+            gross_profit = statement_value(income_statement, 'Gross Profit', latest_financial_date)
+            headcount = info.get('fullTimeEmployees')
+            sga_expense = statement_value(income_statement, 'Selling General And Administration', latest_financial_date)
+
+            return FinancialSnapshot(
+                company=ticker.upper(),
+                currency=info.get("currency", "USD"),  # Default to USD if not available
+                inventory_date=latest_inventory_date.date() if latest_inventory_date is not None else None,
+                financial_date=latest_financial_date.date() if latest_financial_date is not None else None,
+                inventory_cost=inventory_cost,
+                cogs=statement_value(income_statement, 'Cost Of Revenue', latest_financial_date),
+                revenue=revenue,
+                gross_profit=gross_profit,
+                gross_profit_percentage=gross_profit / revenue * 100 if gross_profit is not None and revenue > 0 else None,
+                headcount=headcount,
+                salary_avg=sga_expense / headcount if headcount and sga_expense is not None else None,
+                market_cap=info.get('marketCap', 0)
+            )
         except Exception as e:
             return {"error": f"Failed to fetch data for '{ticker.upper()}': {str(e)}"}
 
@@ -230,245 +282,105 @@ class CalculatorTool(BaseTool):
         }    
     }
 
-    def _run(self, financial_data: dict) -> dict:
-        def parse_currency(value: str) -> float:
-            """Parse formatted currency strings (e.g., 'USD 6.63 B') into a float."""
-            if value == "Not Available" or value is None:
-                return 0
-            try:
-                value = str(value).replace(',', '').strip()
-                match = re.search(r'(\d+\.?\d*)\s*([BKM]?)', value, re.IGNORECASE)
-                if not match:
-                    return float(value)
-                num = float(match.group(1))
-                multiplier = match.group(2).upper() if match.group(2) else ''
-                return num * (1e9 if multiplier == 'B' else 1e6 if multiplier == 'M' else 1e3 if multiplier == 'K' else 1)
-            except (ValueError, AttributeError) as e:
-                print(f"Error parsing currency '{value}': {str(e)}")
-                return 0
-
-        def get_company_type(revenue):
-            revenue_val = parse_currency(revenue) if isinstance(revenue, str) else revenue if revenue != "Not Available" else 0
-            print(f"Parsed Revenue for company type: {revenue_val}")
-            if not isinstance(revenue_val, (int, float)) or revenue_val <= 0:
-                return "Startup"
-            if revenue_val > 50e9:
-                return "Global"
-            elif revenue_val > 10e9:
-                return "Leader"
-            elif revenue_val > 1e9:
-                return "Challenger"
-            else:
-                return "Startup"
+    engine: Optional[BenefitEngine] = None
+    snapshot_store: Optional[SnapshotStore] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, snapshot_store: Optional[SnapshotStore] = None):
+        super().__init__()
+        # Compile the mapping once; every call is then a few array operations
+        self.engine = BenefitEngine(self.benefit_mapping)
+        self.snapshot_store = snapshot_store or SnapshotStore()
 
+    @timed_tool
+    @traced("tool.CalculatorTool")
+    def _run(self, financial_data: dict) -> dict:
         print(f"Financial Data Input: {financial_data}")
-        company_type = get_company_type(financial_data.get("Revenue", "Not Available"))
-        print(f"Company Type: {company_type}")
-
-        # Parse financial data
-        revenue = parse_currency(financial_data.get("Revenue", "Not Available"))
-        inventory_cost = parse_currency(financial_data.get("balance_sheet_inventory_cost", "Not Available"))
-        gross_profit = parse_currency(financial_data.get("gross_profit", "Not Available"))
-        gross_profit_pct = float(financial_data.get("gross_profit_percentage", "Not Available") or 0)
-        headcount = int(str(financial_data.get("Headcount Old", "Not Available")).replace(',', '')) if str(financial_data.get("Headcount Old", "Not Available")).replace(',', '').isdigit() else 0
-        salary_avg = parse_currency(financial_data.get("Salary Average", "Not Available"))
-        currency = financial_data.get("currency", "USD")
-
-        print(f"Parsed Values - Revenue: {revenue}, Inventory Cost: {inventory_cost}, Gross Profit: {gross_profit}, Gross Profit %: {gross_profit_pct}, Headcount: {headcount}, Salary Avg: {salary_avg}")
-
-        def safe_calc(low, high, calc_func):
-            try:
-                low_val = calc_func(low)
-                high_val = calc_func(high)
-                # Only format if calculation succeeds and values are valid
-                if low_val is not None and high_val is not None and isinstance(low_val, (int, float)) and isinstance(high_val, (int, float)):
-                    print(f"Calculated - Low: {low_val}, High: {high_val}")
-                    return {"low": format_amount(low_val, currency), "high": format_amount(high_val, currency)}
-                else:
-                    raise ValueError("Calculation returned invalid values")
-            except Exception as e:
-                print(f"Calculation failed: {str(e)}")
-                return {"low": "Not Available", "high": "Not Available"}
-
-        def calculate_benefit_sums(benefits_dict):
-            result = {}
-            benefits = benefits_dict["benefits"]
-            for category, metrics in benefits.items():
-                low_sum = 0
-                high_sum = 0
-                for metric, values in metrics.items():
-                    low_val = parse_currency(values["low"]) if isinstance(values["low"], str) else 0
-                    high_val = parse_currency(values["high"]) if isinstance(values["high"], str) else 0
-                    low_sum += low_val
-                    high_sum += high_val
-                result[category] = {
-                    "low": format_amount(low_sum, currency) if low_sum > 0 else "Not Available",
-                    "high": format_amount(high_sum, currency) if high_sum > 0 else "Not Available"
-                }
-            return result
-
-        headfix = 10
-        price_benefit_headfix = 2
-        final_results = {"benefits": {}, "sum": {}}
-
-        # Allocation and Replenishment
-        all_percentages = self.benefit_mapping.get("allocation_and_replenishment")
-        percentages = all_percentages.get(company_type, all_percentages["Startup"])
-        allocation_and_replenishment = {
-            "Margin Rate Lift (bps)": safe_calc(
-                percentages["Margin Rate Lift (bps)"][0], percentages["Margin Rate Lift (bps)"][1],
-                lambda x: (revenue * ((gross_profit_pct / 100) + (x / 100))) - gross_profit if revenue and gross_profit else None
-            ),
-            "Margin on Revenue Lift": safe_calc(
-                percentages["Margin on Revenue Lift"][0], percentages["Margin on Revenue Lift"][1],
-                lambda x: ((revenue * (1 + (x / 100))) * (gross_profit_pct / 100)) - gross_profit if revenue and gross_profit else None
-            ),
-            "Efficiency Re-Investment": safe_calc(
-                percentages["Efficiency Re-Investment"][0], percentages["Efficiency Re-Investment"][1],
-                lambda x: (headfix - (headfix * 100 / (x + 100))) * salary_avg if salary_avg else None
-            ),
-            "Reduction in Xfer Expenses": safe_calc(
-                percentages["Reduction in Xfer Expenses"][0], percentages["Reduction in Xfer Expenses"][1],
-                lambda x: (x / 100) * inventory_cost if inventory_cost else None
-            ),
-            "Inventory Carrying Costs": safe_calc(
-                percentages["Inventory Carrying Costs"][0], percentages["Inventory Carrying Costs"][1],
-                lambda x: (inventory_cost * 0.2) * (x / 100) if inventory_cost else None
-            )
-        }
-        final_results["benefits"]["allocation_and_replenishment"] = allocation_and_replenishment
-
-        # Assortment and Space (similar updates as above)
-        all_percentages = self.benefit_mapping.get("assortment_and_space")
-        percentages = all_percentages.get(company_type, all_percentages["Startup"])
-        assortment_and_space = {
-            "Margin Rate Lift (bps)": safe_calc(
-                percentages["Margin Rate Lift (bps)"][0], percentages["Margin Rate Lift (bps)"][1],
-                lambda x: (revenue * ((gross_profit_pct / 100) + (x / 100))) - gross_profit if revenue and gross_profit else None
-            ),
-            "Margin on Revenue Lift": safe_calc(
-                percentages["Margin on Revenue Lift"][0], percentages["Margin on Revenue Lift"][1],
-                lambda x: ((revenue * (1 + (x / 100))) * (gross_profit_pct / 100)) - gross_profit if revenue and gross_profit else None
-            ),
-            "Efficiency Re-Investment": safe_calc(
-                percentages["Efficiency Re-Investment"][0], percentages["Efficiency Re-Investment"][1],
-                lambda x: (headfix - (headfix * 100 / (x + 100))) * salary_avg if salary_avg else None
-            ),
-            "Reduction in Xfer Expenses": safe_calc(
-                percentages["Reduction in Xfer Expenses"][0], percentages["Reduction in Xfer Expenses"][1],
-                lambda x: (x / 100) * inventory_cost if inventory_cost else None
-            ),
-            "Inventory Carrying Costs": safe_calc(
-                percentages["Inventory Carrying Costs"][0], percentages["Inventory Carrying Costs"][1],
-                lambda x: (inventory_cost * 0.2) * (x / 100) if inventory_cost else None
-            )
-        }
-        final_results["benefits"]["assortment_and_space"] = assortment_and_space
-
-        # Merch Financial Planning (similar updates as above)
-        all_percentages = self.benefit_mapping.get("merch_financial_planning")
-        percentages = all_percentages.get(company_type, all_percentages["Startup"])
-        merch_financial_planning = {
-            "Margin Rate Lift (bps)": safe_calc(
-                percentages["Margin Rate Lift (bps)"][0], percentages["Margin Rate Lift (bps)"][1],
-                lambda x: (revenue * ((gross_profit_pct / 100) + (x / 100))) - gross_profit if revenue and gross_profit else None
-            ),
-            "Margin on Revenue Lift": safe_calc(
-                percentages["Margin on Revenue Lift"][0], percentages["Margin on Revenue Lift"][1],
-                lambda x: ((revenue * (1 + (x / 100))) * (gross_profit_pct / 100)) - gross_profit if revenue and gross_profit else None
-            ),
-            "Efficiency Re-Investment": safe_calc(
-                percentages["Efficiency Re-Investment"][0], percentages["Efficiency Re-Investment"][1],
-                lambda x: (headfix - (headfix * 100 / (x + 100))) * salary_avg if salary_avg else None
-            ),
-            "Inventory Carrying Costs": safe_calc(
-                percentages["Inventory Carrying Costs"][0], percentages["Inventory Carrying Costs"][1],
-                lambda x: (inventory_cost * 0.2) * (x / 100) if inventory_cost else None
-            )
-        }
-        final_results["benefits"]["merch_financial_planning"] = merch_financial_planning
-
-        # Pricing (similar updates as above)
-        all_percentages = self.benefit_mapping.get("pricing")
-        percentages = all_percentages.get(company_type, all_percentages["Startup"])
-        sales_on_base_price_sales_perct_ttl = 0.50
-        sales_on_base_price_gm_perct = 0.35
-        sales_on_base_promotional_event_sales_perct_ttl = 0.35
-        sales_on_base_promotional_event_gm_perct = 0.25
-        sales_on_markdown_sales_perct_ttl = 0.15
-        sales_on_markdown_gm_perct = 0.10
-
-        pricing = {
-            "Base - Margin on Revenue Lift": safe_calc(
-                percentages["Base - Margin on Revenue Lift"][0], percentages["Base - Margin on Revenue Lift"][1],
-                lambda x: (((sales_on_base_price_sales_perct_ttl * revenue) * (1 + (x / 100)) * sales_on_base_price_gm_perct) - 
-                        ((sales_on_base_price_sales_perct_ttl * revenue) * sales_on_base_price_gm_perct)) if revenue else None
-            ),
-            "Base - Margin Rate Lift (bps)": safe_calc(
-                percentages["Base - Margin Rate Lift (bps)"][0], percentages["Base - Margin Rate Lift (bps)"][1],
-                lambda x: (((sales_on_base_price_sales_perct_ttl * revenue) * (sales_on_base_price_gm_perct + (x / 100))) - 
-                        ((sales_on_base_price_sales_perct_ttl * revenue) * sales_on_base_price_gm_perct)) if revenue else None
-            ),
-            "Promo - Margin on Revenue Lift": safe_calc(
-                percentages["Promo - Margin on Revenue Lift"][0], percentages["Promo - Margin on Revenue Lift"][1],
-                lambda x: (((sales_on_base_promotional_event_sales_perct_ttl * revenue) * (1 + (x / 100)) * sales_on_base_promotional_event_gm_perct) - 
-                        ((sales_on_base_promotional_event_sales_perct_ttl * revenue) * sales_on_base_promotional_event_gm_perct)) if revenue else None
-            ),
-            "Promo - Margin Rate Lift (bps)": safe_calc(
-                percentages["Promo - Margin Rate Lift (bps)"][0], percentages["Promo - Margin Rate Lift (bps)"][1],
-                lambda x: (((sales_on_base_promotional_event_sales_perct_ttl * revenue) * (sales_on_base_promotional_event_gm_perct + (x / 100))) - 
-                        ((sales_on_base_promotional_event_sales_perct_ttl * revenue) * sales_on_base_promotional_event_gm_perct)) if revenue else None
-            ),
-            "MD - Margin on Revenue Lift": safe_calc(
-                percentages["MD - Margin on Revenue Lift"][0], percentages["MD - Margin on Revenue Lift"][1],
-                lambda x: (((sales_on_markdown_sales_perct_ttl * revenue) * (1 + (x / 100)) * sales_on_markdown_gm_perct) - 
-                        ((sales_on_markdown_sales_perct_ttl * revenue) * sales_on_markdown_gm_perct)) if revenue else None
-            ),
-            "MD - Margin Rate Lift (bps)": safe_calc(
-                percentages["MD - Margin Rate Lift (bps)"][0], percentages["MD - Margin Rate Lift (bps)"][1],
-                lambda x: (((sales_on_markdown_sales_perct_ttl * revenue) * (sales_on_markdown_gm_perct + (x / 100))) - 
-                        ((sales_on_markdown_sales_perct_ttl * revenue) * sales_on_markdown_gm_perct)) if revenue else None
-            ),
-            "Efficiency Re-Investment": safe_calc(
-                percentages["Efficiency Re-Investment"][0], percentages["Efficiency Re-Investment"][1],
-                lambda x: (price_benefit_headfix - (price_benefit_headfix * 100 / (x + 100))) * salary_avg if salary_avg else None
-            )
-        }
-        final_results["benefits"]["pricing"] = pricing
 
-        # Calculate sums
-        final_results["sum"] = calculate_benefit_sums(final_results)
+        # Prefer the exact numbers fetched for this ticker over re-parsing the agent's formatted copy,
+        # unless the input is for a later date than what was fetched
+        snapshot = FinancialSnapshot.from_display(financial_data)
+        stored = self.snapshot_store.get(financial_data.get("company"))
+        if stored is not None and not snapshot.newer_than(stored):
+            snapshot = stored
+        print(f"Snapshot: {snapshot}")
 
+        final_results = self.calculate([snapshot])[0]
         print(f"Final Results: {final_results}")
         return final_results
 
+    def compute(self, snapshots):
+        """Raw benefit arrays for a list of snapshots: (tiers, values, sums) as returned by BenefitEngine."""
+        column = lambda attribute: [getattr(snapshot, attribute) or 0 for snapshot in snapshots]
+        tiers, values = self.engine.compute(
+            column("revenue"), column("gross_profit"), column("gross_profit_percentage"),
+            column("salary_avg"), column("inventory_cost")
+        )
+        return tiers, values, self.engine.sums(values)
+
+    def scenario(self, snapshot, grid):
+        """Raw benefits for one company at every point of an assumption grid, in a single engine call."""
+        names, points = assumption_grid(grid)
+        overrides = {name: points[:, i] for i, name in enumerate(names)}
+        tiers, values = self.engine.compute(
+            snapshot.revenue or 0, snapshot.gross_profit or 0, snapshot.gross_profit_percentage or 0,
+            snapshot.salary_avg or 0, snapshot.inventory_cost or 0, overrides
+        )
+        return names, points, TIERS[tiers[0]], values, self.engine.sums(values)
+
+    def calculate(self, snapshots):
+        """Formatted benefits and sums for each snapshot, computed in one vectorized pass."""
+        tiers, values, sums = self.compute(snapshots)
+        return [
+            self.engine.to_results(values[i], sums[i], snapshot.currency, format_amount)
+            for i, snapshot in enumerate(snapshots)
+        ]
+
 
 class AlphaVantageTool(BaseTool):
     name: str = "AlphaVantageDataFetcher"
     description: str = "Fetches financial data from Alpha Vantage API for a given ticker symbol."
 
+    recorder: Optional[Recorder] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, recorder: Optional[Recorder] = None):
+        super().__init__()
+        self.recorder = recorder or Recorder()
+
+    @timed_tool
+    @traced("tool.AlphaVantageDataFetcher")
     def _run(self, ticker: str) -> dict:
+        ticker = ticker.upper()
         base_url = "https://www.alphavantage.co/query"
         params = {
             "function": "OVERVIEW",
             "symbol": ticker,
             "apikey": os.getenv("ALPHA_VANTAGE_API_KEY"),
         }
-        try:
+
+        def fetch_overview():
             response = requests.get(base_url, params=params)
-            if response.status_code == 200:
-                overview = response.json()
-                if "Name" not in overview:
-                    return {"error": "No data found for this ticker in Alpha Vantage"}
-                data = {
-                    "company_name": overview.get("Name"),
-                    "market_cap": float(overview.get("MarketCapitalization", 0)),
-                    "Headcount": overview.get("FullTimeEmployees", "Not Available"),
-                    "Salary Average": "Not Available"  # Placeholder
-                }
-                return data
-            else:
-                return {"error": f"Alpha Vantage API error: HTTP {response.status_code}"}
+            response.raise_for_status()
+            return response.json()
+
+        try:
+            overview = self.recorder.call("alphavantage", ticker, fetch_overview, valid=valid_alpha_vantage, negative=unknown_alpha_vantage)
+            if "Name" not in overview:
+                return {"error": "No data found for this ticker in Alpha Vantage"}
+            data = {
+                "company_name": overview.get("Name"),
+                "market_cap": float(overview.get("MarketCapitalization", 0)),
+                "Headcount": overview.get("FullTimeEmployees", "Not Available"),
+                "Salary Average": "Not Available"  # Placeholder
+            }
+            return data
+        except requests.HTTPError as e:
+            return {"error": f"Alpha Vantage API error: HTTP {e.response.status_code}"}
         except Exception as e:
             return {"error": f"Alpha Vantage request error: {str(e)}"}
 
@@ -476,11 +388,24 @@ class InventoryCheckTool(BaseTool):
     name: str = "InventoryCompanyChecker"
     description: str = "Checks if a company is inventory-based based on balance sheet and sector data."
 
+    recorder: Optional[Recorder] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, recorder: Optional[Recorder] = None):
+        super().__init__()
+        self.recorder = recorder or Recorder()
+
+    @timed_tool
+    @traced("tool.InventoryCompanyChecker")
     def _run(self, ticker: str) -> bool:
-        company = yf.Ticker(ticker)
-        balance_sheet = company.balance_sheet
-        info = company.info
-        
+        ticker = ticker.upper()
+        fetched = self.recorder.call("yfinance.inventory", ticker, lambda: yahoo_statements(ticker, ("balance_sheet",)),
+                                     valid=valid_yahoo, negative=unknown_yahoo)
+        balance_sheet = fetched.get("balance_sheet", pd.DataFrame())
+        info = fetched["info"]
+
         has_inventory = balance_sheet.get("Inventory", 0) > 0
         sector = info.get("sector", "").lower()
         inventory_sectors = ["consumer", "industrial", "retail", "manufacturing"]
@@ -492,25 +417,50 @@ class SearchCompanyTool(BaseTool):
     description: str = "Searches for additional company information using SerperDevTool."
     
     serper_tool: Optional[SerperDevTool] = None
+    recorder: Optional[Recorder] = None
 
     class Config:
         arbitrary_types_allowed = True
 
-    def __init__(self):
+    def __init__(self, recorder: Optional[Recorder] = None):
         super().__init__()
         self.serper_tool = SerperDevTool()
+        self.recorder = recorder or Recorder()
 
+    @timed_tool
+    @traced("tool.CompanyInfoSearch")
     def _run(self, company_name: str) -> str:
-        return self.serper_tool.run(f"{company_name} financial reports inventory data")
+        query = f"{company_name} financial reports inventory data"
+        return self.recorder.call("serper.search", query.lower(), lambda: self.serper_tool.run(query), valid=valid_serper_search)
 
 class TickerLookupTool(BaseTool):
     name: str = "TickerLookupTool"
-    description: str = "Looks up a company's ticker symbol based on its name using Serper API."
+    description: str = "Looks up a company's ticker symbol based on its name, using the local listing index first and the Serper API on a miss."
+
+    ticker_index: Optional[TickerIndex] = None
+    recorder: Optional[Recorder] = None
+
+    class Config:
+        arbitrary_types_allowed = True
 
+    def __init__(self, ticker_index: Optional[TickerIndex] = None, recorder: Optional[Recorder] = None):
+        super().__init__()
+        self.ticker_index = ticker_index or TickerIndex()
+        self.recorder = recorder or Recorder()
+
+    @timed_tool
+    @traced("tool.TickerLookupTool")
     def _run(self, company_name: str) -> str:
-        """Fetch ticker symbol dynamically for a given company name using Serper API and return a descriptive message."""
+        """Resolve the ticker symbol for a company name locally, falling back to the Serper API, and return a descriptive message."""
+        ticker = self.ticker_index.lookup(company_name)
+        if ticker:
+            return f"This is the ticker for '{company_name}': {ticker}"
+        return self._search_ticker(company_name)
+
+    def _search_ticker(self, company_name: str) -> str:
+        """Fetch ticker symbol dynamically for a given company name using Serper API and remember validated results."""
         api_key = os.getenv("SERPER_API_KEY")
-        if not api_key:
+        if not api_key and self.recorder.mode != "replay":
             return "Error: SERPER_API_KEY not set in .env file"
 
         url = "https://google.serper.dev/search"
@@ -523,20 +473,30 @@ class TickerLookupTool(BaseTool):
             "q": query
         }
 
-        try:
+
+        def fetch_results():
             response = requests.post(url, json=payload, headers=headers)
             response.raise_for_status()
-            data = response.json()
-            
-            # Extract ticker from organic search results
+            return response.json()
+
+        try:
+            data = self.recorder.call("serper.ticker", query.lower(), fetch_results, valid=valid_serper_ticker)
+
+            # Extract tickers quoted as tickers ("NYSE: WMT", "(WMT)") from the organic results, preferring
+            # a listed symbol whose listing name matches the company
             search_results = data.get("organic", [])
+            fallback_ticker = None
             for result in search_results:
-                snippet = result.get("snippet", "")
-                ticker_match = re.search(r'\b[A-Z]{1,5}\b', snippet)
-                if ticker_match:
-                    ticker = ticker_match.group(0)
-                    return f"This is the ticker for '{company_name}': {ticker}"
-            
+                text = f"{result.get('title', '')} {result.get('snippet', '')}"
+                for ticker in (exchange or parenthesized for exchange, parenthesized in TICKER_CONTEXT_PATTERN.findall(text)):
+                    if self.ticker_index.matches_company(ticker, company_name):
+                        self.ticker_index.add_alias(company_name, ticker)
+                        return f"This is the ticker for '{company_name}': {ticker}"
+                    fallback_ticker = fallback_ticker or ticker
+
+            # Unverified (a foreign listing, or a parent company under another name), so don't persist it
+            if fallback_ticker:
+                return f"This is the ticker for '{company_name}': {fallback_ticker}"
             return f"Error: No ticker found for '{company_name}'"
         except requests.RequestException as e:
             return f"Error: API request failed for '{company_name}' - {str(e)}"
@@ -550,9 +510,12 @@ class FinanceTools:
         self.alpha_vantage_key = os.getenv("ALPHA_VANTAGE_API_KEY")
         self.ts = TimeSeries(key=self.alpha_vantage_key)
         self.file_read_tool = FileReadTool() #enabled
-        self.yfinance_tool = YFinanceTool()
-        self.alpha_vantage_tool = AlphaVantageTool()
-        self.inventory_check_tool = InventoryCheckTool()
-        self.search_company_tool = SearchCompanyTool() #enabled
-        self.ticker_lookup_tool = TickerLookupTool()
-        self.calculator_tool = CalculatorTool()
\ No newline at end of file
+        self.snapshot_store = SnapshotStore()
+        # Record/replay of the provider calls, per FINANCE_MODE
+        self.recorder = Recorder()
+        self.yfinance_tool = YFinanceTool(self.snapshot_store, self.recorder)
+        self.alpha_vantage_tool = AlphaVantageTool(self.recorder)
+        self.inventory_check_tool = InventoryCheckTool(self.recorder)
+        self.search_company_tool = SearchCompanyTool(self.recorder) #enabled
+        self.ticker_lookup_tool = TickerLookupTool(recorder=self.recorder)
+        self.calculator_tool = CalculatorTool(self.snapshot_store)
\ No newline at end of file
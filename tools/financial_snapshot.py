@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import date, datetime
+from typing import Optional
+from .formatting import format_amount, format_date, parse_currency
+
+# How long a fetched snapshot is reused, and how many tickers are kept
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", 3600))
+SNAPSHOT_MAX_ENTRIES = int(os.getenv("SNAPSHOT_MAX_ENTRIES", 512))
+
+# Field order of the formatted record the agents and UI exchange
+DISPLAY_FIELDS = [
+    "company", "analized_data_date", "balance_sheet_inventory_cost", "P&L_inventory_cost", "Revenue",
+    "Headcount Old", "Salary Average", "gross_profit", "gross_profit_percentage", "market_cap", "currency"
+]
+
+# Formatted monetary field -> FinancialSnapshot attribute
+MONETARY_FIELDS = {
+    "balance_sheet_inventory_cost": "inventory_cost",
+    "P&L_inventory_cost": "cogs",
+    "Revenue": "revenue",
+    "Salary Average": "salary_avg",
+    "gross_profit": "gross_profit",
+    "market_cap": "market_cap",
+}
+
+
+@dataclass(slots=True)
+class FinancialSnapshot:
+    """Raw fundamentals for one company. Monetary values are plain floats in `currency`; None means not available."""
+    company: str
+    currency: str = "USD"
+    inventory_date: Optional[date] = None
+    financial_date: Optional[date] = None
+    inventory_cost: Optional[float] = None
+    cogs: Optional[float] = None
+    revenue: Optional[float] = None
+    gross_profit: Optional[float] = None
+    gross_profit_percentage: Optional[float] = None
+    headcount: Optional[int] = None
+    salary_avg: Optional[float] = None
+    market_cap: Optional[float] = None
+
+    def to_display(self) -> dict:
+        """Formatted fields in the shape the agents and the web UI exchange ('USD 6.63 B', '12,345', ...)."""
+        display = {
+            "company": self.company,
+            "analized_data_date": format_date(self.inventory_date),
+            "Headcount Old": f"{self.headcount:,}" if self.headcount is not None else "Not Available",
+            "gross_profit_percentage": f"{self.gross_profit_percentage:.2f}" if self.gross_profit_percentage is not None else "Not Available",
+            "currency": self.currency
+        }
+        for key, attribute in MONETARY_FIELDS.items():
+            display[key] = format_amount(getattr(self, attribute), self.currency)
+        return {key: display[key] for key in DISPLAY_FIELDS}
+
+    def newer_than(self, other: "FinancialSnapshot") -> bool:
+        """True when this snapshot's inventory data is dated later than `other`'s."""
+        return self.inventory_date is not None and (other.inventory_date is None or self.inventory_date > other.inventory_date)
+
+    def to_dict(self) -> dict:
+        """JSON-serializable raw values."""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        for key in ("inventory_date", "financial_date"):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FinancialSnapshot":
+        """Inverse of to_dict(); unknown keys are ignored."""
+        known = {f.name for f in fields(cls)}
+        values = {key: value for key, value in data.items() if key in known}
+        for key in ("inventory_date", "financial_date"):
+            if values.get(key):
+                values[key] = date.fromisoformat(str(values[key])[:10])
+        values["company"] = str(values.get("company", "")).upper()
+        return cls(**values)
+
+    @classmethod
+    def from_display(cls, data: dict) -> "FinancialSnapshot":
+        """Best-effort parse of formatted fields (e.g. agent output) back into numbers."""
+        def present(key):
+            value = data.get(key)
+            return value is not None and str(value).strip() not in ("", "Not Available")
+
+        snapshot = cls(company=str(data.get("company", "")).upper(), currency=data.get("currency") or "USD")
+        for key, attribute in MONETARY_FIELDS.items():
+            if present(key):
+                setattr(snapshot, attribute, parse_currency(data[key]))
+        if present("Headcount Old"):
+            try:
+                snapshot.headcount = int(float(str(data["Headcount Old"]).replace(",", "")))
+            except ValueError:
+                pass
+        if present("gross_profit_percentage"):
+            try:
+                snapshot.gross_profit_percentage = float(str(data["gross_profit_percentage"]).rstrip("%"))
+            except ValueError:
+                pass
+        if present("analized_data_date"):
+            for parse in (date.fromisoformat, lambda v: datetime.strptime(v, "%d-%b-%Y").date()):
+                try:
+                    snapshot.inventory_date = parse(str(data["analized_data_date"]))
+                    break
+                except ValueError:
+                    continue
+        return snapshot
+
+
+class SnapshotStore:
+    """Small thread-safe LRU of the latest snapshot per ticker, shared by the data fetching and calculation tools.
+
+    Entries expire after ttl seconds, so a long-running process fetches fresh fundamentals again.
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL, max_entries=SNAPSHOT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, snapshot: FinancialSnapshot):
+        with self._lock:
+            self._snapshots[snapshot.company] = (time.time(), snapshot)
+            self._snapshots.move_to_end(snapshot.company)
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+
+    def get(self, ticker) -> Optional[FinancialSnapshot]:
+        if not ticker:
+            return None
+        key = str(ticker).strip().upper()
+        with self._lock:
+            entry = self._snapshots.get(key)
+            if entry is None:
+                return None
+            stored_at, snapshot = entry
+            if time.time() - stored_at > self.ttl:
+                del self._snapshots[key]
+                return None
+            self._snapshots.move_to_end(key)
+            return snapshot
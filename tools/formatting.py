@@ -0,0 +1,60 @@
+import re
+from datetime import datetime
+
+UNIT_MULTIPLIERS = {"t": 1e12, "tn": 1e12, "trillion": 1e12, "b": 1e9, "bn": 1e9, "billion": 1e9, "m": 1e6, "mn": 1e6, "million": 1e6, "k": 1e3, "thousand": 1e3}
+
+AMOUNT_PATTERN = re.compile(
+    r'(?P<sign>-)?\s*(?:[A-Z]{3}|[$€£¥₹])?\s*(?P<inner_sign>-)?\s*(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>trillion|billion|million|thousand|tn|bn|mn|[tbmk])?\b',
+    re.IGNORECASE
+)
+
+
+def format_amount(value, currency="USD"):
+    """Format a numeric value into a readable string with currency."""
+    if value == "Not Available" or value is None:
+        return "Not Available"
+    try:
+        value = float(value)
+        magnitude = abs(value)
+        if magnitude >= 1e9:
+            return f"{currency} {value / 1e9:.2f} B"  # Billions
+        elif magnitude >= 1e6:
+            return f"{currency} {value / 1e6:.2f} M"  # Millions
+        elif magnitude >= 1e3:
+            return f"{currency} {value / 1e3:.2f} K"  # Thousands
+        else:
+            return f"{currency} {value:.2f}"  # Less than thousands
+    except (ValueError, TypeError):
+        return str(value)
+
+
+def parse_currency(value) -> float:
+    """Parse formatted currency strings (e.g., 'USD 6.63 B', 'USD -120.50', '€200 million') into a float."""
+    if value == "Not Available" or value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        value = str(value).replace(',', '').strip()
+        match = AMOUNT_PATTERN.search(value)
+        if not match:
+            return float(value)
+        number = float(match.group("number"))
+        if match.group("unit"):
+            number *= UNIT_MULTIPLIERS[match.group("unit").lower()]
+        return -number if match.group("sign") or match.group("inner_sign") else number
+    except (ValueError, AttributeError) as e:
+        print(f"Error parsing currency '{value}': {str(e)}")
+        return 0
+
+
+def format_date(date):
+    """Format a date string, date or Timestamp into DD-MMM-YYYY."""
+    if date == "Not Available" or date is None:
+        return "Not Available"
+    try:
+        if hasattr(date, "strftime"):
+            return date.strftime("%d-%b-%Y")
+        return datetime.strptime(str(date), "%Y-%m-%d").strftime("%d-%b-%Y")
+    except (ValueError, TypeError):
+        return str(date)
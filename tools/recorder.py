@@ -0,0 +1,135 @@
+# tools/recorder.py
+"""Record/replay store for the external calls behind the finance tools.
+
+Each provider call (Yahoo Finance statements, Alpha Vantage overview, Serper searches) goes through
+Recorder.call(source, key, fetch). What happens depends on FINANCE_MODE:
+    live      call the provider (default)
+    record    call the provider and store the response
+    replay    serve stored responses only; never touches the network
+    fallback  call the provider and store the response; serve the stored one when the call fails
+
+A call can pass valid(response): responses that fail it (an empty Yahoo info, a rate-limit note
+from Alpha Vantage, a Serper error) are never stored, so they cannot overwrite the last good
+recording, and in fallback mode they count as a failed call. A call can also pass negative(response)
+for the invalid responses that are a definite answer rather than a problem, such as the empty Yahoo
+info of an unknown ticker. Those are recorded while nothing better is, so replaying a ticker that did
+not exist when it was recorded gives the same "not found" result as live.
+
+Responses (including the pandas statement frames) are pickled, zlib-compressed and kept in a
+SQLite file at FINANCE_RECORDINGS_PATH, one row per (source, key). The file is opened in WAL mode
+with a busy timeout so several workers can record into it; a failed write is logged, not raised.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from app_logging import get_logger
+from metrics import RECORDER_LOOKUPS
+
+logger = get_logger("recorder")
+
+FINANCE_MODE = os.getenv("FINANCE_MODE", "live").lower()
+FINANCE_RECORDINGS_PATH = os.getenv("FINANCE_RECORDINGS_PATH", "finance_recordings.sqlite3")
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 30))
+MODES = ("live", "record", "replay", "fallback")
+
+
+class RecordingMissing(LookupError):
+    """Raised in replay mode (or by fallback after a failed call) when nothing was recorded for a request."""
+
+
+class Recorder:
+    """Thread-safe SQLite store of provider responses, keyed by (source, key)."""
+
+    def __init__(self, mode=FINANCE_MODE, path=FINANCE_RECORDINGS_PATH):
+        if mode not in MODES:
+            raise ValueError(f"FINANCE_MODE must be one of {', '.join(MODES)}, got '{mode}'")
+        self.mode = mode
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        if mode != "live":
+            self._db = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS recordings ("
+                " source TEXT NOT NULL, key TEXT NOT NULL, payload BLOB NOT NULL, recorded_at REAL NOT NULL,"
+                " PRIMARY KEY (source, key))"
+            )
+            self._db.commit()
+
+    def call(self, source, key, fetch, valid=None, negative=None):
+        """Return fetch() or its recorded response, according to the mode."""
+        if self.mode == "live":
+            return fetch()
+        if self.mode == "replay":
+            return self._replay(source, key)
+        try:
+            response = fetch()
+        except Exception as e:
+            if self.mode != "fallback":
+                raise
+            # Provider down: serve the last good response instead
+            response = self._replay(source, key, cause=e)
+            RECORDER_LOOKUPS.inc(source=source, outcome="fallback")
+            return response
+        if valid is not None and not valid(response):
+            RECORDER_LOOKUPS.inc(source=source, outcome="invalid")
+            stored = self.get(source, key)
+            if self.mode == "fallback" and stored is not None:
+                RECORDER_LOOKUPS.inc(source=source, outcome="fallback")
+                return stored
+            if stored is None and negative is not None and negative(response):
+                self._record(source, key, response, "negative")
+            # Nothing better recorded: the caller handles the bad response as it would live
+            return response
+        self._record(source, key, response, "recorded")
+        return response
+
+    def _record(self, source, key, response, outcome):
+        try:
+            self.put(source, key, response)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record {source} response for '{key}': {str(e)}")
+            return
+        RECORDER_LOOKUPS.inc(source=source, outcome=outcome)
+
+    def _replay(self, source, key, cause=None):
+        response = self.get(source, key)
+        if response is None:
+            RECORDER_LOOKUPS.inc(source=source, outcome="missing")
+            raise RecordingMissing(f"No recorded {source} response for '{key}'") from cause
+        if cause is None:
+            RECORDER_LOOKUPS.inc(source=source, outcome="replayed")
+        return response
+
+    def get(self, source, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM recordings WHERE source = ? AND key = ?", (source, key)
+            ).fetchone()
+        return pickle.loads(zlib.decompress(row[0])) if row else None
+
+    def put(self, source, key, response):
+        payload = zlib.compress(pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO recordings (source, key, payload, recorded_at) VALUES (?, ?, ?, ?)",
+                (source, key, payload, time.time())
+            )
+            self._db.commit()
+
+    def snapshot(self):
+        if self._db is None:
+            return {"mode": self.mode}
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT source, COUNT(*), SUM(LENGTH(payload)) FROM recordings GROUP BY source"
+            ).fetchall()
+        return {
+            "mode": self.mode,
+            "sources": {source: {"entries": count, "bytes": size} for source, count, size in rows}
+        }
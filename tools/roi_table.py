@@ -0,0 +1,129 @@
+import hashlib
+import json
+import math
+import os
+import time
+from datetime import date
+import numpy as np
+from .financial_snapshot import FinancialSnapshot
+from .formatting import format_amount
+
+ROI_TABLE_DIR = os.getenv("ROI_TABLE_DIR", "roi_store")
+ROI_TABLE_MAX_AGE_DAYS = float(os.getenv("ROI_TABLE_MAX_AGE_DAYS", 30))
+
+# Numeric FinancialSnapshot attributes stored per row (NaN = not available)
+NUMERIC_FIELDS = [
+    "inventory_cost", "cogs", "revenue", "gross_profit", "gross_profit_percentage",
+    "headcount", "salary_avg", "market_cap"
+]
+
+
+def mapping_hash(benefit_mapping):
+    """Fingerprint of the benefit mapping a table was computed with."""
+    return hashlib.sha256(json.dumps(benefit_mapping, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def row_dtype(slot_count):
+    return np.dtype([
+        ("symbol", "U16"),
+        ("currency", "U8"),
+        ("inventory_date", "U10"),
+        ("financial_date", "U10"),
+        ("fetched_at", "f8"),
+        ("tier", "i1"),
+        ("fundamentals", "f8", (len(NUMERIC_FIELDS),)),
+        ("values", "f8", (slot_count, 2)),
+    ])
+
+
+def write_table(directory, snapshots, fetched_at, tiers, values, engine, benefit_mapping):
+    """Write a new table version and point CURRENT at it. Returns the version name."""
+    version = time.strftime("v%Y%m%d%H%M%S")
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    rows = np.zeros(len(snapshots), dtype=row_dtype(len(engine.slots)))
+    for i, snapshot in enumerate(snapshots):
+        rows[i]["symbol"] = snapshot.company
+        rows[i]["currency"] = snapshot.currency
+        rows[i]["inventory_date"] = snapshot.inventory_date.isoformat() if snapshot.inventory_date else ""
+        rows[i]["financial_date"] = snapshot.financial_date.isoformat() if snapshot.financial_date else ""
+        rows[i]["fundamentals"] = [np.nan if getattr(snapshot, f) is None else getattr(snapshot, f) for f in NUMERIC_FIELDS]
+    rows["fetched_at"] = fetched_at
+    rows["tier"] = tiers
+    rows["values"] = values
+    np.save(os.path.join(version_dir, "rows.npy"), rows)
+
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "count": len(snapshots),
+        "mapping_hash": mapping_hash(benefit_mapping),
+        "modules": engine.modules,
+        "slots": engine.slots,
+        "numeric_fields": NUMERIC_FIELDS
+    }
+    with open(os.path.join(version_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+
+    # Switch readers to the new version atomically
+    tmp_pointer = os.path.join(directory, "CURRENT.tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(directory, "CURRENT"))
+    return version
+
+
+class RoiTable:
+    """Read-only, memory-mapped view of the latest materialized ROI table."""
+
+    def __init__(self, version_dir, manifest, rows, engine):
+        self.version_dir = version_dir
+        self.manifest = manifest
+        self.rows = rows
+        self.engine = engine
+        self.index = {symbol: i for i, symbol in enumerate(rows["symbol"].tolist())}
+
+    @classmethod
+    def load(cls, engine, benefit_mapping, directory=ROI_TABLE_DIR):
+        """Open the CURRENT version, or return None if there is no usable table for this benefit mapping."""
+        pointer = os.path.join(directory, "CURRENT")
+        if not os.path.exists(pointer):
+            print(f"No materialized ROI table in {directory}")
+            return None
+        with open(pointer, "r", encoding="utf-8") as f:
+            version_dir = os.path.join(directory, f.read().strip())
+        with open(os.path.join(version_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["mapping_hash"] != mapping_hash(benefit_mapping) or [tuple(slot) for slot in manifest["slots"]] != engine.slots:
+            print(f"ROI table {manifest['version']} was computed with a different benefit mapping; ignoring it")
+            return None
+        rows = np.load(os.path.join(version_dir, "rows.npy"), mmap_mode="r")
+        print(f"ROI table {manifest['version']} loaded with {manifest['count']} companies")
+        return cls(version_dir, manifest, rows, engine)
+
+    def lookup(self, ticker, max_age_days=ROI_TABLE_MAX_AGE_DAYS):
+        """Return (snapshot, benefits) for a fresh entry, or None if the ticker is missing or stale."""
+        i = self.index.get(str(ticker or "").strip().upper())
+        if i is None:
+            return None
+        row = self.rows[i]
+        if time.time() - float(row["fetched_at"]) > max_age_days * 86400:
+            return None
+
+        numbers = {f: (None if math.isnan(v) else v) for f, v in zip(NUMERIC_FIELDS, row["fundamentals"].tolist())}
+        if numbers["headcount"] is not None:
+            numbers["headcount"] = int(numbers["headcount"])
+        snapshot = FinancialSnapshot(
+            company=str(row["symbol"]),
+            currency=str(row["currency"]),
+            inventory_date=date.fromisoformat(str(row["inventory_date"])) if row["inventory_date"] else None,
+            financial_date=date.fromisoformat(str(row["financial_date"])) if row["financial_date"] else None,
+            **numbers
+        )
+        return snapshot, self.format_benefits(row)
+
+    def format_benefits(self, row):
+        """Benefits dict in the CalculatorTool output shape for one stored row."""
+        values = np.asarray(row["values"])
+        return self.engine.to_results(values, self.engine.sums(values[None])[0], str(row["currency"]), format_amount)
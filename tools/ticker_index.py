@@ -0,0 +1,136 @@
+import json
+import os
+import re
+import threading
+
+COMPANIES_FILE = "companies.json"
+ALIASES_FILE = "ticker_aliases.json"
+
+# Everything from the first of these words onwards describes the listed security, not the company
+SECURITY_PATTERN = re.compile(
+    r"\b(common|ordinary|preferred|preference|depositary|depository|warrants?|units?|rights?|"
+    r"subordinate|voting|shares?|stock|notes?|debentures?|beneficial|class [a-z]|series [a-z0-9]+|"
+    r"\d+(\.\d+)?%|due \d{4})\b.*$",
+    re.IGNORECASE
+)
+CORPORATE_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "llc", "lp", "sa", "ag", "nv", "se", "holdings", "holding", "group", "the"
+}
+# Upper case only: lower-case input like 'all' or 'on' is a word, not a ticker
+TICKER_PATTERN = re.compile(r"^[A-Z]{1,5}([./^-][A-Z]{1,2})?$")
+
+
+def normalize_name(name):
+    """Lowercase a company name and strip punctuation and extra whitespace."""
+    name = re.sub(r"\(the\)", " ", name.lower())
+    name = name.replace("&", " and ")
+    name = re.sub(r"[^a-z0-9 ]+", " ", name)
+    return " ".join(name.split())
+
+
+def core_name(name):
+    """Reduce a listing name such as 'Tesla Inc. Common Stock' to its core company name ('tesla')."""
+    name = SECURITY_PATTERN.sub("", re.sub(r"\(the\)", " ", name, flags=re.IGNORECASE))
+    words = normalize_name(name).split()
+    while len(words) > 1 and words[-1] in CORPORATE_SUFFIXES:
+        words.pop()
+    while len(words) > 1 and words[0] == "the":
+        words.pop(0)
+    return " ".join(words)
+
+
+def listing_rank(name, symbol):
+    """Rank listings so that a company's primary common stock wins over its warrants, units and preferreds."""
+    lowered = name.lower()
+    if not re.fullmatch(r"[A-Z]{1,5}", symbol):
+        return 3
+    if "common" in lowered or not SECURITY_PATTERN.search(name):
+        return 0
+    if "ordinary" in lowered or "depositary" in lowered or "depository" in lowered:
+        return 1
+    return 2
+
+
+class TickerIndex:
+    """Local company name -> ticker symbol index built from companies.json, with a persistent alias table."""
+
+    def __init__(self, companies_file=COMPANIES_FILE, aliases_file=ALIASES_FILE):
+        self.aliases_file = aliases_file
+        self._lock = threading.Lock()
+        self.symbols = {}  # upper-case symbol -> listing name
+        self.names = {}    # normalized full listing name -> symbol
+        self.cores = {}    # core company name -> (rank, symbol)
+        self.prefixes = {}  # leading words of a core name -> symbols of primary listings sharing them
+        self.aliases = {}  # normalized alias -> symbol
+
+        with open(companies_file, "r", encoding="utf-8") as f:
+            companies = json.load(f)
+
+        for name, symbol in companies.items():
+            self.symbols[symbol.upper()] = name
+            self.names[normalize_name(name)] = symbol
+            core = core_name(name)
+            rank = listing_rank(name, symbol)
+            if core and (core not in self.cores or rank < self.cores[core][0]):
+                self.cores[core] = (rank, symbol)
+            if core and rank <= 1:
+                words = core.split()
+                for i in range(1, len(words)):
+                    self.prefixes.setdefault(" ".join(words[:i]), set()).add(symbol)
+
+        if os.path.exists(self.aliases_file):
+            with open(self.aliases_file, "r", encoding="utf-8") as f:
+                self.aliases = json.load(f)
+
+        print(f"Ticker index loaded: {len(self.symbols)} symbols, {len(self.aliases)} aliases")
+
+    def is_known_symbol(self, symbol):
+        return symbol.upper() in self.symbols
+
+    def matches_company(self, symbol, company_name):
+        """True when the listing name of a symbol names the queried company (all of its core words appear in it)."""
+        listing = self.symbols.get(symbol.upper())
+        core = core_name(company_name)
+        if listing is None or not core:
+            return False
+        return core == core_name(listing) or set(core.split()) <= set(normalize_name(listing).split())
+
+    def lookup(self, query):
+        """Resolve a company name, alias or ticker to a symbol. Returns None on a miss."""
+        if not query or not query.strip():
+            return None
+        query = query.strip()
+
+        normalized = normalize_name(query)
+        if normalized in self.aliases:
+            return self.aliases[normalized]
+
+        # Ticker typed directly (e.g. 'TSLA', 'BRK.B')
+        if TICKER_PATTERN.match(query) and query in self.symbols:
+            return query
+
+        if normalized in self.names:
+            return self.names[normalized]
+
+        core = core_name(query)
+        if core in self.cores:
+            return self.cores[core][1]
+
+        # 'Costco' -> 'Costco Wholesale', only when the prefix is unambiguous
+        candidates = self.prefixes.get(core)
+        if candidates and len(candidates) == 1:
+            return next(iter(candidates))
+        return None
+
+    def add_alias(self, alias, symbol):
+        """Record a validated alias -> symbol mapping and persist the alias table."""
+        normalized = normalize_name(alias)
+        if not normalized or self.aliases.get(normalized) == symbol:
+            return
+        with self._lock:
+            self.aliases[normalized] = symbol
+            tmp_file = self.aliases_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.aliases, f, indent=4, sort_keys=True)
+            os.replace(tmp_file, self.aliases_file)
@@ -0,0 +1,201 @@
+# tracing.py
+"""Per-request trace spans written to a local trace file.
+
+span("name", **attributes) times a block as a child of the span that is current in the calling
+context (a contextvar, so children made in asyncio tasks and in asyncio.to_thread workers link up
+to their parent). A span without a parent starts a new trace; the WebSocket handler opens one per
+request with the request_id as trace id.
+
+Finished spans are handed to a background writer and stored as Chrome Trace Event "complete"
+events, one JSON object per line, in TRACE_DIR/trace.jsonl, so the file can be filtered line by
+line (e.g. with jq). `python tracing.py` converts one or more of these files (a rotated backup
+included) into the JSON array that Perfetto (ui.perfetto.dev) and chrome://tracing open. Each trace
+gets its own track, so one request's stages, crews, tools and LLM calls show as a nested timeline.
+
+Spans are only exported after the app's entry point calls setup_tracing(); in scripts, benchmarks
+and tests they are no-ops and no trace file is created.
+"""
+import argparse
+import contextvars
+import functools
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+TRACING = os.getenv("TRACING", "1") not in ("0", "false", "False", "")
+TRACE_DIR = os.getenv("TRACE_DIR", os.path.join("logs", "traces"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 20 * 1024 * 1024))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", 5))
+
+current_span = contextvars.ContextVar("trace_span", default=None)
+_exporting = False
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+_noop_span = _NoopSpan()
+
+_span_ids = itertools.count(1)
+_track_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "track", "span_id", "parent_id", "attributes", "start", "duration")
+
+    def __init__(self, name, parent=None, trace_id=None, attributes=None):
+        self.name = name
+        self.span_id = next(_span_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else (trace_id or f"trace-{self.span_id}")
+        self.track = parent.track if parent is not None else next(_track_ids)
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_event(self):
+        return {
+            "name": self.name,
+            "cat": self.name.split(".", 1)[0],
+            "ph": "X",
+            "ts": round(self.start * 1e6),
+            "dur": round(self.duration * 1e6),
+            "pid": os.getpid(),
+            "tid": self.track,
+            "args": {"trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id, **self.attributes}
+        }
+
+
+class TraceWriter:
+    """Background thread appending span events to a size-rotated trace file."""
+
+    def __init__(self, directory=TRACE_DIR, max_bytes=TRACE_MAX_BYTES, backup_count=TRACE_BACKUP_COUNT):
+        self.path = os.path.join(directory, "trace.jsonl")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, span):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._drain, name="trace-writer", daemon=True)
+                    self._thread.start()
+        self._queue.put(span)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _drain(self):
+        while True:
+            span = self._queue.get()
+            try:
+                if self._file is None:
+                    self._open()
+                self._file.write(json.dumps(span.to_event(), default=str) + "\n")
+                if self._queue.empty():
+                    self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                print(f"Could not write trace span: {str(e)}")
+
+
+writer = TraceWriter()
+
+
+def setup_tracing():
+    """Start exporting spans to TRACE_DIR, unless TRACING is off. Called by the app entry point."""
+    global _exporting
+    _exporting = TRACING
+
+
+@contextmanager
+def span(name, trace_id=None, **attributes):
+    """Time the block as a child of the current span (or as a new trace named trace_id) and export it."""
+    if not _exporting:
+        yield _noop_span
+        return
+    current = Span(name, current_span.get(), trace_id, attributes)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=f"{type(e).__name__}: {str(e)}"[:500])
+        raise
+    finally:
+        current_span.reset(token)
+        current.duration = time.time() - current.start
+        writer.submit(current)
+
+
+def traced(name=None):
+    """Decorator running the function inside a span named `name` (default: its qualified name)."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def export_chrome_trace(paths, out):
+    """Write the events of JSONL trace files to `out` as one Chrome Trace Event array; returns the event count.
+
+    A line cut short (the app stopped mid-write) is skipped.
+    """
+    count = 0
+    out.write("[")
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    # Files from before the JSONL format start with "[" and end each line with a comma
+                    event = json.loads(line.rstrip().rstrip(","))
+                except json.JSONDecodeError:
+                    continue
+                out.write((",\n" if count else "\n") + json.dumps(event))
+                count += 1
+    out.write("\n]\n")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert JSONL trace files into one Chrome Trace Event file for Perfetto or chrome://tracing.")
+    parser.add_argument("paths", nargs="*", default=[os.path.join(TRACE_DIR, "trace.jsonl")], help="Trace files, oldest first")
+    parser.add_argument("--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            count = export_chrome_trace(args.paths, out)
+    else:
+        count = export_chrome_trace(args.paths, sys.stdout)
+    print(f"Exported {count} events", file=sys.stderr)